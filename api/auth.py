@@ -1,24 +1,43 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
 # RELATIVE IMPORTS
 from . import models, schemas
-from .database import get_db
+from .database import DB_ASYNC, get_db, get_async_db
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "FALLBACK_DEV_KEY_ONLY_CHANGE_ME_IN_PROD")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
+# calendar feed tokens (scope "feed") only work on feed URLs, see get_feed_user
+FEED_TOKEN_EXPIRE_DAYS = int(os.getenv("FEED_TOKEN_EXPIRE_DAYS", "180"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Stateless mode: a DB-backed LRU+TTL cache of users. The role/lecturer_id
+# claims are not trusted on their own: a cache miss, or a token whose "ver"
+# differs from the cached token_version (see revoke_user_tokens), still loads
+# the users row, and the cached principal is built from that row. Hits skip
+# the lookup; another instance may keep serving a revoked user from its
+# cache for at most AUTH_USER_CACHE_TTL seconds.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "0").lower() in ("1", "true", "yes")
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "300"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "2048"))
+
+# Changing BCRYPT_ROUNDS makes existing hashes "outdated"; they are rehashed on the next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
@@ -38,22 +57,131 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def create_feed_token(user) -> str:
+    expire = datetime.utcnow() + timedelta(days=FEED_TOKEN_EXPIRE_DAYS)
+    return jwt.encode(
+        {"sub": user.email, "scope": "feed", "ver": user.token_version or 0, "exp": expire},
+        SECRET_KEY, algorithm=ALGORITHM,
+    )
+
+
+# --- USER CACHE (stateless mode) ---
+class TokenUser:
+    """Detached copy of a users row for the cache; exposes the User attributes routers use."""
+    def __init__(self, id: Optional[int], email: str, role: str, lecturer_id: Optional[int], token_version: int = 0):
+        self.id = id
+        self.email = email
+        self.role = role
+        self.lecturer_id = lecturer_id
+        self.token_version = token_version
+
+
+_user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def _cache_get(email: str, version: int) -> Optional[TokenUser]:
+    with _user_cache_lock:
+        hit = _user_cache.get(email)
+        if hit is None:
+            return None
+        expires, principal = hit
+        if expires < time.monotonic() or principal.token_version != version:
+            del _user_cache[email]
+            return None
+        _user_cache.move_to_end(email)
+        return principal
+
+
+def _cache_put(principal: TokenUser):
+    with _user_cache_lock:
+        _user_cache[principal.email] = (time.monotonic() + AUTH_USER_CACHE_TTL, principal)
+        _user_cache.move_to_end(principal.email)
+        while len(_user_cache) > AUTH_USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+
+def forget_user(email: str):
+    with _user_cache_lock:
+        _user_cache.pop(email, None)
+
+
+def revoke_user_tokens(db: Session, user: models.User):
+    """Invalidate every token issued to user so far."""
+    user.token_version = (user.token_version or 0) + 1
+    db.commit()
+    forget_user(user.email)
+
+
 # --- DEPENDENCY: Get Current User ---
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str, scope: Optional[str] = None):
+    """-> (email, token version); raises 401 on an invalid token or a token of another scope."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        if email is None or payload.get("scope") != scope:
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return email, int(payload.get("ver") or 0)
+
+
+def _resolve_user(user: Optional[models.User], version: int):
+    if user is None or (user.token_version or 0) != version:
+        raise _credentials_exception()
+    if AUTH_STATELESS:
+        principal = TokenUser(user.id, user.email, user.role, user.lecturer_id, user.token_version or 0)
+        _cache_put(principal)
+        return principal
+    return user
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    email, version = _decode_token(token)
+    if AUTH_STATELESS:
+        principal = _cache_get(email, version)
+        if principal is not None:
+            return principal
+
+    user = db.query(models.User).filter(models.User.email == email).first()
+    return _resolve_user(user, version)
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """get_current_user for async routes (DB_ASYNC=1)."""
+    email, version = _decode_token(token)
+    if AUTH_STATELESS:
+        principal = _cache_get(email, version)
+        if principal is not None:
+            return principal
+
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return _resolve_user(result.scalars().first(), version)
+
+
+# current user of the read handlers written against database.get_read_db (same session either way)
+get_read_user = get_current_user_async if DB_ASYNC else get_current_user
+
+
+def get_feed_user(token: str = Query(...), db: Session = Depends(get_db)):
+    """Principal of a feed URL (?token=...). Always served from the user cache when possible,
+    so polling clients cost no DB work; revocation applies within AUTH_USER_CACHE_TTL."""
+    email, version = _decode_token(token, scope="feed")
+    principal = _cache_get(email, version)
+    if principal is not None:
+        return principal
 
     user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+    if user is None or (user.token_version or 0) != version:
+        raise _credentials_exception()
+    principal = TokenUser(user.id, user.email, user.role, user.lecturer_id, user.token_version or 0)
+    _cache_put(principal)
+    return principal
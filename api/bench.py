@@ -0,0 +1,338 @@
+# api/bench.py
+#
+# HTTP benchmark over every router, recorded as a JSON baseline:
+#
+#   export DATABASE_URL=sqlite:///bench.db
+#   python -m api.synthetic --scale 2 --reset
+#   python -m api.bench run --requests 200 --concurrency 8 --out before.json
+#   ... change code ...
+#   python -m api.bench run --requests 200 --concurrency 8 --out after.json
+#   python -m api.bench compare before.json after.json
+#
+# By default the app is driven in-process through httpx's ASGI transport
+# (one event loop, sync endpoints on the threadpool as under uvicorn);
+# --base-url points the same scenarios at a running server instead. Users
+# and ids come from the api/synthetic.py dataset. Query counts and DB time
+# are read from the Server-Timing header (api/querystats.py), so they are
+# only recorded when QUERY_STATS is on for the app under test.
+#
+# Write paths are covered without drifting the dataset between runs: solve,
+# repair, clone-from and import run with dry_run (full work, rolled back);
+# schedule.bulk saves a copy of the first 50 W24 entries into a fresh
+# scratch semester per request ("BENCH-<n>"), cleared again right after the
+# request (untimed, DELETE /schedule/?semester=); rooms.update toggles the
+# capacity of room 1 and puts the original back afterwards. In-process runs
+# also drop the scratch semesters' version counters at the end; with
+# --base-url those table_versions rows stay behind.
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import List, Optional
+
+from .synthetic import PASSWORD, SEMESTERS
+
+_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class Scenario:
+    def __init__(self, name: str, path: str, role: Optional[str] = "pm", method: str = "GET", body=None, files=None,
+                 teardown=None, cleanup=None):
+        self.name = name
+        self.path = path
+        self.role = role  # None: no Authorization header (e.g. feed token in the URL)
+        self.method = method
+        self.body = body  # JSON body, or a callable ctx -> body evaluated per request
+        self.files = files
+        self.teardown = teardown  # async (client, ctx, headers, body), run untimed after each request
+        self.cleanup = cleanup  # async (client, ctx, headers), run untimed after the scenario
+
+
+BULK_SIZE = 50
+BULK_PREFIX = "BENCH-"
+
+
+def _bulk_body(ctx: dict) -> dict:
+    semester = f"{BULK_PREFIX}{next(ctx['bulk_seq'])}"
+    return {"entries": [dict(e, semester=semester) for e in ctx["bulk_entries"]]}
+
+
+async def _bulk_teardown(client, ctx: dict, headers: dict, body: dict):
+    await client.delete(f"/schedule/?semester={body['entries'][0]['semester']}", headers=headers["pm"])
+
+
+async def _bulk_cleanup(client, ctx: dict, headers: dict):
+    ctx["bulk_seq"] = itertools.count()
+    if not ctx["in_process"]:
+        return
+    from . import database, models, versions
+
+    table = models.TableVersion.__table__
+    prefix = versions.scoped(models.ScheduleEntry.__tablename__, BULK_PREFIX)
+    with database.engine.begin() as conn:
+        conn.execute(table.delete().where(table.c.name.startswith(prefix)))
+
+
+def _room_body(ctx: dict) -> dict:
+    # alternate between two capacities so every request really writes
+    return {"capacity": ctx["room_capacity"] + next(ctx["room_seq"]) % 2}
+
+
+async def _room_cleanup(client, ctx: dict, headers: dict):
+    await client.put(f"/rooms/{ctx['room_id']}", json={"capacity": ctx["room_capacity"]}, headers=headers["pm"])
+
+
+def _rooms_csv(n: int) -> bytes:
+    lines = ["name,capacity,type"] + [f"Room {i:03d},{20 + i % 5 * 10},Seminar" for i in range(1, n + 1)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+SCENARIOS = [
+    Scenario("auth.me", "/auth/me"),
+    Scenario("programs.list", "/study-programs/"),
+    Scenario("domains.list", "/domains/"),
+    Scenario("lecturers.list", "/lecturers/"),
+    Scenario("lecturers.summary", "/lecturers/summary?limit=50&sort=name"),
+    Scenario("lecturers.modules", "/lecturers/{lecturer_id}/modules"),
+    Scenario("lecturers.me", "/lecturers/me", role="lecturer"),
+    Scenario("modules.list", "/modules/"),
+    Scenario("modules.filtered", "/modules/?program_id={program_id}&assessment=oral exam"),
+    Scenario("specializations.list", "/specializations/"),
+    Scenario("groups.list", "/groups/"),
+    Scenario("rooms.list", "/rooms/"),
+    Scenario("semesters.list", "/semesters/"),
+    Scenario("constraints.list", "/scheduler-constraints/"),
+    Scenario("constraints.violations", "/scheduler-constraints/violations?semester={semester}"),
+    Scenario("availabilities.list", "/availabilities/"),
+    Scenario("availabilities.free", "/availabilities/free?day=Monday&start=10:00&end=12:00"),
+    Scenario("offered_modules.list", "/offered-modules/?semester={semester}"),
+    Scenario("schedule.full", "/schedule/?semester={semester}"),
+    Scenario("schedule.room", "/schedule/?semester={semester}&room_id={room_id}"),
+    Scenario("schedule.page", "/schedule/?semester={semester}&limit=100"),
+    Scenario("schedule.me", "/schedule/me?semester={semester}", role="lecturer"),
+    Scenario("schedule.conflicts", "/schedule/conflicts?semester={semester}"),
+    Scenario("schedule.ics", "/schedule/ics?semester={semester}&lecturer_id={lecturer_id}&token={feed_token}", role=None),
+    Scenario("export.modules", "/export/modules?format=ndjson"),
+    Scenario("import.rooms_dry_run", "/import/rooms?dry_run=true", method="POST",
+             files={"file": ("rooms.csv", b"name,capacity,type\nRoom 001,40,Seminar\nBench Room,20,Seminar\n", "text/csv")}),
+    Scenario("import.rooms_500_dry_run", "/import/rooms?dry_run=true", method="POST",
+             files={"file": ("rooms.csv", _rooms_csv(500), "text/csv")}),
+    Scenario("rooms.update", "/rooms/{room_id}", method="PUT", body=_room_body, cleanup=_room_cleanup),
+    Scenario("schedule.bulk", "/schedule/bulk?force=true", method="POST", body=_bulk_body,
+             teardown=_bulk_teardown, cleanup=_bulk_cleanup),
+    Scenario("schedule.solve_dry_run", "/schedule/solve?semester={semester}&replace=true&dry_run=true&time_limit=5",
+             method="POST"),
+    Scenario("schedule.repair_dry_run", "/schedule/repair?semester={semester}&lecturer_id={lecturer_id}&dry_run=true",
+             method="POST"),
+    Scenario("semesters.clone_dry_run", "/semesters/{target_semester_id}/clone-from/{semester_id}", method="POST",
+             body={"replace": True, "dry_run": True}),
+]
+
+ROLES = {"pm": "pm@bench.local", "lecturer": "lecturer@bench.local"}
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def _setup(client, in_process: bool) -> tuple:
+    headers = {}
+    for role, email in ROLES.items():
+        r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        if r.status_code != 200:
+            raise SystemExit(f"Login as {email} failed ({r.status_code}); generate the dataset with python -m api.synthetic")
+        headers[role] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    feed = await client.post("/schedule/ics/token", headers=headers["lecturer"])
+    first = await client.get(
+        f"/schedule/?semester={SEMESTERS[0][0]}&limit={BULK_SIZE}"
+        "&fields=offered_module_id,day_of_week,start_time,end_time",
+        headers=headers["pm"],
+    )
+    rooms = await client.get("/rooms/", headers=headers["pm"])
+    ctx = {
+        "in_process": in_process,
+        "semester": SEMESTERS[0][0],
+        "semester_id": 1,  # synthetic semester ids follow SEMESTERS
+        "target_semester_id": 2,
+        "lecturer_id": 2,  # lecturer@bench.local
+        "room_id": 1,
+        "room_capacity": next(r["capacity"] for r in rooms.json() if r["id"] == 1) or 0,
+        "room_seq": itertools.count(),
+        "program_id": 1,
+        "feed_token": feed.json()["token"],
+        "bulk_entries": first.json(),
+        "bulk_seq": itertools.count(),
+    }
+    return headers, ctx
+
+
+async def _request(client, sc: Scenario, ctx: dict, headers: dict):
+    kwargs = {"headers": headers.get(sc.role, {})}
+    if sc.body is not None:
+        kwargs["json"] = sc.body(ctx) if callable(sc.body) else sc.body
+    if sc.files is not None:
+        kwargs["files"] = sc.files
+    started = time.perf_counter()
+    r = await client.request(sc.method, sc.path.format(**ctx), **kwargs)
+    elapsed = time.perf_counter() - started
+    if sc.teardown is not None:
+        await sc.teardown(client, ctx, headers, kwargs.get("json"))
+    m = _TIMING.search(r.headers.get("server-timing", ""))
+    return r.status_code, len(r.content), elapsed, (int(m.group(2)), float(m.group(1))) if m else None
+
+
+async def run_scenario(client, sc: Scenario, ctx: dict, headers: dict,
+                       requests: int, concurrency: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await _request(client, sc, ctx, headers)
+
+    results = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            results.append(await _request(client, sc, ctx, headers))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(r[2] * 1000 for r in results)
+    timings = [r[3] for r in results if r[3] is not None]
+    statuses = Counter(str(r[0]) for r in results)
+    return {
+        "method": sc.method,
+        "path": sc.path,
+        "requests": len(results),
+        "errors": sum(n for code, n in statuses.items() if int(code) >= 400),
+        "statuses": dict(statuses),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "throughput_rps": round(len(results) / wall, 1) if wall else None,
+        "bytes": results[-1][1],
+        "queries": round(sum(t[0] for t in timings) / len(timings), 1) if timings else None,
+        "db_ms": round(sum(t[1] for t in timings) / len(timings), 2) if timings else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(base_url: Optional[str], requests: int, concurrency: int, warmup: int, only: Optional[str]) -> dict:
+    import httpx
+
+    meta = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "requests": requests,
+        "concurrency": concurrency,
+        "warmup": warmup,
+        "target": base_url or "in-process",
+    }
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        from . import database
+        from .index import app
+
+        meta.update(
+            database=database.engine.dialect.name,
+            db_profile=database.DB_PROFILE,
+            db_async=database.DB_ASYNC,
+            cache_backend=os.getenv("CACHE_BACKEND", "memory"),
+        )
+        # 500s are recorded as errors instead of aborting the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+
+    scenarios = [sc for sc in SCENARIOS if not only or re.search(only, sc.name)]
+    out = {"meta": meta, "scenarios": {}}
+    async with client:
+        headers, ctx = await _setup(client, in_process=base_url is None)
+        for sc in scenarios:
+            res = await run_scenario(client, sc, ctx, headers, requests, concurrency, warmup)
+            if sc.cleanup is not None:
+                await sc.cleanup(client, ctx, headers)
+            out["scenarios"][sc.name] = res
+            print(f"{sc.name:26} p50 {res['p50_ms']:8.2f}  p95 {res['p95_ms']:8.2f}  p99 {res['p99_ms']:8.2f} ms"
+                  f"  {res['throughput_rps'] or 0:8.1f} req/s  queries {res['queries']}  errors {res['errors']}")
+    return out
+
+
+def compare(base: dict, new: dict, threshold: float) -> int:
+    """Print per-scenario deltas; returns how many scenarios regressed past threshold %."""
+    regressions = 0
+    print(f"{'scenario':26} {'p50 ms':>18} {'p95 ms':>18} {'queries':>12}")
+    for name, b in base["scenarios"].items():
+        n = new["scenarios"].get(name)
+        if n is None:
+            print(f"{name:26} (missing)")
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms"):
+            delta = (n[key] - b[key]) / b[key] * 100 if b[key] else 0.0
+            cells.append(f"{n[key]:8.2f} ({delta:+6.1f}%)")
+        flag = ""
+        if b["p95_ms"] and (n["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 > threshold:
+            flag = "  <-- slower"
+        if b["queries"] is not None and n["queries"] is not None and n["queries"] > b["queries"]:
+            flag += "  <-- more queries"
+        regressions += bool(flag)
+        print(f"{name:26} {cells[0]:>18} {cells[1]:>18} {str(b['queries']) + '->' + str(n['queries']):>12}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m api.bench", description="Benchmark the API routers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the scenarios and write a JSON baseline")
+    p_run.add_argument("--requests", type=int, default=100, help="timed requests per scenario")
+    p_run.add_argument("--concurrency", type=int, default=4)
+    p_run.add_argument("--warmup", type=int, default=3)
+    p_run.add_argument("--only", help="regex on scenario names")
+    p_run.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    p_run.add_argument("--out", help="write the results to this JSON file")
+
+    p_cmp = sub.add_parser("compare", help="diff two baselines")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=20.0, help="p95 regression in %% that fails the comparison")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        result = asyncio.run(run(args.base_url, args.requests, args.concurrency, args.warmup, args.only))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(result, f, indent=2, sort_keys=True)
+            print(f"✅ Baseline written to {args.out}")
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    return 1 if compare(base, new, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
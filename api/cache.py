@@ -0,0 +1,141 @@
+# api/cache.py
+#
+# Read-through cache for pre-serialized responses.
+#
+# Entries are stored together with a "stamp" (the api/versions.py counters
+# the payload was built from). A reader recomputes the stamp with one
+# primary-key query and only serves the cached bytes when it still matches,
+# so a write on any worker invalidates every worker's copy, whichever
+# backend is used.
+#
+# CACHE_BACKEND=memory (default): per-process LRU bounded by CACHE_MAX_BYTES.
+# CACHE_BACKEND=redis: shared between workers (CACHE_REDIS_URL); needs the
+#   optional `redis` package.
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from . import metrics
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_REDIS_TTL = int(os.getenv("CACHE_REDIS_TTL", "86400"))
+
+
+class MemoryBackend:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+            return hit
+
+    def set(self, key: str, stamp: str, payload: bytes):
+        with self._lock:
+            self._discard(key)
+            if len(payload) > self.max_bytes:
+                return
+            self._items[key] = (stamp, payload)
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, (_, old) = self._items.popitem(last=False)
+                self.size -= len(old)
+                metrics.inc("cache.evictions")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: str):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old[1])
+
+    def __len__(self):
+        return len(self._items)
+
+
+class RedisBackend:
+    def __init__(self, url: str, ttl: int):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[tuple]:
+        raw = self.client.get(key)
+        if raw is None:
+            return None
+        stamp, _, payload = raw.partition(b"\n")
+        return stamp.decode(), payload
+
+    def set(self, key: str, stamp: str, payload: bytes):
+        self.client.set(key, stamp.encode() + b"\n" + payload, ex=self.ttl)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+def _make_backend():
+    if CACHE_BACKEND == "memory":
+        return MemoryBackend(CACHE_MAX_BYTES)
+    if CACHE_BACKEND == "redis":
+        return RedisBackend(CACHE_REDIS_URL, CACHE_REDIS_TTL)
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+
+backend = _make_backend()
+
+# cache names
+SCHEDULE = "schedule"  # GET /schedule/ payload, keyed by semester
+ICS = "ics"  # GET /schedule/ics feeds, keyed by semester + filter
+
+if isinstance(backend, MemoryBackend):
+    metrics.gauge("cache.entries", lambda: len(backend))
+    metrics.gauge("cache.bytes", lambda: backend.size)
+
+
+def get(name: str, key: str, stamp: str) -> Optional[bytes]:
+    """Cached payload if it was built at stamp (counts a hit or a miss)."""
+    hit = backend.get(f"{name}:{key}")
+    if hit is not None and hit[0] == stamp:
+        metrics.inc(f"cache.{name}.hits")
+        return hit[1]
+    metrics.inc(f"cache.{name}.misses")
+    return None
+
+
+def put(name: str, key: str, stamp: str, payload: bytes):
+    backend.set(f"{name}:{key}", stamp, payload)
+
+
+def read_through(name: str, key: str, stamp: str, build: Callable[[], bytes]) -> bytes:
+    """Cached payload for key if it was built at stamp; otherwise build() and store it."""
+    payload = get(name, key, stamp)
+    if payload is None:
+        payload = build()
+        put(name, key, stamp, payload)
+    return payload
+
+
+async def read_through_async(name: str, key: str, stamp: str, build) -> bytes:
+    payload = get(name, key, stamp)
+    if payload is None:
+        payload = await build()
+        put(name, key, stamp, payload)
+    return payload
+
+
+def invalidate(name: str, key: str):
+    """Drop an entry right away (its stamp would stop matching anyway)."""
+    backend.delete(f"{name}:{key}")
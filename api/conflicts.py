@@ -0,0 +1,231 @@
+# api/conflicts.py
+#
+# Overlap lookups for schedule entries. Times are compared as integer minute
+# offsets (ScheduleEntry.start_minute/end_minute) and days as the stored
+# weekday ordinal (ScheduleEntry.day_number), so "monday"/"Mon" rows match a
+# canonical "Monday" and every check is a range query on the composite
+# (semester, day_number, [room_id,] start_minute) indexes instead of a scan
+# over the whole semester.
+import heapq
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from . import models
+from .solver import cohort_sizes
+from .timeslots import DAYS, day_index, day_number, format_time, try_parse_time
+
+
+def normalize_slot(day_of_week: str, start_time: str, end_time: str):
+    """Validate and canonicalize a slot -> (day, start_minute, end_minute)."""
+    i = day_index(day_of_week)
+    if i is None:
+        raise HTTPException(status_code=400, detail=f"Invalid day_of_week: {day_of_week}")
+    start, end = try_parse_time(start_time), try_parse_time(end_time)
+    if start is None or end is None:
+        raise HTTPException(status_code=400, detail="start_time/end_time must be HH:MM")
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start_time must be before end_time")
+    return DAYS[i], start, end
+
+
+def _overlapping(query, start: int, end: int):
+    return query.filter(
+        models.ScheduleEntry.start_minute < end,
+        models.ScheduleEntry.end_minute > start,
+    )
+
+
+def find_conflicts(
+    db: Session,
+    semester: str,
+    day: str,
+    start: int,
+    end: int,
+    room_id: Optional[int] = None,
+    lecturer_id: Optional[int] = None,
+    exclude_id: Optional[int] = None,
+) -> List[dict]:
+    conflicts = []
+
+    if room_id is not None:
+        q = db.query(models.ScheduleEntry.id).filter(
+            models.ScheduleEntry.semester == semester,
+            models.ScheduleEntry.day_number == day_number(day),
+            models.ScheduleEntry.room_id == room_id,
+        )
+        if exclude_id is not None:
+            q = q.filter(models.ScheduleEntry.id != exclude_id)
+        for (entry_id,) in _overlapping(q, start, end).all():
+            conflicts.append({"type": "room", "entry_id": entry_id, "room_id": room_id})
+
+    if lecturer_id is not None:
+        q = (
+            db.query(models.ScheduleEntry.id)
+            .join(models.OfferedModule, models.OfferedModule.id == models.ScheduleEntry.offered_module_id)
+            .filter(
+                models.ScheduleEntry.semester == semester,
+                models.ScheduleEntry.day_number == day_number(day),
+                models.OfferedModule.lecturer_id == lecturer_id,
+            )
+        )
+        if exclude_id is not None:
+            q = q.filter(models.ScheduleEntry.id != exclude_id)
+        for (entry_id,) in _overlapping(q, start, end).all():
+            conflicts.append({"type": "lecturer", "entry_id": entry_id, "lecturer_id": lecturer_id})
+
+    return conflicts
+
+
+# ---------------------------------------------------------
+# Semester audit (per-resource sorted sweep)
+# ---------------------------------------------------------
+def _sweep(rows, resource: str, key_field: str):
+    """rows: (entry_id, key, day, start, end). Yields one record per overlapping pair."""
+    groups = {}
+    for r in rows:
+        if r[1] is None:
+            continue
+        groups.setdefault((r[1], r[2]), []).append(r)
+
+    for (key, day), items in groups.items():
+        items.sort(key=lambda x: (x[3], x[4]))  # ids may mix int and str, never compare them
+        active = []  # min-heap of (end, seq, entry_id, start)
+        for seq, (entry_id, _, _, start, end) in enumerate(items):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for a_end, _, a_id, a_start in active:
+                yield {
+                    "type": f"{resource}_double_booking",
+                    key_field: key,
+                    "day_of_week": day,
+                    "entry_ids": [a_id, entry_id],
+                    "start_time": format_time(max(start, a_start)),
+                    "end_time": format_time(min(end, a_end)),
+                }
+            heapq.heappush(active, (end, seq, entry_id, start))
+
+
+def _canonical_day(number: Optional[int], stored: str) -> str:
+    """Sweep key of a row: the canonical name, so "monday" and "Mon" rows collide with "Monday" ones."""
+    return DAYS[number] if number is not None and number < len(DAYS) else stored
+
+
+def audit_semester(db: Session, semester: str):
+    """Every conflict of a semester: double bookings, capacity overruns, room type mismatches.
+
+    All DB work happens here; the returned generator only walks memory, so it
+    can be streamed after the session is gone.
+    """
+    rows = (
+        db.query(
+            models.ScheduleEntry.id,
+            models.ScheduleEntry.room_id,
+            models.ScheduleEntry.day_of_week,
+            models.ScheduleEntry.day_number,
+            models.ScheduleEntry.start_minute,
+            models.ScheduleEntry.end_minute,
+            models.ScheduleEntry.start_time,
+            models.ScheduleEntry.end_time,
+            models.OfferedModule.lecturer_id,
+            models.Module.module_code,
+            models.Module.room_type,
+            models.Module.program_id,
+        )
+        .join(models.OfferedModule, models.OfferedModule.id == models.ScheduleEntry.offered_module_id)
+        .outerjoin(models.Module, models.Module.module_code == models.OfferedModule.module_code)
+        .filter(models.ScheduleEntry.semester == semester)
+        .all()
+    )
+    rooms = {r.id: (r.capacity, r.type) for r in db.query(models.Room).all()}
+    sizes = cohort_sizes(db)
+    return _audit_records(rows, rooms, sizes)
+
+
+def _audit_records(rows, rooms, sizes):
+    room_rows, lec_rows = [], []
+    for r in rows:
+        start = r.start_minute if r.start_minute is not None else try_parse_time(r.start_time)
+        end = r.end_minute if r.end_minute is not None else try_parse_time(r.end_time)
+        if start is None or end is None:
+            yield {"type": "invalid_time", "entry_ids": [r.id], "start_time": r.start_time, "end_time": r.end_time}
+            continue
+        day = _canonical_day(r.day_number, r.day_of_week)
+        room_rows.append((r.id, r.room_id, day, start, end))
+        lec_rows.append((r.id, r.lecturer_id, day, start, end))
+
+        if r.room_id not in rooms:
+            continue
+        capacity, room_type = rooms[r.room_id]
+        size = sizes.get(r.program_id, 0)
+        if size and (capacity or 0) < size:
+            yield {
+                "type": "capacity_overrun",
+                "entry_ids": [r.id],
+                "room_id": r.room_id,
+                "capacity": capacity,
+                "group_size": size,
+            }
+        wanted = (r.room_type or "").strip().lower()
+        if wanted and wanted != (room_type or "").strip().lower():
+            yield {
+                "type": "room_type_mismatch",
+                "entry_ids": [r.id],
+                "room_id": r.room_id,
+                "room_type": room_type,
+                "required_room_type": r.room_type,
+            }
+
+    yield from _sweep(room_rows, "room", "room_id")
+    yield from _sweep(lec_rows, "lecturer", "lecturer_id")
+
+
+def find_batch_conflicts(db: Session, items: List[dict]) -> List[dict]:
+    """Conflicts among new items and against stored entries, with one query per batch.
+
+    items: dicts with ref, semester, day, start, end, room_id, lecturer_id.
+    Stored entries are identified by their id, new items by their ref.
+    """
+    semesters = {i["semester"] for i in items}
+    days = {day_number(i["day"]) for i in items}
+    existing = (
+        db.query(
+            models.ScheduleEntry.id,
+            models.ScheduleEntry.semester,
+            models.ScheduleEntry.room_id,
+            models.OfferedModule.lecturer_id,
+            models.ScheduleEntry.day_number,
+            models.ScheduleEntry.start_minute,
+            models.ScheduleEntry.end_minute,
+        )
+        .join(models.OfferedModule, models.OfferedModule.id == models.ScheduleEntry.offered_module_id)
+        .filter(
+            models.ScheduleEntry.semester.in_(semesters),
+            models.ScheduleEntry.day_number.in_(days),
+            models.ScheduleEntry.start_minute.isnot(None),
+        )
+        .all()
+    )
+
+    by_semester = {}
+    for e in existing:
+        by_semester.setdefault(e.semester, []).append(
+            (e.id, e.room_id, e.lecturer_id, DAYS[e.day_number], e.start_minute, e.end_minute)
+        )
+    new_refs = set()
+    for i in items:
+        new_refs.add(i["ref"])
+        by_semester.setdefault(i["semester"], []).append(
+            (i["ref"], i["room_id"], i["lecturer_id"], i["day"], i["start"], i["end"])
+        )
+
+    out = []
+    for semester, rows in by_semester.items():
+        room_rows = [(r[0], r[1], r[3], r[4], r[5]) for r in rows]
+        lec_rows = [(r[0], r[2], r[3], r[4], r[5]) for r in rows]
+        for rec in list(_sweep(room_rows, "room", "room_id")) + list(_sweep(lec_rows, "lecturer", "lecturer_id")):
+            if any(x in new_refs for x in rec["entry_ids"]):
+                rec["semester"] = semester
+                out.append(rec)
+    return out
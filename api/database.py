@@ -1,10 +1,22 @@
+import logging
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from typing import Union
+from fastapi import Depends, HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
+from . import metrics
+
 load_dotenv()
 
+log = logging.getLogger("api.database")
 
 raw_url = os.getenv("DATABASE_URL")
 
@@ -18,18 +30,271 @@ else:
     db_url = raw_url.replace("postgres://", "postgresql://", 1)
 
 
+# ---------------------------------------------------------
+# Engine profiles (DB_PROFILE)
+# ---------------------------------------------------------
+# serverless: one short-lived instance per invocation (Vercel). No pool kept
+#   in the process (NullPool); point DATABASE_URL at an external pooler
+#   (PgBouncer in transaction mode) to reuse server connections. psycopg2
+#   never uses server-side prepared statements, so that mode is safe.
+# pooled: long-running workers (uvicorn/gunicorn). Sized QueuePool with
+#   recycle; disconnects are handled optimistically (a dropped connection
+#   fails one statement and invalidates the pool) instead of pinging the
+#   server on every checkout. DB_PRE_PING=1 restores the old behaviour.
+# auto (default): serverless when running on Vercel, pooled otherwise.
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _profile() -> str:
+    p = os.getenv("DB_PROFILE", "auto").strip().lower()
+    if p == "auto":
+        return "serverless" if os.getenv("VERCEL") else "pooled"
+    if p not in ("serverless", "pooled"):
+        raise ValueError(f"Unknown DB_PROFILE: {p}")
+    return p
+
+
+class _TimedCheckout:
+    """Records how long callers wait for a connection from the pool."""
+    metric_prefix = "db_pool"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.inc(f"{self.metric_prefix}.checkouts")
+            metrics.inc(f"{self.metric_prefix}.checkout_wait_seconds", time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metric_prefix = "db_pool.async"
+
+
+class TimedAsyncNullPool(_TimedCheckout, NullPool):
+    metric_prefix = "db_pool.async"
+
+
+def instrument_pool(engine, prefix: str):
+    """Connection counters and pool gauges under prefix (the sync engine of an async one)."""
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        metrics.inc(f"{prefix}.connections_opened")
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_conn, record):
+        metrics.inc(f"{prefix}.connections_closed")
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(ctx):
+        if ctx.is_disconnect:
+            metrics.inc(f"{prefix}.disconnects")
+
+    if isinstance(engine.pool, QueuePool):
+        metrics.gauge(f"{prefix}.size", engine.pool.size)
+        metrics.gauge(f"{prefix}.checked_out", engine.pool.checkedout)
+        metrics.gauge(f"{prefix}.checked_in", engine.pool.checkedin)
+        metrics.gauge(f"{prefix}.overflow", engine.pool.overflow)
+
+
+DB_PROFILE = _profile()
+is_postgres = db_url.startswith("postgresql")
+
+connect_args = {}
+if is_postgres:
+    connect_args["sslmode"] = "require"
+    connect_args["connect_timeout"] = _env_int("DB_CONNECT_TIMEOUT", 10)
+    if DB_PROFILE == "pooled":
+        # detect half-open TCP connections without a per-checkout ping
+        connect_args.update(keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+
+if DB_PROFILE == "serverless":
+    engine_kwargs = dict(poolclass=TimedNullPool)
+else:
+    engine_kwargs = dict(
+        poolclass=TimedQueuePool,
+        pool_size=_env_int("DB_POOL_SIZE", 5),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+        pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+        pool_use_lifo=True,
+    )
+
 engine = create_engine(
     db_url,
-    pool_pre_ping=True,
-    connect_args={"sslmode": "require"} if "postgresql" in db_url else {}
+    pool_pre_ping=os.getenv("DB_PRE_PING", "0").lower() in ("1", "true", "yes"),
+    connect_args=connect_args,
+    **engine_kwargs
 )
 
+
+instrument_pool(engine, "db_pool")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+# ---------------------------------------------------------
+# Async stack (DB_ASYNC=1)
+# ---------------------------------------------------------
+# The read-heavy routers (schedule, offered_modules, modules, lecturers,
+# rooms, groups) serve GETs from one async def handler each, written against
+# get_read_db: an AsyncSession when DB_ASYNC=1, otherwise the request's sync
+# Session behind the same execute/run_sync calls (ThreadedSession). Writes
+# always use the sync stack above, so both engines coexist and the two modes
+# can be compared under the same load.
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+
+
+def _async_url(url: str):
+    u = make_url(url)
+    if u.drivername.startswith("postgresql"):
+        # asyncpg takes ssl via connect_args, not the libpq sslmode parameter
+        return u.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    if u.drivername.startswith("sqlite"):
+        return u.set(drivername="sqlite+aiosqlite")
+    return u
+
+
+async_engine = None
+AsyncSessionLocal = None
+AsyncSyncSessionLocal = None  # the sync sessions behind AsyncSessionLocal (event target)
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_connect_args = {}
+    if is_postgres:
+        async_connect_args["ssl"] = "require"
+        async_connect_args["timeout"] = _env_int("DB_CONNECT_TIMEOUT", 10)
+        if DB_PROFILE == "serverless":
+            # transaction-mode poolers cannot keep asyncpg's prepared statements
+            async_connect_args["statement_cache_size"] = 0
+            async_connect_args["prepared_statement_cache_size"] = 0
+
+    if DB_PROFILE == "serverless":
+        async_engine_kwargs = dict(poolclass=TimedAsyncNullPool)
+    else:
+        async_engine_kwargs = dict(
+            poolclass=TimedAsyncQueuePool,
+            pool_size=_env_int("DB_POOL_SIZE", 5),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", 10),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT", 30),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+            pool_use_lifo=True,
+        )
+
+    async_engine = create_async_engine(
+        _async_url(db_url),
+        pool_pre_ping=os.getenv("DB_PRE_PING", "0").lower() in ("1", "true", "yes"),
+        connect_args=async_connect_args,
+        **async_engine_kwargs
+    )
+
+    instrument_pool(async_engine.sync_engine, "db_pool.async")
+
+    AsyncSyncSessionLocal = sessionmaker()
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False,
+                                           sync_session_class=AsyncSyncSessionLocal)
+
+
+# ---------------------------------------------------------
+# Schema management (SCHEMA_MODE)
+# ---------------------------------------------------------
+# startup: create tables + migrate while api/index.py is imported (old behaviour)
+# lazy (default): do it once per process, on the first request that uses the DB;
+#   a failed attempt answers 503 and is retried by the next request
+# cli: never at runtime; run `python -m api.manage migrate` as a deploy step
+SCHEMA_MODE = os.getenv("SCHEMA_MODE", "lazy").strip().lower()
+if SCHEMA_MODE not in ("startup", "lazy", "cli"):
+    raise ValueError(f"Unknown SCHEMA_MODE: {SCHEMA_MODE}")
+
+_schema_ready = SCHEMA_MODE == "cli"
+_schema_lock = threading.Lock()
+
+
+def ensure_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        from .manage import migrate
+        try:
+            migrate()
+        except Exception:
+            log.exception("Schema setup failed")
+            raise
+        _schema_ready = True
+
+
+def _require_schema():
+    try:
+        ensure_schema()
+    except Exception:
+        raise HTTPException(status_code=503, detail="Database schema is not ready, try again")
+
+
 def get_db():
+    _require_schema()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def stream_rows(stmt, batch_size: int = 1000):
+    """Iterate a SELECT through a server-side cursor on a dedicated session.
+
+    For StreamingResponse bodies: the request's own session may be closed
+    before the body has been fully sent.
+    """
+    db = SessionLocal()
+    try:
+        for row in db.execute(stmt.execution_options(yield_per=batch_size)):
+            yield row
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    if not _schema_ready:
+        await run_in_threadpool(_require_schema)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class ThreadedSession:
+    """The AsyncSession calls read handlers use, served by a sync Session on the threadpool.
+
+    Results are fetched completely in the worker thread (frozen), so the
+    handler can consume them on the event loop.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    async def execute(self, stmt):
+        return await run_in_threadpool(lambda: self.db.execute(stmt).freeze()())
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.db, *args, **kwargs)
+
+
+ReadSession = Union[AsyncSession, ThreadedSession]
+
+if DB_ASYNC:
+    get_read_db = get_async_db
+else:
+    def get_read_db(db: Session = Depends(get_db)) -> ThreadedSession:
+        return ThreadedSession(db)
@@ -0,0 +1,84 @@
+# api/hashing.py
+#
+# bcrypt runs on a dedicated, size-limited thread pool so a burst of logins
+# cannot occupy FastAPI's shared threadpool. bcrypt releases the GIL, so
+# HASH_WORKERS threads use that many cores. At most HASH_QUEUE_LIMIT jobs may
+# wait for a worker; beyond that callers get a 503 instead of piling up.
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from . import metrics
+from .auth import pwd_context
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_LIMIT)
+_state_lock = threading.Lock()
+_pending = 0  # submitted, not finished (running + queued)
+_running = 0
+
+
+def _queued() -> int:
+    with _state_lock:
+        return max(0, _pending - _running)
+
+
+def _running_count() -> int:
+    with _state_lock:
+        return _running
+
+
+metrics.gauge("hash_pool.queued", _queued)
+metrics.gauge("hash_pool.running", _running_count)
+metrics.gauge("hash_pool.workers", lambda: HASH_WORKERS)
+
+
+def _run(fn, *args):
+    global _running
+    with _state_lock:
+        _running += 1
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        metrics.inc("hash_pool.cpu_seconds", time.perf_counter() - started)
+        metrics.inc("hash_pool.completed")
+        with _state_lock:
+            _running -= 1
+
+
+def _submit(fn, *args):
+    global _pending
+    if not _slots.acquire(blocking=False):
+        metrics.inc("hash_pool.rejected")
+        raise HTTPException(status_code=503, detail="Too many login attempts in progress, retry shortly",
+                            headers={"Retry-After": "1"})
+    with _state_lock:
+        _pending += 1
+
+    def done(_):
+        global _pending
+        with _state_lock:
+            _pending -= 1
+        _slots.release()
+
+    future = _executor.submit(_run, fn, *args)
+    future.add_done_callback(done)
+    return future
+
+
+async def verify_and_update(plain_password: str, hashed_password: str):
+    """-> (ok, new_hash). new_hash is set when the stored hash uses outdated parameters."""
+    return await asyncio.wrap_future(_submit(pwd_context.verify_and_update, plain_password, hashed_password))
+
+
+def hash_password(password: str) -> str:
+    """Blocking variant for sync code paths (still bounded by the pool)."""
+    return _submit(pwd_context.hash, password).result()
@@ -0,0 +1,116 @@
+# api/ics.py
+#
+# iCalendar (RFC 5545) rendering of weekly schedule entries. Each entry
+# becomes one VEVENT recurring weekly from the first matching weekday on or
+# after Semester.start_date until Semester.end_date.
+#
+# Times are floating (wall-clock) unless ICS_TIMEZONE names an IANA zone, in
+# which case DTSTART/DTEND carry that TZID and UNTIL is given in UTC.
+import datetime
+import os
+from typing import Iterable, Iterator, Optional
+
+from .timeslots import day_index, try_parse_time
+
+ICS_TIMEZONE = os.getenv("ICS_TIMEZONE", "")
+ICS_UID_DOMAIN = os.getenv("ICS_UID_DOMAIN", "study-program-backend")
+PRODID = "-//Study Program Backend//Schedule//EN"
+
+
+def _escape(value) -> str:
+    s = str(value if value is not None else "")
+    return (
+        s.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Content lines are at most 75 octets; continuation lines start with a space."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while raw:
+        cut = min(limit, len(raw))
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:  # never split a UTF-8 sequence
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _local(d: datetime.date, minutes: int) -> str:
+    return f"{d:%Y%m%d}T{minutes // 60:02d}{minutes % 60:02d}00"
+
+
+def _until(end_date: datetime.date) -> str:
+    last = datetime.datetime.combine(end_date, datetime.time(23, 59, 59))
+    if not ICS_TIMEZONE:
+        return f"{last:%Y%m%dT%H%M%S}"
+    from zoneinfo import ZoneInfo
+    utc = last.replace(tzinfo=ZoneInfo(ICS_TIMEZONE)).astimezone(datetime.timezone.utc)
+    return f"{utc:%Y%m%dT%H%M%S}Z"
+
+
+def first_occurrence(start_date: datetime.date, day: int) -> datetime.date:
+    return start_date + datetime.timedelta(days=(day - start_date.weekday()) % 7)
+
+
+def render(
+    entries: Iterable[dict],
+    semester_start: datetime.date,
+    semester_end: datetime.date,
+    calendar_name: str,
+) -> Iterator[str]:
+    """Yield the calendar piece by piece (header, one chunk per event, footer)."""
+    tz = f";TZID={ICS_TIMEZONE}" if ICS_TIMEZONE else ""
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    until = _until(semester_end)
+
+    yield "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(calendar_name)}",
+    ) + ((f"X-WR-TIMEZONE:{ICS_TIMEZONE}",) if ICS_TIMEZONE else ()))
+
+    for e in entries:
+        day = day_index(e["day_of_week"])
+        start, end = try_parse_time(e["start_time"]), try_parse_time(e["end_time"])
+        if day is None or start is None or end is None or end <= start:
+            continue
+        first = first_occurrence(semester_start, day)
+        if first > semester_end:
+            continue
+        yield "".join(_fold(line) for line in (
+            "BEGIN:VEVENT",
+            f"UID:schedule-{e['id']}@{ICS_UID_DOMAIN}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART{tz}:{_local(first, start)}",
+            f"DTEND{tz}:{_local(first, end)}",
+            f"RRULE:FREQ=WEEKLY;UNTIL={until}",
+            f"SUMMARY:{_escape(e['module_name'])}",
+            f"LOCATION:{_escape(e['room_name'])}",
+            f"DESCRIPTION:{_escape('Lecturer: ' + str(e['lecturer_name']))}",
+            "END:VEVENT",
+        ))
+
+    yield _fold("END:VCALENDAR")
+
+
+def calendar_name(semester: str, lecturer_id: Optional[int], room_id: Optional[int], group: Optional[str]) -> str:
+    if lecturer_id is not None:
+        return f"{semester} - lecturer {lecturer_id}"
+    if room_id is not None:
+        return f"{semester} - room {room_id}"
+    if group:
+        return f"{semester} - {group}"
+    return semester
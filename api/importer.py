@@ -0,0 +1,434 @@
+# api/importer.py
+#
+# Bulk import of master data from CSV/XLSX uploads.
+#
+# Rows are read lazily from the file, validated one by one with the same
+# Pydantic schemas as the single-row endpoints, and upserted in chunks of
+# CHUNK_SIZE inside one transaction. Every chunk is written in a SAVEPOINT;
+# if the database rejects it, the chunk is replayed row by row so that only
+# the offending rows are reported. Invalid rows never abort the import.
+#
+# Plain-column tables (Resource.bulk) are written with ORM bulk INSERT and
+# bulk UPDATE by primary key: one executemany per chunk and column set on
+# every dialect, where flushing objects would send one INSERT ... RETURNING
+# per new row on SQLite. Those bypass the unit of work, so the table's
+# version counter is bumped explicitly. Modules keep the per-object path
+# for their specialization and assessment collections.
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, selectinload
+
+from . import models, schemas, versions
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+# ---------------------------------------------------------
+# Readers: uploaded file -> iterator of (row number, {column: value})
+# ---------------------------------------------------------
+def _clean(raw: dict) -> dict:
+    out = {}
+    for k, v in raw.items():
+        if k is None:
+            continue
+        key = str(k).strip()
+        if isinstance(v, str):
+            v = v.strip()
+        if key and v is not None and v != "":
+            out[key] = v
+    return out
+
+
+def read_csv(fileobj) -> Iterator[Tuple[int, dict]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    for i, raw in enumerate(csv.DictReader(text), start=2):  # row 1 is the header
+        yield i, _clean(raw)
+
+
+def read_xlsx(fileobj) -> Iterator[Tuple[int, dict]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(status_code=400, detail="XLSX import requires the 'openpyxl' package; upload CSV instead")
+    try:
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable XLSX file: {e}")
+    rows = wb.active.iter_rows(values_only=True)
+    header = next(rows, None)
+    if not header:
+        return
+    header = [str(h).strip() if h is not None else None for h in header]
+    for i, values in enumerate(rows, start=2):
+        yield i, _clean(dict(zip(header, values)))
+
+
+def reader_for(filename: str) -> Callable:
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return read_xlsx
+    if name.endswith(".csv"):
+        return read_csv
+    raise HTTPException(status_code=400, detail="Upload a .csv or .xlsx file")
+
+
+# ---------------------------------------------------------
+# Resources
+# ---------------------------------------------------------
+def _int_list(value) -> List[int]:
+    if isinstance(value, (int, float)):
+        return [int(value)]
+    s = str(value).strip()
+    if s.startswith("["):
+        return [int(x) for x in json.loads(s)]
+    return [int(x) for x in s.replace(",", ";").split(";") if x.strip()]
+
+
+def _assessments(value) -> List[dict]:
+    """JSON list, or "Exam:60;Project:40" / "Exam;Project"."""
+    s = str(value).strip()
+    if s.startswith("["):
+        return json.loads(s)
+    out = []
+    for part in s.split(";"):
+        if not part.strip():
+            continue
+        t, _, w = part.partition(":")
+        out.append({"type": t.strip(), "weight": int(w) if w.strip() else None})
+    return out
+
+
+class Resource:
+    """How one master table is validated, keyed and written."""
+    model = None
+    schema = None
+    key_field = None
+    bulk = True  # validated data maps 1:1 onto columns; False when apply() touches relationships
+
+    def __init__(self, db: Session, perms):
+        self.db = db
+        self.perms = perms
+
+    def authorize(self):
+        self.perms.require_admin_or_pm()
+
+    def prepare(self, raw: dict) -> dict:
+        """raw strings -> schema input (list/JSON columns are decoded here)."""
+        return raw
+
+    def validate(self, raw: dict) -> dict:
+        """-> column values to write (only the columns present in the file)."""
+        payload = self.schema(**self.prepare(raw))
+        return payload.model_dump(exclude_unset=True)
+
+    def key_of(self, data: dict):
+        return data.get(self.key_field)
+
+    def existing(self, keys: List) -> Dict:
+        column = getattr(self.model, self.key_field)
+        return {getattr(r, self.key_field): r for r in self.db.query(self.model).filter(column.in_(keys)).all()}
+
+    def apply(self, row, data: dict):
+        for k, v in data.items():
+            setattr(row, k, v)
+
+    def can_create(self, key, found: Dict) -> bool:
+        return True
+
+    def create(self, data: dict):
+        row = self.model()
+        self.apply(row, data)
+        return row
+
+
+class RoomResource(Resource):
+    model = models.Room
+    schema = schemas.RoomCreate
+    key_field = "name"
+
+
+class GroupResource(Resource):
+    model = models.Group
+    schema = schemas.GroupCreate
+    key_field = "name"
+
+    def authorize(self):
+        if not (self.perms.is_admin_or_pm or self.perms.role == "hosp"):
+            raise HTTPException(status_code=403, detail="Not allowed")
+
+    def validate(self, raw: dict) -> dict:
+        data = super().validate(raw)
+        if self.perms.role == "hosp" and not self.perms.group_payload_in_domain(data.get("program")):
+            raise ValueError("Unauthorized for this program")
+        return data
+
+
+class LecturerResource(Resource):
+    """Keyed by id when given, otherwise by mdh_email; rows with neither are always inserted."""
+    model = models.Lecturer
+    schema = schemas.LecturerCreate
+
+    def __init__(self, db: Session, perms):
+        super().__init__(db, perms)
+        self.domain_ids = {d for (d,) in db.query(models.Domain.id).all()}
+
+    def validate(self, raw: dict) -> dict:
+        data = super().validate(raw)
+        if "id" in raw:
+            data["id"] = int(raw["id"])
+        if data.get("domain_id") is not None and data["domain_id"] not in self.domain_ids:
+            raise ValueError("Invalid domain_id")
+        return data
+
+    def key_of(self, data: dict):
+        if data.get("id") is not None:
+            return ("id", data["id"])
+        if data.get("mdh_email"):
+            return ("mdh_email", data["mdh_email"].lower())
+        return None
+
+    def existing(self, keys: List) -> Dict:
+        ids = [v for k, v in keys if k == "id"]
+        emails = [v for k, v in keys if k == "mdh_email"]
+        out = {}
+        if ids:
+            for r in self.db.query(models.Lecturer).filter(models.Lecturer.id.in_(ids)).all():
+                out[("id", r.id)] = r
+        if emails:
+            q = self.db.query(models.Lecturer).filter(func.lower(models.Lecturer.mdh_email).in_(emails))
+            for r in q.all():
+                out[("mdh_email", r.mdh_email.lower())] = r
+        return out
+
+    def can_create(self, key, found: Dict) -> bool:
+        # explicit ids must refer to existing lecturers (ids are never chosen by the file)
+        return key is None or key[0] != "id" or key in found
+
+
+class ModuleResource(Resource):
+    model = models.Module
+    schema = schemas.ModuleCreate
+    key_field = "module_code"
+    bulk = False
+
+    def __init__(self, db: Session, perms):
+        super().__init__(db, perms)
+        self.program_ids = {p for (p,) in db.query(models.StudyProgram.id).all()}
+        self.specializations = {s.id: s for s in db.query(models.Specialization).all()}
+
+    def authorize(self):
+        if not (self.perms.is_admin_or_pm or self.perms.role == "hosp"):
+            raise HTTPException(status_code=403, detail="Not allowed")
+
+    def prepare(self, raw: dict) -> dict:
+        raw = dict(raw)
+        if "specialization_ids" in raw:
+            raw["specialization_ids"] = _int_list(raw["specialization_ids"])
+        if "assessment_breakdown" in raw:
+            raw["assessment_breakdown"] = _assessments(raw["assessment_breakdown"])
+        return raw
+
+    def validate(self, raw: dict) -> dict:
+        from .routers.modules import _normalize_assessments
+
+        data = super().validate(raw)
+        program_id = data.get("program_id")
+        if program_id is not None and program_id not in self.program_ids:
+            raise ValueError(f"Unknown program_id {program_id}")
+        if not self.perms.is_admin_or_pm:
+            if program_id is None:
+                raise ValueError("program_id is required")
+            if program_id not in self.perms.hosp_program_ids():
+                raise ValueError("Unauthorized for this program")
+
+        spec_ids = data.pop("specialization_ids", None)
+        if spec_ids is not None:
+            unknown = sorted(set(spec_ids) - self.specializations.keys())
+            if unknown:
+                raise ValueError(f"Unknown specialization_ids {unknown}")
+            data["specializations"] = spec_ids
+        breakdown = data.pop("assessment_breakdown", None)
+        if breakdown is not None:
+            try:
+                normalized = _normalize_assessments(breakdown)
+            except HTTPException as e:
+                raise ValueError(e.detail)
+            data["assessments"] = normalized
+        return data
+
+    def existing(self, keys: List) -> Dict:
+        rows = (
+            self.db.query(models.Module)
+            .filter(models.Module.module_code.in_(keys))
+            .options(selectinload(models.Module.specializations), selectinload(models.Module.assessments))
+            .all()
+        )
+        return {r.module_code: r for r in rows}
+
+    def apply(self, row, data: dict):
+        from .routers.modules import _set_assessments
+
+        for k, v in data.items():
+            if k == "specializations":
+                row.specializations = [self.specializations[i] for i in v]
+            elif k == "assessments":
+                _set_assessments(row, v)
+            else:
+                setattr(row, k, v)
+
+
+RESOURCES = {
+    "modules": ModuleResource,
+    "lecturers": LecturerResource,
+    "rooms": RoomResource,
+    "groups": GroupResource,
+}
+
+
+# ---------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------
+def _error_messages(e: Exception) -> List[str]:
+    if isinstance(e, ValidationError):
+        return [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+    return [str(e)]
+
+
+class ImportReport:
+    def __init__(self, resource: str, dry_run: bool):
+        self.resource = resource
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line, "errors": messages})
+
+    def as_dict(self) -> dict:
+        return {
+            "resource": self.resource,
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _write_chunk(res: Resource, chunk: List[Tuple[int, dict]], report: ImportReport):
+    keys = [k for k in (res.key_of(d) for _, d in chunk) if k is not None]
+    found = res.existing(keys) if keys else {}
+
+    def write(items: List[Tuple[int, dict]]) -> Tuple[int, int]:
+        creates, updates = [], []
+        for _, data in items:
+            key = res.key_of(data)
+            row = found.get(key) if key is not None else None
+            if row is None:
+                creates.append(data)
+            else:
+                updates.append((row, data))
+        if res.bulk:
+            if creates:
+                res.db.execute(insert(res.model), creates)
+            if updates:
+                res.db.execute(update(res.model), [{**data, "id": row.id} for row, data in updates])
+        else:
+            for data in creates:
+                res.db.add(res.create(data))
+            for row, data in updates:
+                res.apply(row, data)
+            res.db.flush()
+        return len(creates), len(updates)
+
+    missing = [(line, data) for line, data in chunk if not res.can_create(res.key_of(data), found)]
+    for line, data in missing:
+        report.error(line, [f"No existing row for {res.key_of(data)!r}"])
+    if missing:
+        chunk = [item for item in chunk if item not in missing]
+
+    created = updated = 0
+    try:
+        with res.db.begin_nested():
+            created, updated = write(chunk)
+    except SQLAlchemyError:
+        # replay the chunk one row per savepoint to pinpoint the failing rows
+        for line, data in chunk:
+            try:
+                with res.db.begin_nested():
+                    c, u = write([(line, data)])
+                created += c
+                updated += u
+            except SQLAlchemyError as e:
+                report.error(line, [str(getattr(e, "orig", e)).strip().splitlines()[0]])
+
+    if res.bulk and (created or updated):
+        versions.bump(res.db, res.model.__tablename__)
+    report.created += created
+    report.updated += updated
+
+
+def _begin(db: Session):
+    conn = db.connection()
+    if conn.dialect.name == "sqlite" and not conn.connection.dbapi_connection.in_transaction:
+        # pysqlite opens no transaction around SAVEPOINT, so releasing a chunk's
+        # savepoint would commit it (and a dry run could not roll back)
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def run_import(db: Session, perms, resource: str, rows: Iterator[Tuple[int, dict]], dry_run: bool) -> dict:
+    if resource not in RESOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown resource. Use one of: {sorted(RESOURCES)}")
+    res = RESOURCES[resource](db, perms)
+    res.authorize()
+
+    report = ImportReport(resource, dry_run)
+    _begin(db)
+    seen: Dict = {}
+    chunk: List[Tuple[int, dict]] = []
+    try:
+        for line, raw in rows:
+            if not raw:
+                continue  # blank line
+            report.rows += 1
+            try:
+                data = res.validate(raw)
+            except (ValidationError, ValueError, TypeError) as e:
+                report.error(line, _error_messages(e))
+                continue
+            key = res.key_of(data)
+            if key is not None:
+                if key in seen:
+                    report.error(line, [f"Duplicate key {key!r} (first seen on row {seen[key]})"])
+                    continue
+                seen[key] = line
+            chunk.append((line, data))
+            if len(chunk) >= CHUNK_SIZE:
+                _write_chunk(res, chunk, report)
+                chunk = []
+        if chunk:
+            _write_chunk(res, chunk, report)
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Unreadable file: {e}")
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+    return report.as_dict()
@@ -1,48 +1,126 @@
 # api/index.py
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from . import startup
+
+with startup.step("import fastapi"):
+    from fastapi import Depends, FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
 import datetime
+import importlib
+import os
+import threading
+
+with startup.step("import database"):
+    from . import database, metrics, querystats
+
+with startup.step("import models"):
+    from . import models, versions
+
+with startup.step("import auth"):
+    from . import auth, permissions
+
+# (module, URL prefixes it serves); registration order is significant for overlapping paths
+ROUTERS = [
+    ("dev", ("/seed",)),
+    ("auth_routes", ("/auth",)),
+    ("programs", ("/study-programs",)),
+    ("domains", ("/domains",)),
+    ("lecturers", ("/lecturers",)),
+    ("modules", ("/modules",)),
+    ("specializations", ("/specializations",)),
+    ("groups", ("/groups",)),
+    ("rooms", ("/rooms",)),
+    ("constraints", ("/scheduler-constraints",)),
+    ("availabilities", ("/availabilities",)),
+    ("semesters", ("/semesters",)),
+    ("offered_modules", ("/offered-modules",)),
+    ("schedule", ("/schedule",)),
+    ("export", ("/export",)),
+    ("imports", ("/import",)),
+]
+
+# ROUTER_LOADING=lazy (default): a router module is imported on the first
+# request under one of its prefixes (all of them for the OpenAPI docs), so a
+# cold start only pays for the routers it serves. eager: import all of them here.
+ROUTER_LOADING = os.getenv("ROUTER_LOADING", "lazy").strip().lower()
+if ROUTER_LOADING not in ("lazy", "eager"):
+    raise ValueError(f"Unknown ROUTER_LOADING: {ROUTER_LOADING}")
+
 
-from .database import engine
-from . import models
-from .routers.dev import router as dev_router
-from .routers.auth_routes import router as auth_router
-from .routers.programs import router as programs_router
-from .routers.lecturers import router as lecturers_router
-from .routers.modules import router as modules_router
-from .routers.specializations import router as specializations_router
-from .routers.groups import router as groups_router
-from .routers.rooms import router as rooms_router
-from .routers.constraints import router as constraints_router
-from .routers.availabilities import router as availabilities_router
-from .routers.semesters import router as semesters_router
-from .routers.offered_modules import router as offered_modules_router
-from .routers.schedule import router as schedule_router
-
-# ✅ ADD THIS
-from .routers.domains import router as domains_router
-
-
-try:
-    models.Base.metadata.create_all(bind=engine)
-    print("✅ DB connected.")
-except Exception as e:
-    print("❌ DB Startup Error:", e)
+if database.SCHEMA_MODE == "startup":
+    with startup.step("schema"):
+        database.ensure_schema()
 
 app = FastAPI(title="Study Program Backend", root_path="/api")
 
+_loaded = set()
+_load_lock = threading.Lock()
+
+
+def _serves(prefixes, path: str) -> bool:
+    return any(path == p or path.startswith(p + "/") for p in prefixes)
+
+
+def load_routers(path=None):
+    """Include the routers serving path (every router when path is None), in ROUTERS order."""
+    with _load_lock:
+        for name, prefixes in ROUTERS:
+            if name in _loaded or (path is not None and not _serves(prefixes, path)):
+                continue
+            with startup.step(f"router {name}"):
+                module = importlib.import_module(f".routers.{name}", __package__)
+                app.include_router(module.router)
+            _loaded.add(name)
+
+
+class LazyRouters:
+    """ASGI middleware: loads the routers a request needs before it is routed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and len(_loaded) < len(ROUTERS):
+            path = scope["path"]
+            root = scope.get("root_path") or ""
+            if root and path.startswith(root):
+                path = path[len(root):]
+            load_routers(None if path in (app.openapi_url, app.docs_url, app.redoc_url) else path)
+        await self.app(scope, receive, send)
+
+
+if querystats.QUERY_STATS:
+    querystats.instrument(database.engine)
+    if database.async_engine is not None:
+        querystats.instrument(database.async_engine.sync_engine)
+    app.add_middleware(querystats.QueryStatsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Server-Timing"],
 )
 
+
+def _admin(current_user: models.User = Depends(auth.get_current_user)):
+    permissions.require_admin(current_user)
+
+
 @app.get("/")
 def root():
     return {"message": "Backend Online"}
 
+@app.get("/metrics", dependencies=[Depends(_admin)])
+def read_metrics():
+    return metrics.snapshot()
+
+@app.get("/startup", dependencies=[Depends(_admin)])
+def read_startup():
+    return {"schema_mode": database.SCHEMA_MODE, "router_loading": ROUTER_LOADING,
+            "routers_loaded": len(_loaded), **startup.report()}
+
 @app.get("/version")
 def check_version():
     return {
@@ -50,21 +128,9 @@ def check_version():
         "timestamp": str(datetime.datetime.now())
     }
 
-app.include_router(dev_router)
-app.include_router(auth_router)
-app.include_router(programs_router)
-
-# ✅ ADD THIS (before/after lecturers doesn't matter)
-app.include_router(domains_router)
-
-app.include_router(lecturers_router)
-app.include_router(modules_router)
-app.include_router(specializations_router)
-app.include_router(groups_router)
-app.include_router(rooms_router)
-app.include_router(constraints_router)
-app.include_router(availabilities_router)
-app.include_router(semesters_router)
+if ROUTER_LOADING == "eager":
+    load_routers()
+else:
+    app.add_middleware(LazyRouters)
 
-app.include_router(offered_modules_router)
-app.include_router(schedule_router)
+startup.mark_ready()
@@ -0,0 +1,29 @@
+# api/manage.py
+#
+# Schema management CLI:
+#   python -m api.manage migrate
+# Creates missing tables and applies api/migrations.py. Use it as a deploy
+# step together with SCHEMA_MODE=cli so cold starts never touch the schema.
+import sys
+
+from . import models, migrations
+from .database import engine
+
+
+def migrate():
+    models.Base.metadata.create_all(bind=engine)
+    migrations.run(engine)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["migrate"]:
+        print("usage: python -m api.manage migrate")
+        return 2
+    migrate()
+    print("✅ Schema up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
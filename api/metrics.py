@@ -0,0 +1,34 @@
+# api/metrics.py
+#
+# Minimal in-process metrics registry (per worker). Values are exposed as
+# JSON by GET /metrics; counters only grow, gauges are set or read through a
+# callback at snapshot time.
+import threading
+from typing import Callable, Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, Callable[[], float]] = {}
+
+
+def inc(name: str, value: float = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def gauge(name: str, fn: Callable[[], float]):
+    """Register a callback that returns the current value of a gauge."""
+    with _lock:
+        _gauges[name] = fn
+
+
+def snapshot() -> Dict[str, float]:
+    with _lock:
+        out = dict(_counters)
+        gauges = list(_gauges.items())
+    for name, fn in gauges:
+        try:
+            out[name] = fn()
+        except Exception:
+            out[name] = None
+    return dict(sorted(out.items()))
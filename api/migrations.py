@@ -0,0 +1,148 @@
+# api/migrations.py
+#
+# create_all() only creates missing tables. Columns and indexes added to
+# existing tables are applied here, idempotently, right after it.
+import json
+
+from sqlalchemy import Integer, LargeBinary, SmallInteger, inspect, text
+from sqlalchemy.orm import Session
+
+from . import models
+from .timeslots import DAY_INDEX, DAYS, encode_week, try_parse_time
+
+# (table, column, SQLAlchemy type)
+ADDED_COLUMNS = [
+    ("schedule_entries", "start_minute", Integer()),
+    ("schedule_entries", "end_minute", Integer()),
+    ("schedule_entries", "day_number", SmallInteger()),
+    ("lecturer_availabilities", "week_bitmap", LargeBinary()),
+    ("users", "token_version", Integer()),
+]
+
+
+def _add_missing_columns(conn):
+    insp = inspect(conn)
+    tables = set(insp.get_table_names())
+    for table, column, type_ in ADDED_COLUMNS:
+        if table not in tables:
+            continue
+        existing = {c["name"] for c in insp.get_columns(table)}
+        if column not in existing:
+            ddl = type_.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl}'))
+
+
+def _create_missing_indexes(conn):
+    for table in models.Base.metadata.sorted_tables:
+        for idx in table.indexes:
+            idx.create(bind=conn, checkfirst=True)
+
+
+def _backfill_schedule_minutes(conn):
+    rows = conn.execute(text(
+        "SELECT id, start_time, end_time FROM schedule_entries "
+        "WHERE start_minute IS NULL OR end_minute IS NULL"
+    )).fetchall()
+    params = [
+        {"id": r[0], "s": try_parse_time(r[1]), "e": try_parse_time(r[2])}
+        for r in rows
+    ]
+    if params:
+        conn.execute(
+            text("UPDATE schedule_entries SET start_minute = :s, end_minute = :e WHERE id = :id"),
+            params,
+        )
+
+
+# indexes superseded by day_number ones; checkfirst only ever adds, so drop these by name
+REPLACED_INDEXES = ["ix_schedule_entries_day_slot", "ix_schedule_entries_room_slot"]
+
+
+def _drop_replaced_indexes(conn):
+    for name in REPLACED_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def _backfill_schedule_days(conn):
+    # also revisits rows marked unreadable (len(DAYS)), in case DAY_INDEX learnt their spelling since
+    whens = " ".join(f"WHEN '{name}' THEN {i}" for name, i in DAY_INDEX.items())
+    conn.execute(text(
+        f"UPDATE schedule_entries SET day_number = CASE lower(trim(day_of_week)) {whens} ELSE {len(DAYS)} END "
+        f"WHERE day_number IS NULL OR day_number = {len(DAYS)}"
+    ))
+
+
+def _backfill_week_bitmaps(conn):
+    db = Session(bind=conn)
+    rows = (
+        db.query(models.LecturerAvailability)
+        .filter(models.LecturerAvailability.week_bitmap.is_(None))
+        .all()
+    )
+    for row in rows:
+        bitmap = encode_week(row.schedule_data)
+        if bitmap is not None:
+            row.week_bitmap = bitmap
+    db.flush()
+    db.close()
+
+
+def _legacy_assessments(value):
+    # modules.assessment_type used to hold JSON: a list of {type, weight} or
+    # {"assessments": [...], "lecturer_assignments": [...]}; plain labels stay
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(parsed, dict):
+        parsed = parsed.get("assessments") or []
+    if not isinstance(parsed, list):
+        return None
+    items = []
+    for x in parsed:
+        t = str(x.get("type") or "").strip() if isinstance(x, dict) else ""
+        if not t:
+            continue
+        try:
+            w = int(x["weight"]) if x.get("weight") is not None else None
+        except (TypeError, ValueError):
+            w = None
+        items.append((t, w))
+    return items
+
+
+def _move_module_assessments(conn):
+    rows = conn.execute(text(
+        "SELECT module_code, assessment_type FROM modules "
+        "WHERE assessment_type LIKE '%[%' OR assessment_type LIKE '%{%'"
+    )).fetchall()
+    parts, labels = [], []
+    for code, value in rows:
+        items = _legacy_assessments(value)
+        if items is None:
+            continue
+        for pos, (t, w) in enumerate(items):
+            parts.append({"m": code, "p": pos, "t": t, "k": t.lower(), "w": w})
+        labels.append({"m": code, "a": items[0][0] if items else None})
+    if labels:
+        conn.execute(
+            text("DELETE FROM module_assessments WHERE module_code = :m"), [{"m": x["m"]} for x in labels]
+        )
+    if parts:
+        conn.execute(text(
+            "INSERT INTO module_assessments (module_code, position, type, type_key, weight) "
+            "VALUES (:m, :p, :t, :k, :w)"
+        ), parts)
+    if labels:
+        conn.execute(text("UPDATE modules SET assessment_type = :a WHERE module_code = :m"), labels)
+
+
+def run(engine):
+    with engine.begin() as conn:
+        _add_missing_columns(conn)
+        _drop_replaced_indexes(conn)
+        _create_missing_indexes(conn)
+        _backfill_schedule_minutes(conn)
+        _backfill_schedule_days(conn)
+        _backfill_week_bitmaps(conn)
+        _move_module_assessments(conn)
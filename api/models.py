@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Text, JSON, TIMESTAMP, Table
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, Date, ForeignKey, Text, JSON, TIMESTAMP, Table, Index, LargeBinary
+from sqlalchemy.orm import relationship, declarative_base, validates
 from sqlalchemy.sql import func
 
+from .timeslots import day_number
+
 Base = declarative_base()
 
 # Association Table for Many-to-Many relationship between Modules and Specializations
@@ -27,6 +29,7 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     role = Column(String(20), nullable=False)  # admin, pm, hosp, lecturer, student
     lecturer_id = Column(Integer, ForeignKey("lecturers.ID"), nullable=True)
+    token_version = Column(Integer, nullable=True, default=0)  # bumped to revoke issued tokens
 
     lecturer_profile = relationship("Lecturer")
 
@@ -92,6 +95,29 @@ class Module(Base):
 
     specializations = relationship("Specialization", secondary=module_specializations, back_populates="modules")
     lecturers = relationship("Lecturer", secondary=lecturer_modules, back_populates="modules")
+    assessments = relationship(
+        "ModuleAssessment", order_by="ModuleAssessment.position", cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        Index("ix_modules_program_id", "program_id"),
+    )
+
+
+class ModuleAssessment(Base):
+    """One part of a module's assessment breakdown (e.g. "Oral Exam", 40%)."""
+    __tablename__ = "module_assessments"
+    id = Column(Integer, primary_key=True)
+    module_code = Column(String, ForeignKey("modules.module_code", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    type = Column(String, nullable=False)
+    type_key = Column(String, nullable=False)  # lower(type), for case-insensitive filtering
+    weight = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_module_assessments_module", "module_code", "position"),
+        Index("ix_module_assessments_type", "type_key", "module_code"),
+    )
 
 
 class Specialization(Base):
@@ -134,6 +160,9 @@ class LecturerAvailability(Base):
     id = Column(Integer, primary_key=True, index=True)
     lecturer_id = Column(Integer, ForeignKey("lecturers.ID", ondelete="CASCADE"), unique=True, nullable=False)
     schedule_data = Column(JSON, default={}, nullable=False)
+    # schedule_data normalized on write: 7 days x 96 quarter-hours (see timeslots.encode_week);
+    # NULL (like a lecturer without a row) means no restriction
+    week_bitmap = Column(LargeBinary, nullable=True)
 
 
 class SchedulerConstraint(Base):
@@ -176,6 +205,11 @@ class OfferedModule(Base):
     module = relationship("Module")
     lecturer = relationship("Lecturer")
 
+    __table_args__ = (
+        Index("ix_offered_modules_semester_lecturer", "semester", "lecturer_id"),
+        Index("ix_offered_modules_semester_module", "semester", "module_code"),
+    )
+
 
 class ScheduleEntry(Base):
     __tablename__ = "schedule_entries"
@@ -192,5 +226,44 @@ class ScheduleEntry(Base):
 
     semester = Column(String, nullable=False)
 
+    # start_time/end_time parsed once into minutes since midnight (used for overlap queries)
+    start_minute = Column(Integer, nullable=True)
+    end_minute = Column(Integer, nullable=True)
+    # day_of_week as a weekday ordinal (timeslots.day_number), so listings sort Monday..Sunday
+    day_number = Column(
+        SmallInteger, nullable=True,
+        default=lambda ctx: day_number(ctx.get_current_parameters().get("day_of_week")),
+    )
+
     offered_module = relationship("OfferedModule")
     room = relationship("Room")
+
+    __table_args__ = (
+        # overlap lookups (conflicts.py); per-day lookups without a room use the week-order index below
+        Index("ix_schedule_entries_room_day_slot", "semester", "day_number", "room_id", "start_minute"),
+        Index("ix_schedule_entries_semester_room", "semester", "room_id"),
+        Index("ix_schedule_entries_offered_module", "offered_module_id"),
+        # keyset order of GET /schedule/ (schedule_query); PostgreSQL needs NULLS FIRST declared, see below
+        Index("ix_schedule_entries_week_order", "semester", "day_number", "start_minute", "id").ddl_if(
+            callable_=lambda ddl, target, bind, **kw: kw["dialect"].name != "postgresql"
+        ),
+    )
+
+    @validates("day_of_week")
+    def _sync_day_number(self, key, value):
+        self.day_number = day_number(value)
+        return value
+
+
+Index(
+    "ix_schedule_entries_week_order_pg",
+    ScheduleEntry.semester, ScheduleEntry.day_number, ScheduleEntry.start_minute.asc().nulls_first(), ScheduleEntry.id,
+).ddl_if(dialect="postgresql")
+
+
+class TableVersion(Base):
+    """Per-table change counter, bumped on every flush that touches the table (api/versions.py)."""
+    __tablename__ = "table_versions"
+
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
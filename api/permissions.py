@@ -1,9 +1,13 @@
 # api/permissions.py
-from fastapi import HTTPException
+import os
+import threading
+import time
+from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Optional, Set, Tuple
 
-from . import models
+from . import models, auth
+from .database import get_db
 
 
 def role_of(user: models.User) -> str:
@@ -19,50 +23,108 @@ def require_admin_or_pm(user: models.User):
         raise HTTPException(status_code=403, detail="Admin/PM privileges required")
 
 
+def require_admin(user: models.User):
+    if role_of(user) != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+
 def require_lecturer_link(user: models.User) -> int:
     if user.lecturer_id is None:
         raise HTTPException(status_code=403, detail="User is not linked to a lecturer profile")
     return int(user.lecturer_id)
 
-def hosp_programs(db: Session, user: models.User) -> List[models.StudyProgram]:
-    lec_id = require_lecturer_link(user)
-    return (
-        db.query(models.StudyProgram)
-        .filter(models.StudyProgram.head_of_program_id == lec_id)
-        .all()
-    )
-
-
-def hosp_program_ids(db: Session, user: models.User) -> List[int]:
-    return [p.id for p in hosp_programs(db, user)]
-
-
-def check_is_hosp_for_program(user: models.User, program: models.StudyProgram):
-    r = role_of(user)
-    if r in ["admin", "pm"]:
-        return True
-    if r == "hosp":
-        if user.lecturer_id != program.head_of_program_id:
-            raise HTTPException(status_code=403, detail="Unauthorized for this program")
-        return True
-    raise HTTPException(status_code=403, detail="Access denied")
-
-def group_payload_in_hosp_domain(db: Session, user: models.User, program_field: Optional[str]) -> bool:
-    progs = hosp_programs(db, user)
-    val = (program_field or "").strip().lower()
-    allowed = set()
-    for p in progs:
-        allowed.add((p.name or "").strip().lower())
-        allowed.add((p.acronym or "").strip().lower())
-        allowed.add(str(p.id))
-    return val in allowed
-
-
-def group_is_in_hosp_domain(db: Session, user: models.User, group: models.Group) -> bool:
-    return group_payload_in_hosp_domain(db, user, group.program)
-
-def hosp_can_manage_constraint(db: Session, user: models.User, scope: str, target_id: Optional[int]) -> bool:
-    scope_norm = (scope or "").strip().lower()
-    if scope_norm == "program" and target_id is not None:
-        return target_id in hosp_program_ids(db, user)
-    return False
+
+# ---------------------------------------------------------
+# Request-scoped permission context
+# ---------------------------------------------------------
+# Resolved once per request (FastAPI caches dependencies), so the HoSP program
+# lookup runs at most once no matter how many checks an endpoint does.
+# Optionally the owned programs are also kept across requests for
+# PERMISSION_CACHE_TTL seconds; program writes call invalidate_program_owners().
+PERMISSION_CACHE_TTL = float(os.getenv("PERMISSION_CACHE_TTL", "0"))
+
+_owner_cache: Dict[int, Tuple[float, int, tuple]] = {}
+_owner_version = 0
+_owner_lock = threading.Lock()
+
+
+def invalidate_program_owners():
+    global _owner_version
+    with _owner_lock:
+        _owner_version += 1
+        _owner_cache.clear()
+
+
+class PermissionContext:
+    def __init__(self, db: Session, user: models.User):
+        self.db = db
+        self.user = user
+        self.role = role_of(user)
+        self.lecturer_id = user.lecturer_id
+        self._programs: Optional[tuple] = None
+
+    @property
+    def is_admin_or_pm(self) -> bool:
+        return self.role in ["admin", "pm"]
+
+    def require_admin_or_pm(self):
+        if not self.is_admin_or_pm:
+            raise HTTPException(status_code=403, detail="Admin/PM privileges required")
+
+    def _owned_programs(self) -> tuple:
+        """(id, name, acronym) of the programs headed by the user's lecturer profile."""
+        if self._programs is not None:
+            return self._programs
+        lec_id = require_lecturer_link(self.user)
+
+        if PERMISSION_CACHE_TTL > 0:
+            with _owner_lock:
+                hit = _owner_cache.get(lec_id)
+                version = _owner_version
+            if hit and hit[0] > time.monotonic() and hit[1] == version:
+                self._programs = hit[2]
+                return self._programs
+
+        rows = (
+            self.db.query(models.StudyProgram.id, models.StudyProgram.name, models.StudyProgram.acronym)
+            .filter(models.StudyProgram.head_of_program_id == lec_id)
+            .all()
+        )
+        self._programs = tuple((r[0], r[1], r[2]) for r in rows)
+
+        if PERMISSION_CACHE_TTL > 0:
+            with _owner_lock:
+                if version == _owner_version:
+                    _owner_cache[lec_id] = (time.monotonic() + PERMISSION_CACHE_TTL, version, self._programs)
+        return self._programs
+
+    def hosp_program_ids(self) -> Set[int]:
+        return {p[0] for p in self._owned_programs()}
+
+    def hosp_program_keys(self) -> Set[str]:
+        keys = set()
+        for pid, name, acronym in self._owned_programs():
+            keys.add((name or "").strip().lower())
+            keys.add((acronym or "").strip().lower())
+            keys.add(str(pid))
+        return keys
+
+    def group_payload_in_domain(self, program_field: Optional[str]) -> bool:
+        return (program_field or "").strip().lower() in self.hosp_program_keys()
+
+    def group_in_domain(self, group: models.Group) -> bool:
+        return self.group_payload_in_domain(group.program)
+
+    def can_manage_constraint(self, scope: str, target_id) -> bool:
+        scope_norm = (scope or "").strip().lower()
+        if scope_norm == "program" and target_id is not None:
+            try:
+                return int(target_id) in self.hosp_program_ids()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+def get_permissions(db: Session = Depends(get_db),
+                    current_user: models.User = Depends(auth.get_current_user)) -> PermissionContext:
+    return PermissionContext(db, current_user)
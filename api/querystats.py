@@ -0,0 +1,138 @@
+# api/querystats.py
+#
+# Per-request SQL instrumentation. Cursor events on the sync and async
+# engines count every statement executed while a request is in flight,
+# together with the time spent in the database and how often each
+# statement shape repeated. The totals go out as a Server-Timing header
+# and a JSON log line ("api.querystats" logger).
+#
+# QUERY_STATS=0 disables it. A request that runs one statement shape more
+# than QUERY_REPEAT_THRESHOLD times (the N+1 signature, e.g. a lazy load
+# per row) is logged as a warning; QUERY_LOG=all logs every request.
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from . import metrics
+
+QUERY_STATS = os.getenv("QUERY_STATS", "1").lower() in ("1", "true", "yes")
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "10"))
+QUERY_LOG = os.getenv("QUERY_LOG", "warn").strip().lower()
+
+log = logging.getLogger("api.querystats")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape: literals replaced by ?, whitespace collapsed."""
+    return _SPACES.sub(" ", _LITERALS.sub("?", statement)).strip()
+
+
+class RequestStats:
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.started = time.perf_counter()
+
+    def repeated(self, threshold: int):
+        """[(fingerprint, count)] for shapes run more than threshold times."""
+        merged: Counter = Counter()
+        for statement, n in self.shapes.items():
+            merged[fingerprint(statement)] += n
+        return [(s, n) for s, n in merged.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.statements} queries", '
+            f"app;dur={total:.1f}"
+        )
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("query_stats", default=None)
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def instrument(engine):
+    """Attach the cursor listeners to a (sync) Engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        if stats is None:
+            return
+        started = conn.info.get("query_started")
+        if started:
+            stats.db_seconds += time.perf_counter() - started.pop()
+        stats.statements += 1
+        stats.shapes[statement] += 1
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: opens a RequestStats per HTTP request and reports it."""
+
+    def __init__(self, app, threshold: int = QUERY_REPEAT_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = {}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self.report(scope, status.get("code"), stats)
+
+    def report(self, scope, status_code, stats: RequestStats):
+        metrics.inc("db.statements", stats.statements)
+        metrics.inc("db.seconds", stats.db_seconds)
+        repeated = stats.repeated(self.threshold)
+        if repeated:
+            metrics.inc("db.repeated_statement_warnings")
+        if not repeated and QUERY_LOG != "all":
+            return
+        record = {
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": status_code,
+            "statements": stats.statements,
+            "db_ms": round(stats.db_seconds * 1000, 1),
+            "total_ms": round((time.perf_counter() - stats.started) * 1000, 1),
+            "repeated": [{"statement": s[:300], "count": n} for s, n in repeated],
+        }
+        if repeated:
+            log.warning(json.dumps(record))
+        else:
+            log.info(json.dumps(record))
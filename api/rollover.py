@@ -0,0 +1,127 @@
+# api/rollover.py
+#
+# Semester rollover: copy a semester's offered modules (with their lecturer
+# assignments) and weekly timetable into another semester.
+#
+# Everything is set-based: one INSERT ... SELECT for the offers and one for
+# the schedule entries, which find their new offer by module_code. Offers
+# already present in the target are left alone (a module is offered once
+# per semester), and so are their timetables. The caller's session holds
+# the transaction.
+from sqlalchemy import and_, case, delete, exists, func, literal, not_, or_, select
+from sqlalchemy.orm import Session
+
+from . import models, versions
+
+_O = models.OfferedModule
+_E = models.ScheduleEntry
+
+# skipped module codes are listed up to this many per reason
+MAX_LISTED = 200
+
+
+def _codes(db: Session, stmt) -> list:
+    return list(db.execute(stmt.order_by(*stmt.selected_columns).limit(MAX_LISTED)).scalars())
+
+
+def _count(db: Session, stmt) -> int:
+    return db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+
+
+def clone_semester(db: Session, source: str, target: str, include_schedule: bool = True,
+                   skip_inactive_modules: bool = True, skip_inactive_rooms: bool = True,
+                   replace: bool = False) -> dict:
+    """Copy offers and timetable from the source to the target semester key; returns the report."""
+    report = {"source": source, "target": target, "replaced": None}
+    # semester keys whose timetable this call changes; their scoped counters are bumped at the end
+    touched = {target}
+
+    if replace:
+        target_offers = select(_O.id).where(_O.semester == target)
+        doomed = or_(_E.semester == target, _E.offered_module_id.in_(target_offers))
+        # entries of the target's offers may be filed under another semester key
+        touched.update(db.execute(select(_E.semester).where(doomed).distinct()).scalars())
+        removed_entries = db.execute(delete(_E).where(doomed)).rowcount
+        removed_offers = db.execute(delete(_O).where(_O.semester == target)).rowcount
+        report["replaced"] = {
+            "offered_modules": removed_offers,
+            "schedule_entries": removed_entries,
+            "schedule_semesters": sorted(t for t in touched if t is not None),
+        }
+
+    # ---- offered modules ----
+    src = _O.__table__.alias("src")
+    target_has = exists().where(and_(_O.semester == target, _O.module_code == src.c.module_code))
+    inactive = (
+        select(models.Module.module_code)
+        .join(models.StudyProgram, models.StudyProgram.id == models.Module.program_id)
+        .where(models.StudyProgram.status.is_(False))
+    )
+
+    source_offers = select(src.c.module_code).where(src.c.semester == source)
+    skipped_existing = source_offers.where(target_has)
+    skipped_inactive = source_offers.where(not_(target_has), src.c.module_code.in_(inactive))
+
+    copyable = select(
+        src.c.module_code, src.c.lecturer_id, literal(target).label("semester"), src.c.status,
+    ).where(src.c.semester == source, not_(target_has))
+    if skip_inactive_modules:
+        copyable = copyable.where(src.c.module_code.not_in(inactive))
+
+    report["offered_modules"] = {
+        "source": _count(db, source_offers),
+        "skipped_already_offered": _codes(db, skipped_existing),
+        "skipped_inactive_module": _codes(db, skipped_inactive) if skip_inactive_modules else [],
+    }
+
+    # only the offers created here get a timetable; they are found again by (target, module_code)
+    copied_codes = list(db.execute(copyable.with_only_columns(src.c.module_code)).scalars())
+    copied = db.execute(
+        _O.__table__.insert().from_select(["module_code", "lecturer_id", "semester", "status"], copyable)
+    ).rowcount
+    report["offered_modules"]["copied"] = copied
+
+    # ---- schedule entries ----
+    entries = {"source": 0, "copied": 0, "skipped_inactive_room": 0, "skipped_offer_not_copied": 0}
+    if include_schedule:
+        old, new = _O.__table__.alias("old"), _O.__table__.alias("new")
+        base = (
+            select(_E)
+            .join(old, old.c.id == _E.offered_module_id)
+            .outerjoin(new, and_(
+                new.c.module_code == old.c.module_code, new.c.semester == target,
+                new.c.module_code.in_(copied_codes),
+            ))
+            .outerjoin(models.Room, models.Room.id == _E.room_id)
+            .where(_E.semester == source)
+        )
+        room_ok = or_(_E.room_id.is_(None), models.Room.status.is_not(False))
+        total, no_offer, bad_room = db.execute(base.with_only_columns(
+            func.count(),
+            func.count(case((new.c.id.is_(None), 1))),
+            func.count(case((and_(new.c.id.is_not(None), not_(room_ok)), 1))),
+        )).one()
+        entries["source"] = total
+        entries["skipped_offer_not_copied"] = no_offer
+        if skip_inactive_rooms:
+            entries["skipped_inactive_room"] = bad_room
+
+        rows = base.where(new.c.id.is_not(None)).with_only_columns(
+            new.c.id, _E.room_id, _E.day_of_week, _E.start_time, _E.end_time,
+            _E.start_minute, _E.end_minute, _E.day_number, literal(target),
+        )
+        if skip_inactive_rooms:
+            rows = rows.where(room_ok)
+        entries["copied"] = db.execute(_E.__table__.insert().from_select(
+            ["offered_module_id", "room_id", "day_of_week", "start_time", "end_time",
+             "start_minute", "end_minute", "day_number", "semester"],
+            rows,
+        )).rowcount
+    report["schedule_entries"] = entries
+
+    # INSERT ... SELECT and DELETE bypass the unit of work, so bump the counters here
+    versions.bump(
+        db, versions.scoped(_O.__tablename__, target),
+        *(versions.scoped(_E.__tablename__, t) for t in touched if t is not None),
+    )
+    return report
@@ -1,24 +1,38 @@
 # api/routers/auth_routes.py
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, hashing
+from ..permissions import require_admin_or_pm
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.email).first()
-    if not user or not auth.verify_password(form_data.password, user.password_hash):
+async def login(form_data: schemas.LoginRequest, db: Session = Depends(get_db)):
+    # async so that the bcrypt wait happens on the dedicated hash pool, not a threadpool slot
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.email == form_data.email).first()
+    )
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email/password")
+    ok, new_hash = await hashing.verify_and_update(form_data.password, user.password_hash)
+    if not ok:
+        raise HTTPException(status_code=400, detail="Incorrect email/password")
+    if new_hash:
+        # cost parameters changed since this hash was made: store the upgraded one
+        user.password_hash = new_hash
+        await run_in_threadpool(db.commit)
+        await run_in_threadpool(db.refresh, user)
 
     safe_lec_id = user.lecturer_id if user.lecturer_id is not None else 0
 
     access_token = auth.create_access_token(data={
         "sub": user.email,
         "role": user.role,
-        "lecturer_id": safe_lec_id
+        "lecturer_id": safe_lec_id,
+        "ver": user.token_version or 0
     })
 
     return {
@@ -35,3 +49,14 @@ def me(current_user: models.User = Depends(auth.get_current_user)):
         "role": current_user.role,
         "lecturer_id": current_user.lecturer_id
     }
+
+@router.post("/revoke/{email}")
+def revoke_tokens(email: str, db: Session = Depends(get_db),
+                  current_user: models.User = Depends(auth.get_current_user)):
+    # invalidates every token issued so far for that user (e.g. role change, lost device)
+    require_admin_or_pm(current_user)
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    auth.revoke_user_tokens(db, user)
+    return {"ok": True}
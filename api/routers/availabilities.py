@@ -6,6 +6,7 @@ from typing import List
 from ..database import get_db
 from .. import models, schemas, auth
 from ..permissions import role_of, is_admin_or_pm, require_lecturer_link
+from ..timeslots import DAYS, day_index, try_parse_time, range_mask, encode_week, decode_week
 
 router = APIRouter(prefix="/availabilities", tags=["availabilities"])
 
@@ -22,6 +23,35 @@ def read_availabilities(db: Session = Depends(get_db),
         ).all()
     raise HTTPException(status_code=403, detail="Not allowed")
 
+@router.get("/free")
+def read_free_lecturers(day: str, start: str, end: str, db: Session = Depends(get_db),
+                        current_user: models.User = Depends(auth.get_current_user)):
+    """Lecturers whose availability covers [start, end) on day (bitmap AND, no JSON parsing).
+
+    A lecturer without a stored bitmap has no restriction, as in the solver
+    (solver.availability_mask), and is always free.
+    """
+    if not (is_admin_or_pm(current_user) or role_of(current_user) == "hosp"):
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    i = day_index(day)
+    s, e = try_parse_time(start), try_parse_time(end)
+    if i is None:
+        raise HTTPException(status_code=400, detail=f"Invalid day: {day}")
+    if s is None or e is None or s >= e:
+        raise HTTPException(status_code=400, detail="start/end must be HH:MM with start < end")
+
+    wanted = range_mask(i, s, e)
+    rows = (
+        db.query(models.Lecturer.id, models.LecturerAvailability.week_bitmap)
+        .outerjoin(models.LecturerAvailability, models.LecturerAvailability.lecturer_id == models.Lecturer.id)
+        .all()
+    )
+
+    free = [lec_id for lec_id, bitmap in rows if bitmap is None or decode_week(bitmap) & wanted == wanted]
+    return {"day": DAYS[i], "start": start, "end": end, "lecturer_ids": sorted(free)}
+
+
 @router.post("/update", response_model=schemas.AvailabilityResponse)
 def update_availability(payload: schemas.AvailabilityUpdate, db: Session = Depends(get_db),
                         current_user: models.User = Depends(auth.get_current_user)):
@@ -40,13 +70,16 @@ def update_availability(payload: schemas.AvailabilityUpdate, db: Session = Depen
         models.LecturerAvailability.lecturer_id == payload.lecturer_id
     ).first()
 
+    bitmap = encode_week(payload.schedule_data)
+
     if existing:
         existing.schedule_data = payload.schedule_data
+        existing.week_bitmap = bitmap
         db.commit()
         db.refresh(existing)
         return existing
 
-    row = models.LecturerAvailability(**payload.model_dump())
+    row = models.LecturerAvailability(**payload.model_dump(), week_bitmap=bitmap)
     db.add(row)
     db.commit()
     db.refresh(row)
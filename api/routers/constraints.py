@@ -1,11 +1,11 @@
 # api/routers/constraints.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
-from .. import models, schemas, auth
-from ..permissions import role_of, is_admin_or_pm, hosp_can_manage_constraint
+from .. import models, schemas, auth, rules
+from ..permissions import PermissionContext, get_permissions
 
 router = APIRouter(tags=["constraints"])
 
@@ -19,16 +19,22 @@ def read_scheduler_constraints(db: Session = Depends(get_db),
                                current_user: models.User = Depends(auth.get_current_user)):
     return db.query(models.SchedulerConstraint).all()
 
+@router.get("/scheduler-constraints/violations")
+def read_constraint_violations(semester: str, constraint_id: Optional[List[int]] = Query(None),
+                               db: Session = Depends(get_db),
+                               current_user: models.User = Depends(auth.get_current_user)):
+    # Evaluates every enabled constraint valid for the semester against its schedule entries
+    return rules.evaluate_constraints(db, semester, constraint_id)
+
 @router.post("/scheduler-constraints/", response_model=schemas.SchedulerConstraintResponse)
 def create_scheduler_constraint(p: schemas.SchedulerConstraintCreate, db: Session = Depends(get_db),
-                                current_user: models.User = Depends(auth.get_current_user)):
+                                perms: PermissionContext = Depends(get_permissions)):
     # Permission Check
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
+    elif perms.role == "hosp":
         # logic relies on scope/target_id which exist in the new schema
-        if not hosp_can_manage_constraint(db, current_user, p.scope, p.target_id):
+        if not perms.can_manage_constraint(p.scope, p.target_id):
             raise HTTPException(status_code=403, detail="HoSP can only manage Program-scoped constraints for their program")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -42,23 +48,22 @@ def create_scheduler_constraint(p: schemas.SchedulerConstraintCreate, db: Sessio
 
 @router.put("/scheduler-constraints/{id}", response_model=schemas.SchedulerConstraintResponse)
 def update_scheduler_constraint(id: int, p: schemas.SchedulerConstraintUpdate, db: Session = Depends(get_db),
-                                current_user: models.User = Depends(auth.get_current_user)):
+                                perms: PermissionContext = Depends(get_permissions)):
     row = db.query(models.SchedulerConstraint).filter(models.SchedulerConstraint.id == id).first()
     if not row:
         raise HTTPException(status_code=404, detail="Constraint not found")
 
     # Permission Check
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
-        if not hosp_can_manage_constraint(db, current_user, row.scope, row.target_id):
+    elif perms.role == "hosp":
+        if not perms.can_manage_constraint(row.scope, row.target_id):
             raise HTTPException(status_code=403, detail="Unauthorized")
 
         # Check if they are trying to move it out of their scope
         new_scope = p.scope if p.scope is not None else row.scope
         new_target = p.target_id if p.target_id is not None else row.target_id
-        if not hosp_can_manage_constraint(db, current_user, new_scope, new_target):
+        if not perms.can_manage_constraint(new_scope, new_target):
             raise HTTPException(status_code=403, detail="Cannot move constraint out of program scope")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -74,17 +79,16 @@ def update_scheduler_constraint(id: int, p: schemas.SchedulerConstraintUpdate, d
 
 @router.delete("/scheduler-constraints/{id}")
 def delete_scheduler_constraint(id: int, db: Session = Depends(get_db),
-                                current_user: models.User = Depends(auth.get_current_user)):
+                                perms: PermissionContext = Depends(get_permissions)):
     row = db.query(models.SchedulerConstraint).filter(models.SchedulerConstraint.id == id).first()
     if not row:
         return {"ok": True}
 
     # Permission Check
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
-        if not hosp_can_manage_constraint(db, current_user, row.scope, row.target_id):
+    elif perms.role == "hosp":
+        if not perms.can_manage_constraint(row.scope, row.target_id):
             raise HTTPException(status_code=403, detail="Unauthorized")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from typing import Optional
 
 from ..database import get_db
-from .. import models, auth
+from .. import models, hashing
 
 router = APIRouter(tags=["dev"])
 
@@ -14,7 +14,7 @@ def seed_users(db: Session = Depends(get_db)):
 
     def ensure_user(email: str, role: str, lecturer_id: Optional[int] = None):
         if not db.query(models.User).filter(models.User.email == email).first():
-            hashed = auth.get_password_hash("password")
+            hashed = hashing.hash_password("password")
             db.add(models.User(email=email, password_hash=hashed, role=role, lecturer_id=lecturer_id))
             log.append(f"✅ Created {role} user: {email}")
 
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas, auth
+from .. import models, schemas, auth, versions
 from ..permissions import role_of, is_admin_or_pm, require_admin_or_pm
 
 router = APIRouter(prefix="/domains", tags=["domains"])
@@ -19,6 +19,8 @@ def _normalize(name: str) -> str:
 
 @router.get("/", response_model=List[schemas.DomainResponse])
 def list_domains(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user),
 ):
@@ -27,6 +29,9 @@ def list_domains(
     if not (r in {"hosp", "lecturer"} or is_admin_or_pm(current_user)):
         raise HTTPException(status_code=403, detail="Not allowed")
 
+    not_modified = versions.conditional(request, response, db, "domains")
+    if not_modified:
+        return not_modified
     return db.query(models.Domain).order_by(models.Domain.name.asc()).all()
 
 
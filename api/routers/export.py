@@ -0,0 +1,122 @@
+# api/routers/export.py
+import csv
+import io
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, cast, func, inspect, select
+from typing import Optional
+
+from ..database import stream_rows
+from .. import models, auth, schedule_query
+from ..permissions import require_admin_or_pm
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# rows are fetched through a server-side cursor in batches of this size
+BATCH_SIZE = 1000
+# encoded output is flushed to the client in chunks of about this many bytes
+CHUNK_BYTES = 64 * 1024
+
+MASTER_TABLES = {
+    "modules": models.Module,
+    "lecturers": models.Lecturer,
+    "rooms": models.Room,
+    "groups": models.Group,
+}
+_A = models.ModuleAssessment
+# child-table columns flattened into the master row, in the import format ("Exam:60;Project:40")
+EXTRA_COLUMNS = {
+    "modules": {
+        "assessment_breakdown": (
+            select(func.aggregate_strings(_A.type + ":" + func.coalesce(cast(_A.weight, String), ""), ";"))
+            .where(_A.module_code == models.Module.module_code)
+            .scalar_subquery()
+        ),
+    },
+}
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _table_statement(model, extra=None):
+    # label columns with their attribute names ("name", not the legacy "Name")
+    attrs = inspect(model).column_attrs
+    pk = inspect(model).primary_key
+    extra = extra or {}
+    columns = [a.columns[0].label(a.key) for a in attrs] + [c.label(k) for k, c in extra.items()]
+    return select(*columns).order_by(*pk), [a.key for a in attrs] + list(extra)
+
+
+def _rows(stmt, to_dict):
+    for row in stream_rows(stmt, BATCH_SIZE):
+        yield to_dict(row)
+
+
+def _encode_ndjson(rows, columns):
+    buf = []
+    size = 0
+    flush_at = 1  # first row goes out immediately, then CHUNK_BYTES chunks
+    for row in rows:
+        line = json.dumps(row, default=str) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= flush_at:
+            yield "".join(buf)
+            buf, size, flush_at = [], 0, CHUNK_BYTES
+    if buf:
+        yield "".join(buf)
+
+
+def _encode_csv(rows, columns):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    yield out.getvalue()  # header goes out immediately
+    out.seek(0)
+    out.truncate()
+    for row in rows:
+        writer.writerow({k: json.dumps(v) if isinstance(v, (list, dict)) else v for k, v in row.items()})
+        if out.tell() >= CHUNK_BYTES:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue()
+
+
+@router.get("/{resource}")
+def export_resource(
+    resource: str,
+    format: str = "ndjson",
+    semester: Optional[str] = None,
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Stream a whole table (modules, lecturers, rooms, groups) or a semester's schedule."""
+    require_admin_or_pm(current_user)
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(FORMATS)}")
+
+    if resource == "schedule":
+        if not semester:
+            raise HTTPException(status_code=400, detail="semester is required for the schedule export")
+        stmt = schedule_query.build_statement(semester)
+        columns = [f for f in schedule_query.FIELDS if f != "conflicts"]
+        rows = _rows(stmt, lambda r: schedule_query.to_entry(r, columns))
+        filename = f"schedule_{semester}"
+    elif resource in MASTER_TABLES:
+        stmt, columns = _table_statement(MASTER_TABLES[resource], EXTRA_COLUMNS.get(resource))
+        rows = _rows(stmt, lambda r: dict(r._mapping))
+        filename = resource
+    else:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown resource. Use one of: {sorted(MASTER_TABLES) + ['schedule']}",
+        )
+
+    encode = _encode_csv if format == "csv" else _encode_ndjson
+    return StreamingResponse(
+        encode(rows, columns),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
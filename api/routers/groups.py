@@ -1,11 +1,12 @@
 # api/routers/groups.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 
-from ..database import get_db
-from .. import models, schemas, auth
-from ..permissions import role_of, is_admin_or_pm, group_payload_in_hosp_domain
+from ..database import ReadSession, get_db, get_read_db
+from .. import models, schemas, auth, versions
+from ..permissions import PermissionContext, get_permissions
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
@@ -14,8 +15,11 @@ router = APIRouter(prefix="/groups", tags=["groups"])
 # Al borrar "current_user = Depends(...)", eliminamos al portero.
 # No hay chequeo de rol -> No hay error 403.
 @router.get("/", response_model=List[schemas.GroupResponse])
-def read_groups(db: Session = Depends(get_db)):
-    return db.query(models.Group).all()
+async def read_groups(request: Request, response: Response, db: ReadSession = Depends(get_read_db)):
+    not_modified = await versions.conditional_async(request, response, db, "groups")
+    if not_modified:
+        return not_modified
+    return (await db.execute(select(models.Group))).scalars().all()
 
 
 # --- ESCRITURA (POST/PUT/DELETE) ---
@@ -24,10 +28,10 @@ def read_groups(db: Session = Depends(get_db)):
 
 @router.post("/", response_model=schemas.GroupResponse)
 def create_group(p: schemas.GroupCreate, db: Session = Depends(get_db),
-                 current_user: models.User = Depends(auth.get_current_user)):
+                 perms: PermissionContext = Depends(get_permissions)):
     # Solo Admin, PM o HoSP
-    if is_admin_or_pm(current_user) or role_of(current_user) == "hosp":
-        if role_of(current_user) == "hosp" and not group_payload_in_hosp_domain(db, current_user, p.program):
+    if perms.is_admin_or_pm or perms.role == "hosp":
+        if perms.role == "hosp" and not perms.group_payload_in_domain(p.program):
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
 
         row = models.Group(**p.model_dump())
@@ -40,15 +44,15 @@ def create_group(p: schemas.GroupCreate, db: Session = Depends(get_db),
 
 @router.put("/{id}", response_model=schemas.GroupResponse)
 def update_group(id: int, p: schemas.GroupUpdate, db: Session = Depends(get_db),
-                 current_user: models.User = Depends(auth.get_current_user)):
+                 perms: PermissionContext = Depends(get_permissions)):
     # Solo Admin, PM o HoSP
-    if is_admin_or_pm(current_user) or role_of(current_user) == "hosp":
+    if perms.is_admin_or_pm or perms.role == "hosp":
         row = db.query(models.Group).filter(models.Group.id == id).first()
         if not row:
             raise HTTPException(status_code=404, detail="Group not found")
 
-        if role_of(current_user) == "hosp":
-            if not group_is_in_hosp_domain(db, current_user, row):
+        if perms.role == "hosp":
+            if not perms.group_in_domain(row):
                 raise HTTPException(status_code=403, detail="Unauthorized")
 
         data = p.model_dump(exclude_unset=True)
@@ -62,9 +66,9 @@ def update_group(id: int, p: schemas.GroupUpdate, db: Session = Depends(get_db),
 
 @router.delete("/{id}")
 def delete_group(id: int, db: Session = Depends(get_db),
-                 current_user: models.User = Depends(auth.get_current_user)):
+                 perms: PermissionContext = Depends(get_permissions)):
     # Solo Admin/PM
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         row = db.query(models.Group).filter(models.Group.id == id).first()
         if row:
             db.delete(row)
@@ -0,0 +1,30 @@
+# api/routers/imports.py
+from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from .. import importer
+from ..permissions import PermissionContext, get_permissions
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+
+@router.post("/{resource}")
+async def import_resource(
+    resource: str,
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    perms: PermissionContext = Depends(get_permissions),
+):
+    """Upsert modules, lecturers, rooms or groups from a CSV/XLSX upload.
+
+    Columns are the fields of the matching create schema. Keys: modules by
+    module_code, rooms and groups by name, lecturers by id or mdh_email.
+    Invalid rows are reported and skipped; dry_run=true validates and writes
+    inside a transaction that is rolled back.
+    """
+    read = importer.reader_for(file.filename)
+    # the upload is spooled to disk by Starlette; parse and write off the event loop
+    return await run_in_threadpool(importer.run_import, db, perms, resource, read(file.file), dry_run)
@@ -1,50 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional
 
-from ..database import get_db
+from ..database import ReadSession, get_db, get_read_db
 from .. import models, schemas, auth
 from ..permissions import role_of, is_admin_or_pm, require_admin_or_pm, require_lecturer_link
 
 router = APIRouter(prefix="/lecturers", tags=["lecturers"])
 
 
+# ---------------------------------------------------------
+# GET /lecturers/summary: table rows + module counts, no module lists
+# (those are fetched per lecturer from GET /lecturers/{id}/modules)
+# ---------------------------------------------------------
+MAX_SUMMARY_LIMIT = 1000
+
+_L = models.Lecturer
+_MODULE_COUNT = (
+    select(func.count())
+    .select_from(models.lecturer_modules)
+    .where(models.lecturer_modules.c.lecturer_id == _L.id)
+    .scalar_subquery()
+)
+_SUMMARY_SORTS = {
+    "name": (func.lower(_L.last_name), func.lower(_L.first_name)),
+    "first_name": (func.lower(_L.first_name),),
+    "domain": (func.lower(models.Domain.name),),
+    "location": (func.lower(_L.location),),
+    "module_count": (_MODULE_COUNT,),
+    "id": (),
+}
+
+
+class SummaryQuery:
+    """Search / sort / page parameters of GET /lecturers/summary."""
+
+    def __init__(self, q: Optional[str] = None, sort: str = "name",
+                 limit: Optional[int] = None, offset: int = 0):
+        key = sort.lstrip("-")
+        if key not in _SUMMARY_SORTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"sort must be one of {sorted(_SUMMARY_SORTS)} (prefix - for descending)",
+            )
+        self.q = (q or "").strip().lower()
+        self.sort = key
+        self.descending = sort.startswith("-")
+        self.limit = None if limit is None else max(1, min(limit, MAX_SUMMARY_LIMIT))
+        self.offset = max(0, offset)
+
+    def filtered(self, lecturer_id: Optional[int] = None):
+        stmt = (
+            select(
+                _L.id, _L.first_name, _L.last_name, _L.title, _L.employment_type, _L.personal_email,
+                _L.mdh_email, _L.phone, _L.location, _L.teaching_load, _L.domain_id,
+                models.Domain.name.label("domain"), _MODULE_COUNT.label("module_count"),
+            )
+            .select_from(_L)
+            .outerjoin(models.Domain, models.Domain.id == _L.domain_id)
+        )
+        if lecturer_id is not None:
+            stmt = stmt.where(_L.id == lecturer_id)
+        if self.q:
+            pattern = f"%{self.q}%"
+            full_name = func.lower(_L.first_name + " " + func.coalesce(_L.last_name, ""))
+            stmt = stmt.where(or_(
+                full_name.like(pattern),
+                func.lower(_L.title).like(pattern),
+                func.lower(_L.location).like(pattern),
+                func.lower(_L.mdh_email).like(pattern),
+                func.lower(models.Domain.name).like(pattern),
+            ))
+        return stmt
+
+    def page(self, stmt):
+        order = [c.desc() if self.descending else c.asc() for c in _SUMMARY_SORTS[self.sort]]
+        order.append(_L.id.desc() if self.descending else _L.id.asc())
+        stmt = stmt.order_by(*order).offset(self.offset)
+        if self.limit is not None:
+            stmt = stmt.limit(self.limit)
+        return stmt
+
+    def total(self, stmt):
+        return select(func.count()).select_from(stmt.subquery())
+
+
+def _summary_scope(current_user: models.User) -> Optional[int]:
+    if role_of(current_user) == "hosp" or is_admin_or_pm(current_user):
+        return None
+    if role_of(current_user) == "lecturer":
+        return require_lecturer_link(current_user)
+    raise HTTPException(status_code=403, detail="Not allowed")
+
+
+_LECTURER_RELATIONS = (selectinload(models.Lecturer.modules), joinedload(models.Lecturer.domain_rel))
+
+
+async def _load_lecturer(db: ReadSession, lec_id: int):
+    result = await db.execute(
+        select(models.Lecturer).options(*_LECTURER_RELATIONS).where(models.Lecturer.id == lec_id)
+    )
+    return result.scalars().first()
+
+
 @router.get("/", response_model=List[schemas.LecturerResponse])
-def read_lecturers(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def read_lecturers(db: ReadSession = Depends(get_read_db),
+                         current_user: models.User = Depends(auth.get_read_user)):
     r = role_of(current_user)
 
     if r == "hosp" or is_admin_or_pm(current_user):
         # ✅ load assigned modules + domain relation
-        return (
-            db.query(models.Lecturer)
-            .options(joinedload(models.Lecturer.modules), joinedload(models.Lecturer.domain_rel))
-            .all()
-        )
+        result = await db.execute(select(models.Lecturer).options(*_LECTURER_RELATIONS))
+        return result.scalars().all()
 
     if r == "lecturer":
-        lec_id = require_lecturer_link(current_user)
-        lec = (
-            db.query(models.Lecturer)
-            .options(joinedload(models.Lecturer.modules), joinedload(models.Lecturer.domain_rel))
-            .filter(models.Lecturer.id == lec_id)
-            .first()
-        )
+        lec = await _load_lecturer(db, require_lecturer_link(current_user))
         return [lec] if lec else []
 
     raise HTTPException(status_code=403, detail="Not allowed")
 
 
+@router.get("/summary", response_model=List[schemas.LecturerSummary])
+async def read_lecturer_summary(response: Response, query: SummaryQuery = Depends(),
+                                db: ReadSession = Depends(get_read_db),
+                                current_user: models.User = Depends(auth.get_read_user)):
+    stmt = query.filtered(_summary_scope(current_user))
+    response.headers["X-Total-Count"] = str((await db.execute(query.total(stmt))).scalar_one())
+    return (await db.execute(query.page(stmt))).mappings().all()
+
+
 @router.get("/me", response_model=schemas.LecturerResponse)
-def get_my_lecturer_profile(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def get_my_lecturer_profile(db: ReadSession = Depends(get_read_db),
+                                  current_user: models.User = Depends(auth.get_read_user)):
     if role_of(current_user) != "lecturer":
         raise HTTPException(status_code=403, detail="Not allowed")
-    lec_id = require_lecturer_link(current_user)
-    lec = (
-        db.query(models.Lecturer)
-        .options(joinedload(models.Lecturer.modules), joinedload(models.Lecturer.domain_rel))
-        .filter(models.Lecturer.id == lec_id)
-        .first()
-    )
+    lec = await _load_lecturer(db, require_lecturer_link(current_user))
     if not lec:
         raise HTTPException(status_code=404, detail="Lecturer profile not found")
     return lec
@@ -165,21 +256,16 @@ def delete_lecturer(
 
 # ✅ NEW: list modules assigned to a lecturer
 @router.get("/{id}/modules", response_model=List[schemas.ModuleMini])
-def get_lecturer_modules(
+async def get_lecturer_modules(
     id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user),
+    db: ReadSession = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_read_user),
 ):
     r = role_of(current_user)
     if not (r == "hosp" or is_admin_or_pm(current_user)):
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    lec = (
-        db.query(models.Lecturer)
-        .options(joinedload(models.Lecturer.modules))
-        .filter(models.Lecturer.id == id)
-        .first()
-    )
+    lec = await _load_lecturer(db, id)
     if not lec:
         raise HTTPException(status_code=404, detail="Lecturer not found")
 
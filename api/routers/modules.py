@@ -1,45 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional, Any
-import json
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional
 
-from ..database import get_db
+from ..database import ReadSession, get_db, get_read_db
 from .. import models, schemas, auth
-from ..permissions import role_of, is_admin_or_pm, hosp_program_ids
+from ..permissions import PermissionContext, get_permissions
 
 router = APIRouter(prefix="/modules", tags=["modules"])
 
 
 
-def _safe_json_load(s: Optional[str]) -> Optional[Any]:
-    if not s or not isinstance(s, str):
-        return None
-    s = s.strip()
-    if not s:
-        return None
-    try:
-        return json.loads(s)
-    except Exception:
-        return None
-
-
-def _parse_module_payload(assessment_type_value: Optional[str]) -> dict:
-    parsed = _safe_json_load(assessment_type_value)
-
-    if isinstance(parsed, list):
-        return {"assessments": parsed, "lecturer_assignments": []}
-
-    if isinstance(parsed, dict):
-        return {
-            "assessments": parsed.get("assessments") or [],
-            "lecturer_assignments": parsed.get("lecturer_assignments") or []
-        }
-
-    if assessment_type_value and isinstance(assessment_type_value, str):
-        return {"assessments": [], "lecturer_assignments": [], "legacy": assessment_type_value}
-
-    return {"assessments": [], "lecturer_assignments": []}
-
 def _normalize_assessments(breakdown) -> List[dict]:
     items = []
     seen = set()
@@ -112,53 +83,64 @@ def _normalize_assessments(breakdown) -> List[dict]:
 
 
 
-def _make_response(row: models.Module) -> schemas.ModuleResponse:
-    payload = _parse_module_payload(row.assessment_type)
-    assessments = payload.get("assessments") or []
+def _set_assessments(row: models.Module, normalized: List[dict]):
+    row.assessments = [
+        models.ModuleAssessment(position=i, type=a["type"], type_key=a["type"].lower(), weight=a["weight"])
+        for i, a in enumerate(normalized)
+    ]
 
-    legacy = payload.get("legacy")
-    assessment_type_out = legacy if legacy else row.assessment_type
 
+def _make_response(row: models.Module) -> schemas.ModuleResponse:
     return schemas.ModuleResponse(
         module_code=row.module_code,
         name=row.name,
         ects=row.ects,
         room_type=row.room_type,
-        assessment_type=assessment_type_out,
+        assessment_type=row.assessment_type,
         semester=row.semester,
         category=row.category,
         program_id=row.program_id,
         specializations=row.specializations or [],
-        assessment_breakdown=assessments
+        assessment_breakdown=[schemas.AssessmentPart(type=a.type, weight=a.weight) for a in row.assessments]
     )
 
 
+def _modules_statement(program_id: Optional[int], assessment: Optional[str]):
+    stmt = select(models.Module).options(
+        selectinload(models.Module.specializations),
+        selectinload(models.Module.assessments),
+    )
+    if program_id is not None:
+        stmt = stmt.where(models.Module.program_id == program_id)
+    if assessment:
+        key = assessment.strip().lower()
+        stmt = stmt.where(models.Module.assessments.any(models.ModuleAssessment.type_key == key))
+    return stmt.order_by(models.Module.module_code)
+
+
 @router.get("/", response_model=List[schemas.ModuleResponse])
-def read_modules(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+async def read_modules(
+    program_id: Optional[int] = None,
+    assessment: Optional[str] = None,
+    db: ReadSession = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_read_user)
 ):
-    rows = (
-        db.query(models.Module)
-        .options(joinedload(models.Module.specializations))
-        .all()
-    )
-    return [_make_response(r) for r in rows]
+    result = await db.execute(_modules_statement(program_id, assessment))
+    return [_make_response(r) for r in result.scalars().all()]
 
 
 @router.post("/", response_model=schemas.ModuleResponse)
 def create_module(
     p: schemas.ModuleCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    perms: PermissionContext = Depends(get_permissions)
 ):
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
+    elif perms.role == "hosp":
         if p.program_id is None:
             raise HTTPException(status_code=400, detail="program_id is required")
-        if p.program_id not in hosp_program_ids(db, current_user):
+        if p.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -169,9 +151,11 @@ def create_module(
 
     if assessment_breakdown is not None:
         normalized = _normalize_assessments(assessment_breakdown)
-        data["assessment_type"] = json.dumps({"assessments": normalized, "lecturer_assignments": []})
+    else:
+        normalized = []
 
     row = models.Module(**data)
+    _set_assessments(row, normalized)
 
     if spec_ids:
         specs = db.query(models.Specialization).filter(models.Specialization.id.in_(spec_ids)).all()
@@ -184,7 +168,7 @@ def create_module(
     row = (
         db.query(models.Module)
         .filter(models.Module.module_code == row.module_code)
-        .options(joinedload(models.Module.specializations))
+        .options(joinedload(models.Module.specializations), selectinload(models.Module.assessments))
         .first()
     )
     return _make_response(row)
@@ -195,7 +179,7 @@ def update_module(
     module_code: str,
     p: schemas.ModuleUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    perms: PermissionContext = Depends(get_permissions)
 ):
     row = (
         db.query(models.Module)
@@ -206,13 +190,12 @@ def update_module(
     if not row:
         raise HTTPException(status_code=404, detail="Module not found")
 
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
-        if row.program_id not in hosp_program_ids(db, current_user):
+    elif perms.role == "hosp":
+        if row.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
-        if p.program_id is not None and p.program_id not in hosp_program_ids(db, current_user):
+        if p.program_id is not None and p.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Cannot move module to another program")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -227,8 +210,7 @@ def update_module(
 
     assessment_breakdown = data.pop("assessment_breakdown", None)
     if assessment_breakdown is not None:
-        normalized = _normalize_assessments(assessment_breakdown)
-        row.assessment_type = json.dumps({"assessments": normalized, "lecturer_assignments": []})
+        _set_assessments(row, _normalize_assessments(assessment_breakdown))
 
     for k, v in data.items():
         setattr(row, k, v)
@@ -242,17 +224,16 @@ def update_module(
 def delete_module(
     module_code: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    perms: PermissionContext = Depends(get_permissions)
 ):
     row = db.query(models.Module).filter(models.Module.module_code == module_code).first()
     if not row:
         return {"ok": True}
 
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
-        if row.program_id not in hosp_program_ids(db, current_user):
+    elif perms.role == "hosp":
+        if row.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from pydantic import BaseModel
 
-from ..database import get_db
-from .. import models, auth
+from ..database import ReadSession, get_db, get_read_db
+from .. import models, auth, cache
 
 router = APIRouter(prefix="/offered-modules", tags=["offered-modules"])
 
@@ -25,29 +26,28 @@ class OfferResponse(BaseModel):
     class Config:
         orm_mode = True
 
+def _map_offer(r: models.OfferedModule) -> dict:
+    return {
+        "id": r.id,
+        "module_code": r.module_code,
+        "module_name": r.module.name if r.module else "Unknown Module",
+        "lecturer_name": f"{r.lecturer.first_name} {r.lecturer.last_name}" if r.lecturer else "Unassigned",
+        "semester": r.semester,
+        "status": r.status
+    }
+
 @router.get("/", response_model=List[OfferResponse])
-def get_offers(semester: str = None, db: Session = Depends(get_db),
-               current_user: models.User = Depends(auth.get_current_user)):
-    query = db.query(models.OfferedModule).options(
+async def get_offers(semester: str = None, db: ReadSession = Depends(get_read_db),
+                     current_user: models.User = Depends(auth.get_read_user)):
+    stmt = select(models.OfferedModule).options(
         joinedload(models.OfferedModule.module),
         joinedload(models.OfferedModule.lecturer)
     )
     if semester:
-        query = query.filter(models.OfferedModule.semester == semester)
-
-    results = query.all()
+        stmt = stmt.where(models.OfferedModule.semester == semester)
 
-    mapped = []
-    for r in results:
-        mapped.append({
-            "id": r.id,
-            "module_code": r.module_code,
-            "module_name": r.module.name if r.module else "Unknown Module",
-            "lecturer_name": f"{r.lecturer.first_name} {r.lecturer.last_name}" if r.lecturer else "Unassigned",
-            "semester": r.semester,
-            "status": r.status
-        })
-    return mapped
+    result = await db.execute(stmt)
+    return [_map_offer(r) for r in result.scalars().all()]
 
 @router.post("/", response_model=OfferResponse)
 def create_offer(offer: OfferCreate, db: Session = Depends(get_db),
@@ -64,6 +64,7 @@ def create_offer(offer: OfferCreate, db: Session = Depends(get_db),
     db.add(new_offer)
     db.commit()
     db.refresh(new_offer)
+    cache.invalidate(cache.SCHEDULE, new_offer.semester)
 
     return {
         "id": new_offer.id,
@@ -81,6 +82,8 @@ def delete_offer(id: int, db: Session = Depends(get_db),
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
 
+    semester = item.semester
     db.delete(item)
     db.commit()
+    cache.invalidate(cache.SCHEDULE, semester)
     return {"ok": True}
\ No newline at end of file
@@ -1,11 +1,11 @@
 # api/routers/programs.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session, joinedload
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas, auth
-from ..permissions import role_of, is_admin_or_pm
+from .. import models, schemas, auth, versions
+from ..permissions import role_of, is_admin_or_pm, invalidate_program_owners
 
 router = APIRouter(prefix="/study-programs", tags=["study-programs"])
 
@@ -14,10 +14,16 @@ router = APIRouter(prefix="/study-programs", tags=["study-programs"])
 # Antes tenía un bloqueo si eras estudiante. Ahora lo quitamos.
 @router.get("/", response_model=List[schemas.StudyProgramResponse])
 def read_programs(
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
         current_user: models.User = Depends(auth.get_current_user),
 ):
     # Students can read programs (read-only in UI)
+    # head_lecturer is embedded with its modules and domain
+    not_modified = versions.conditional(request, response, db, "study_programs", "lecturers", "modules", "domains")
+    if not_modified:
+        return not_modified
     return (
         db.query(models.StudyProgram)
         .options(joinedload(models.StudyProgram.head_lecturer))
@@ -39,6 +45,7 @@ def create_program(
     db_program = models.StudyProgram(**program.model_dump())
     db.add(db_program)
     db.commit()
+    invalidate_program_owners()
     db.refresh(db_program)
     return db_program
 
@@ -61,6 +68,8 @@ def update_program(
         setattr(db_program, key, value)
 
     db.commit()
+    # head_of_program_id / name / acronym feed the HoSP permission cache
+    invalidate_program_owners()
     db.refresh(db_program)
     return db_program
 
@@ -80,4 +89,5 @@ def delete_program(
 
     db.delete(db_program)
     db.commit()
+    invalidate_program_owners()
     return {"ok": True}
\ No newline at end of file
@@ -1,17 +1,22 @@
 # api/routers/rooms.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 
-from ..database import get_db
-from .. import models, schemas, auth
+from ..database import ReadSession, get_db, get_read_db
+from .. import models, schemas, auth, versions
 from ..permissions import require_admin_or_pm
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 
 @router.get("/", response_model=List[schemas.RoomResponse])
-def read_rooms(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    return db.query(models.Room).all()
+async def read_rooms(request: Request, response: Response, db: ReadSession = Depends(get_read_db),
+                     current_user: models.User = Depends(auth.get_read_user)):
+    not_modified = await versions.conditional_async(request, response, db, "rooms")
+    if not_modified:
+        return not_modified
+    return (await db.execute(select(models.Room))).scalars().all()
 
 @router.post("/", response_model=schemas.RoomResponse)
 def create_room(p: schemas.RoomCreate, db: Session = Depends(get_db),
@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+import json
+import os
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import delete, insert, select
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from pydantic import BaseModel
-from ..database import get_db
-from .. import models, auth
+from pydantic import BaseModel, TypeAdapter
+from ..database import ReadSession, get_db, get_read_db, SessionLocal, stream_rows
+from .. import models, auth, solver, cache, versions, schedule_query, ics
+from ..conflicts import normalize_slot, find_conflicts, find_batch_conflicts, audit_semester
+from ..permissions import require_admin_or_pm, role_of, require_lecturer_link
+from ..timeslots import day_number
 
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
+# how long a feed may lag behind writes; polls within this window cost no DB work
+ICS_STAMP_TTL = float(os.getenv("ICS_STAMP_TTL", "60"))
+ICS_CHUNK_BYTES = 16 * 1024
+
 
 
 class ScheduleCreate(BaseModel):
@@ -28,16 +41,87 @@ class ScheduleResponse(BaseModel):
     start_time: str
     end_time: str
     semester: str
+    conflicts: List[dict] = []
 
     class Config:
         orm_mode = True
 
 
+_schedule_list = TypeAdapter(List[ScheduleResponse])
 
-@router.get("/", response_model=List[ScheduleResponse])
-def get_schedule(semester: str, db: Session = Depends(get_db)):
 
-    query = db.query(models.ScheduleEntry).filter(
+def _schedule_stamp_tables(semester: str):
+    # everything the denormalized names in _map_entry are read from
+    return (
+        versions.scoped("schedule_entries", semester),
+        versions.scoped("offered_modules", semester),
+        "modules", "lecturers", "rooms",
+    )
+
+
+def _serialize(rows: List[dict]) -> bytes:
+    return _schedule_list.dump_json(_schedule_list.validate_python(rows))
+
+
+class ScheduleQuery:
+    """Optional GET /schedule/ parameters. Without any of them the whole (cached) semester is returned.
+
+    Results are ordered by (day_of_week, start, id). When a page is full its
+    cursor is returned in the X-Next-Cursor header; pass it back as after=.
+    """
+    def __init__(
+        self,
+        lecturer_id: Optional[int] = None,
+        room_id: Optional[int] = None,
+        day_of_week: Optional[str] = None,
+        group: Optional[str] = None,
+        program_id: Optional[int] = None,
+        from_time: Optional[str] = None,
+        to_time: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        self.filters = dict(
+            lecturer_id=lecturer_id, room_id=room_id, day_of_week=day_of_week, group=group,
+            program_id=program_id, from_time=from_time, to_time=to_time, after=after, limit=limit,
+        )
+        self.limit = limit
+        self.fields = schedule_query.parse_fields(fields)
+
+    def scope_to(self, current_user):
+        """schedule:view:specific - lecturers only ever see their own entries (SQL predicate via OfferedModule)."""
+        if role_of(current_user) == "lecturer":
+            self.filters["lecturer_id"] = require_lecturer_link(current_user)
+
+    def cache_key(self, semester: str) -> Optional[str]:
+        """Cacheable shapes: the whole semester and one lecturer's semester."""
+        if self.fields is not None:
+            return None
+        active = {k: v for k, v in self.filters.items() if v is not None and v != ""}
+        if not active:
+            return semester
+        if set(active) == {"lecturer_id"}:
+            return f"{semester}:lecturer:{active['lecturer_id']}"
+        return None
+
+    def statement(self, semester: str):
+        return schedule_query.build_statement(semester, **self.filters)
+
+    def response(self, rows) -> JSONResponse:
+        headers = {}
+        if self.limit is not None and rows and len(rows) >= max(1, min(self.limit, schedule_query.MAX_LIMIT)):
+            headers["X-Next-Cursor"] = schedule_query.encode_cursor(rows[-1])
+        return JSONResponse([schedule_query.to_entry(r, self.fields) for r in rows], headers=headers)
+
+
+def _require_lecturer(current_user) -> None:
+    if role_of(current_user) != "lecturer":
+        raise HTTPException(status_code=403, detail="Only lecturers have a personal schedule")
+
+
+async def _load_schedule(db: ReadSession, semester: str) -> bytes:
+    stmt = select(models.ScheduleEntry).where(
         models.ScheduleEntry.semester == semester
     ).options(
         joinedload(models.ScheduleEntry.offered_module).joinedload(models.OfferedModule.module),
@@ -45,54 +129,193 @@ def get_schedule(semester: str, db: Session = Depends(get_db)):
         joinedload(models.ScheduleEntry.room)
     )
 
-    results = query.all()
+    results = (await db.execute(stmt)).scalars().all()
+
+    return _serialize([_map_entry(r, r.offered_module, r.room) for r in results])
+
+
+async def _schedule_response(db: ReadSession, semester: str, q: ScheduleQuery):
+    key = q.cache_key(semester)
+    if key is None:
+        return q.response((await db.execute(q.statement(semester))).all())
+
+    async def build():
+        if key == semester:
+            return await _load_schedule(db, semester)
+        rows = (await db.execute(q.statement(semester))).all()
+        return _serialize([schedule_query.to_entry(r) for r in rows])
+
+    tables = _schedule_stamp_tables(semester)
+    stamp = await db.run_sync(lambda s: versions.current_etag(s, *tables))
+    payload = await cache.read_through_async(cache.SCHEDULE, key, stamp, build)
+    return Response(payload, media_type="application/json")
+
+
+@router.get("/", response_model=List[ScheduleResponse])
+async def get_schedule(semester: str, q: ScheduleQuery = Depends(), db: ReadSession = Depends(get_read_db),
+                       current_user: models.User = Depends(auth.get_read_user)):
+    q.scope_to(current_user)
+    return await _schedule_response(db, semester, q)
+
+
+@router.get("/me", response_model=List[ScheduleResponse])
+async def get_my_schedule(semester: str, q: ScheduleQuery = Depends(), db: ReadSession = Depends(get_read_db),
+                          current_user: models.User = Depends(auth.get_read_user)):
+    _require_lecturer(current_user)
+    q.scope_to(current_user)
+    return await _schedule_response(db, semester, q)
+
+
+def _map_entry(r: models.ScheduleEntry, offer: Optional[models.OfferedModule],
+               room: Optional[models.Room]) -> dict:
+    mod_name = offer.module.name if (offer and offer.module) else "Unknown"
+    lec_name = "Unassigned"
+    if offer and offer.lecturer:
+        lec_name = f"{offer.lecturer.first_name} {offer.lecturer.last_name}"
+
+    room_name = room.name if room else "No Room"
+
+    return {
+        "id": r.id,
+        "offered_module_id": r.offered_module_id,
+        "module_name": mod_name,
+        "lecturer_name": lec_name,
+        "room_name": room_name,
+        "day_of_week": r.day_of_week,
+        "start_time": r.start_time,
+        "end_time": r.end_time,
+        "semester": r.semester
+    }
+
+
+@router.post("/ics/token")
+def create_ics_token(current_user: models.User = Depends(auth.get_current_user)):
+    """Long-lived token for calendar clients: GET /schedule/ics?token=...&semester=..."""
+    return {"token": auth.create_feed_token(current_user), "expires_in_days": auth.FEED_TOKEN_EXPIRE_DAYS}
+
+
+def _chunked(pieces, size: int, sink: list):
+    buf, n = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        n += len(piece)
+        if n >= size:
+            chunk = "".join(buf).encode("utf-8")
+            sink.append(chunk)
+            yield chunk
+            buf, n = [], 0
+    if buf:
+        chunk = "".join(buf).encode("utf-8")
+        sink.append(chunk)
+        yield chunk
+
+
+@router.get("/ics")
+def get_schedule_ics(
+    semester: str,
+    request: Request,
+    lecturer_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    group: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.get_feed_user),
+):
+    """iCalendar feed of weekly recurring events for one lecturer, room or group (or the whole semester).
 
-    mapped = []
-    for r in results:
+    Authenticated with a feed token (POST /schedule/ics/token) in ?token=.
+    """
+    if role_of(current_user) == "lecturer":
+        lecturer_id = require_lecturer_link(current_user)
+        room_id = group = None
+    if sum(1 for v in (lecturer_id, room_id, group) if v is not None and v != "") > 1:
+        raise HTTPException(status_code=400, detail="Use only one of lecturer_id, room_id, group")
 
-        mod_name = r.offered_module.module.name if (r.offered_module and r.offered_module.module) else "Unknown"
-        lec_name = "Unassigned"
-        if r.offered_module and r.offered_module.lecturer:
-            lec_name = f"{r.offered_module.lecturer.first_name} {r.offered_module.lecturer.last_name}"
+    tables = _schedule_stamp_tables(semester) + ("semesters",)
+    if group:
+        tables += ("groups", "study_programs")
+    stamp = versions.current_etag_memo(db, ICS_STAMP_TTL, *tables)
+    key = f"{semester}|{lecturer_id or ''}|{room_id or ''}|{group or ''}"
+    etag = '"' + hashlib.sha1(f"{stamp}|{key}".encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Content-Disposition": 'inline; filename="schedule.ics"'}
+    media_type = "text/calendar; charset=utf-8"
 
-        room_name = r.room.name if r.room else "No Room"
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    payload = cache.get(cache.ICS, key, stamp)
+    if payload is not None:
+        return Response(payload, media_type=media_type, headers=headers)
 
-        mapped.append({
-            "id": r.id,
-            "offered_module_id": r.offered_module_id,
-            "module_name": mod_name,
-            "lecturer_name": lec_name,
-            "room_name": room_name,
-            "day_of_week": r.day_of_week,
-            "start_time": r.start_time,
-            "end_time": r.end_time,
-            "semester": r.semester
-        })
-    return mapped
+    sem = db.query(models.Semester).filter(models.Semester.name == semester).first()
+    if not sem:
+        raise HTTPException(status_code=404, detail="Semester not found")
+    db.close()  # rows are streamed on their own session
+
+    stmt = schedule_query.build_statement(semester, lecturer_id=lecturer_id, room_id=room_id, group=group)
+    entries = (schedule_query.to_entry(r) for r in stream_rows(stmt))
+    name = ics.calendar_name(semester, lecturer_id, room_id, group)
+    chunks = []
+
+    def body():
+        yield from _chunked(ics.render(entries, sem.start_date, sem.end_date, name), ICS_CHUNK_BYTES, chunks)
+        cache.put(cache.ICS, key, stamp, b"".join(chunks))  # only a fully sent feed is cached
+
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+@router.get("/conflicts")
+def get_schedule_conflicts(semester: str, db: Session = Depends(get_db),
+                           current_user: models.User = Depends(auth.get_current_user)):
+    """Audit a whole semester. Streams a JSON array of conflict records."""
+    records = audit_semester(db, semester)
+
+    def stream():
+        yield "["
+        first = True
+        for rec in records:
+            yield ("" if first else ",") + json.dumps(rec)
+            first = False
+        yield "]"
+
+    return StreamingResponse(stream(), media_type="application/json")
 
 
 @router.post("/", response_model=ScheduleResponse)
-def create_schedule_entry(entry: ScheduleCreate, db: Session = Depends(get_db)):
-    """Crea una nueva clase en el calendario."""
+def create_schedule_entry(entry: ScheduleCreate, force: bool = False, db: Session = Depends(get_db)):
+    """Crea una nueva clase en el calendario.
+
+    Overlapping room/lecturer bookings are rejected with 409 unless force=true,
+    in which case the entry is stored and the conflicts are reported.
+    """
 
 
     offer = db.query(models.OfferedModule).filter(models.OfferedModule.id == entry.offered_module_id).first()
     if not offer:
         raise HTTPException(status_code=404, detail="Offered Module not found")
 
+    day, start, end = normalize_slot(entry.day_of_week, entry.start_time, entry.end_time)
+    conflicts = find_conflicts(
+        db, entry.semester, day, start, end,
+        room_id=entry.room_id, lecturer_id=offer.lecturer_id,
+    )
+    if conflicts and not force:
+        raise HTTPException(status_code=409, detail={"message": "Schedule conflict", "conflicts": conflicts})
+
 
     new_entry = models.ScheduleEntry(
         offered_module_id=entry.offered_module_id,
         room_id=entry.room_id,
-        day_of_week=entry.day_of_week,
+        day_of_week=day,
         start_time=entry.start_time,
         end_time=entry.end_time,
+        start_minute=start,
+        end_minute=end,
         semester=entry.semester
     )
 
     db.add(new_entry)
     db.commit()
     db.refresh(new_entry)
+    cache.invalidate(cache.SCHEDULE, new_entry.semester)
 
 
     return {
@@ -104,16 +327,202 @@ def create_schedule_entry(entry: ScheduleCreate, db: Session = Depends(get_db)):
         "day_of_week": new_entry.day_of_week,
         "start_time": new_entry.start_time,
         "end_time": new_entry.end_time,
-        "semester": new_entry.semester
+        "semester": new_entry.semester,
+        "conflicts": conflicts
     }
 
 
+class ScheduleBulkCreate(BaseModel):
+    entries: List[ScheduleCreate]
+
+
+MAX_BULK_ENTRIES = 5000
+
+
+@router.post("/bulk", response_model=List[ScheduleResponse])
+def create_schedule_entries_bulk(payload: ScheduleBulkCreate, force: bool = False,
+                                 db: Session = Depends(get_db)):
+    """Insert many entries in one transaction (e.g. copying last year's timetable).
+
+    All-or-nothing: unknown offered modules or conflicts (unless force=true) reject the batch.
+    """
+    items = payload.entries
+    if not items:
+        return []
+    if len(items) > MAX_BULK_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ENTRIES} entries per request")
+
+    offer_ids = {e.offered_module_id for e in items}
+    offers = {
+        o.id: o
+        for o in db.query(models.OfferedModule)
+        .options(joinedload(models.OfferedModule.module), joinedload(models.OfferedModule.lecturer))
+        .filter(models.OfferedModule.id.in_(offer_ids))
+        .all()
+    }
+    missing = sorted(offer_ids - offers.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Offered Module(s) not found: {missing}")
+
+    room_ids = {e.room_id for e in items if e.room_id is not None}
+    rooms = {r.id: r for r in db.query(models.Room).filter(models.Room.id.in_(room_ids)).all()} if room_ids else {}
+    unknown_rooms = sorted(room_ids - rooms.keys())
+    if unknown_rooms:
+        raise HTTPException(status_code=404, detail=f"Room(s) not found: {unknown_rooms}")
+
+    slots = [normalize_slot(e.day_of_week, e.start_time, e.end_time) for e in items]
+    conflicts = find_batch_conflicts(db, [
+        {
+            "ref": f"new:{i}",
+            "semester": e.semester,
+            "day": day,
+            "start": start,
+            "end": end,
+            "room_id": e.room_id,
+            "lecturer_id": offers[e.offered_module_id].lecturer_id,
+        }
+        for i, (e, (day, start, end)) in enumerate(zip(items, slots))
+    ])
+    if conflicts and not force:
+        raise HTTPException(status_code=409, detail={"message": "Schedule conflict", "conflicts": conflicts})
+
+    rows = [
+        {
+            "offered_module_id": e.offered_module_id,
+            "room_id": e.room_id,
+            "day_of_week": day,
+            "day_number": day_number(day),
+            "start_time": e.start_time,
+            "end_time": e.end_time,
+            "start_minute": start,
+            "end_minute": end,
+            "semester": e.semester,
+        }
+        for e, (day, start, end) in zip(items, slots)
+    ]
+    # executemany with RETURNING goes out as multi-row INSERT ... VALUES statements (up to 1000 rows each);
+    # add_all + flush would send one INSERT per row on SQLite. SQLite can't batch sort_by_parameter_order,
+    # but it holds the write lock for the statement, so the new rowids ascend in VALUES order.
+    # Bulk INSERTs skip the unit of work, so the version counters are bumped here.
+    ordered = db.get_bind().dialect.name != "sqlite"
+    ids = db.scalars(
+        insert(models.ScheduleEntry).returning(models.ScheduleEntry.id, sort_by_parameter_order=ordered), rows
+    ).all()
+    if not ordered:
+        ids = sorted(ids)
+    rows = [models.ScheduleEntry(id=i, **row) for i, row in zip(ids, rows)]
+    semesters = {e.semester for e in items}
+    versions.bump(db, *(versions.scoped(models.ScheduleEntry.__tablename__, sem) for sem in semesters))
+    out = [_map_entry(r, offers[r.offered_module_id], rooms.get(r.room_id)) for r in rows]
+    db.commit()
+    for semester in semesters:
+        cache.invalidate(cache.SCHEDULE, semester)
+
+    by_ref = {}
+    for c in conflicts:
+        for ref in c["entry_ids"]:
+            if isinstance(ref, str):
+                by_ref.setdefault(int(ref.split(":")[1]), []).append(c)
+    for i, item in enumerate(out):
+        item["conflicts"] = by_ref.get(i, [])
+    return out
+
+
+@router.delete("/")
+def delete_semester_schedule(semester: str, db: Session = Depends(get_db),
+                             current_user: models.User = Depends(auth.get_current_user)):
+    """Clear a semester's timetable with one DELETE (e.g. a scratch semester after a trial import)."""
+    require_admin_or_pm(current_user)
+    removed = db.execute(delete(models.ScheduleEntry).where(models.ScheduleEntry.semester == semester)).rowcount
+    # Core DELETE bypasses the unit of work
+    versions.bump(db, versions.scoped(models.ScheduleEntry.__tablename__, semester))
+    db.commit()
+    cache.invalidate(cache.SCHEDULE, semester)
+    return {"ok": True, "deleted": removed}
+
+
 @router.delete("/{id}")
 def delete_schedule_entry(id: int, db: Session = Depends(get_db)):
     entry = db.query(models.ScheduleEntry).filter(models.ScheduleEntry.id == id).first()
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
 
+    semester = entry.semester
     db.delete(entry)
     db.commit()
-    return {"ok": True}
\ No newline at end of file
+    cache.invalidate(cache.SCHEDULE, semester)
+    return {"ok": True}
+
+
+@router.post("/solve")
+def solve_schedule(
+    semester: str,
+    background_tasks: BackgroundTasks,
+    sessions_per_module: int = 1,
+    replace: bool = False,
+    dry_run: bool = False,
+    time_limit: float = 10.0,
+    background: bool = False,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Place every OfferedModule of the semester automatically.
+
+    With replace=False existing entries are kept and only missing sessions are added.
+    With background=True a job id is returned; poll GET /schedule/solve/{job_id}.
+    """
+    require_admin_or_pm(current_user)
+    if sessions_per_module < 1:
+        raise HTTPException(status_code=400, detail="sessions_per_module must be >= 1")
+    time_limit = max(0.1, min(time_limit, 120.0))
+
+    if background:
+        job_id = solver.create_job(semester)
+        background_tasks.add_task(
+            solver.run_job, job_id, SessionLocal,
+            sessions_per_module=sessions_per_module, replace=replace,
+            dry_run=dry_run, time_limit=time_limit,
+        )
+        return {"job_id": job_id, "status": "queued"}
+
+    return solver.solve_semester(
+        db, semester,
+        sessions_per_module=sessions_per_module, replace=replace,
+        dry_run=dry_run, time_limit=time_limit,
+    )
+
+
+@router.post("/repair")
+def repair_schedule(
+    semester: str,
+    lecturer_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    dry_run: bool = False,
+    time_limit: float = 2.0,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """Re-place only the entries broken by a lecturer availability or room change.
+
+    Everything else stays where it is unless a broken session fits nowhere
+    else. Placement follows the enabled scheduler rules; the response lists the
+    repaired entries, any other entry that had to move to make room, and the
+    rule violations that still involve one of them.
+    """
+    require_admin_or_pm(current_user)
+    if lecturer_id is None and room_id is None:
+        raise HTTPException(status_code=400, detail="Pass lecturer_id and/or room_id")
+    time_limit = max(0.05, min(time_limit, 30.0))
+    return solver.repair_semester(
+        db, semester, lecturer_id=lecturer_id, room_id=room_id,
+        dry_run=dry_run, time_limit=time_limit,
+    )
+
+
+@router.get("/solve/{job_id}")
+def get_solve_job(job_id: str, current_user: models.User = Depends(auth.get_current_user)):
+    require_admin_or_pm(current_user)
+    job = solver.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
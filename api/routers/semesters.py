@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas, auth  # ✅ Added auth import
+from .. import models, schemas, auth, versions, cache, rollover  # ✅ Added auth import
 from ..permissions import is_admin_or_pm
 
 router = APIRouter(prefix="/semesters", tags=["semesters"])
 
 # GET is open to all users (so the frontend table can load for everyone)
 @router.get("/", response_model=List[schemas.SemesterResponse])
-def get_semesters(db: Session = Depends(get_db)):
+def get_semesters(request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = versions.conditional(request, response, db, "semesters")
+    if not_modified:
+        return not_modified
     return db.query(models.Semester).order_by(models.Semester.start_date.desc()).all()
 
 @router.post("/", response_model=schemas.SemesterResponse)
@@ -50,4 +53,43 @@ def delete_semester(
 
     db.delete(semester)
     db.commit()
-    return {"message": "Semester deleted"}
\ No newline at end of file
+    return {"message": "Semester deleted"}
+
+
+@router.post("/{semester_id}/clone-from/{source_id}")
+def clone_semester(
+    semester_id: int,
+    source_id: int,
+    options: schemas.SemesterCloneOptions = Body(default_factory=schemas.SemesterCloneOptions),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Copy offered modules, lecturer assignments and timetable of source_id into semester_id."""
+    if not is_admin_or_pm(current_user):
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    target = db.query(models.Semester).filter(models.Semester.id == semester_id).first()
+    source = db.query(models.Semester).filter(models.Semester.id == source_id).first()
+    if not target or not source:
+        raise HTTPException(status_code=404, detail="Semester not found")
+
+    source_key = options.source_key or source.name
+    target_key = options.target_key or target.name
+    if source_key == target_key:
+        raise HTTPException(status_code=400, detail="Source and target semester are the same")
+
+    report = rollover.clone_semester(
+        db, source_key, target_key,
+        include_schedule=options.include_schedule,
+        skip_inactive_modules=options.skip_inactive_modules,
+        skip_inactive_rooms=options.skip_inactive_rooms,
+        replace=options.replace,
+    )
+    if options.dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        for key in (report["replaced"] or {}).get("schedule_semesters", []):
+            cache.invalidate(cache.SCHEDULE, key)
+        cache.invalidate(cache.SCHEDULE, target_key)
+    return {"dry_run": options.dry_run, **report}
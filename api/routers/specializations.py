@@ -1,28 +1,31 @@
 # api/routers/specializations.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
-from .. import models, schemas, auth
-from ..permissions import role_of, is_admin_or_pm, hosp_program_ids
+from .. import models, schemas, auth, versions
+from ..permissions import PermissionContext, get_permissions
 
 router = APIRouter(prefix="/specializations", tags=["specializations"])
 
 @router.get("/", response_model=List[schemas.SpecializationResponse])
-def read_specializations(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+def read_specializations(request: Request, response: Response, db: Session = Depends(get_db),
+                         current_user: models.User = Depends(auth.get_current_user)):
+    not_modified = versions.conditional(request, response, db, "specializations")
+    if not_modified:
+        return not_modified
     return db.query(models.Specialization).all()
 
 @router.post("/", response_model=schemas.SpecializationResponse)
 def create_specialization(p: schemas.SpecializationCreate, db: Session = Depends(get_db),
-                          current_user: models.User = Depends(auth.get_current_user)):
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+                          perms: PermissionContext = Depends(get_permissions)):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
+    elif perms.role == "hosp":
         if p.program_id is None:
             raise HTTPException(status_code=400, detail="program_id is required")
-        if p.program_id not in hosp_program_ids(db, current_user):
+        if p.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -35,18 +38,17 @@ def create_specialization(p: schemas.SpecializationCreate, db: Session = Depends
 
 @router.put("/{id}", response_model=schemas.SpecializationResponse)
 def update_specialization(id: int, p: schemas.SpecializationUpdate, db: Session = Depends(get_db),
-                          current_user: models.User = Depends(auth.get_current_user)):
+                          perms: PermissionContext = Depends(get_permissions)):
     row = db.query(models.Specialization).filter(models.Specialization.id == id).first()
     if not row:
         raise HTTPException(status_code=404, detail="Specialization not found")
 
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
-        if row.program_id not in hosp_program_ids(db, current_user):
+    elif perms.role == "hosp":
+        if row.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
-        if p.program_id is not None and p.program_id not in hosp_program_ids(db, current_user):
+        if p.program_id is not None and p.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Cannot move specialization to another program")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -61,16 +63,15 @@ def update_specialization(id: int, p: schemas.SpecializationUpdate, db: Session
 
 @router.delete("/{id}")
 def delete_specialization(id: int, db: Session = Depends(get_db),
-                          current_user: models.User = Depends(auth.get_current_user)):
+                          perms: PermissionContext = Depends(get_permissions)):
     row = db.query(models.Specialization).filter(models.Specialization.id == id).first()
     if not row:
         return {"ok": True}
 
-    r = role_of(current_user)
-    if is_admin_or_pm(current_user):
+    if perms.is_admin_or_pm:
         pass
-    elif r == "hosp":
-        if row.program_id not in hosp_program_ids(db, current_user):
+    elif perms.role == "hosp":
+        if row.program_id not in perms.hosp_program_ids():
             raise HTTPException(status_code=403, detail="Unauthorized for this program")
     else:
         raise HTTPException(status_code=403, detail="Not allowed")
@@ -0,0 +1,471 @@
+# api/rules.py
+#
+# Small declarative language for SchedulerConstraint.rule_text.
+#
+#   max_hours_per_day lecturer <= 6
+#   max_hours_per_week room <= 30
+#   max_sessions_per_day group <= 3
+#   min_gap lecturer >= 15
+#   no_sessions day=Friday after 16:00 scope=program
+#   no_sessions day=Saturday,Sunday
+#   no_sessions before 08:00
+#
+# Several statements can be separated by ";" or new lines. Sentences produced
+# by the constraint builder in the UI ("... is unavailable on Fridays.",
+# "... is open from 08:00 to 20:00.", "... is open on: Monday, ...") are
+# understood as well. Anything else is reported as not evaluable.
+#
+# Rules are compiled once into predicate objects and cached per constraint
+# (checked against updated_at and rule_text); evaluation runs over the whole
+# semester in a single grouped pass per rule.
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .timeslots import DAYS, day_index, format_time, try_parse_time
+
+SUBJECTS = {"lecturer", "room", "module", "program", "group"}
+SCOPES = {"university", "lecturer", "room", "module", "program", "group"}
+
+
+class RuleError(ValueError):
+    pass
+
+
+class EntryRow:
+    __slots__ = ("id", "day", "start", "end", "room_id", "lecturer_id",
+                 "module_code", "program_id", "module_semester")
+
+    def __init__(self, id, day, start, end, room_id, lecturer_id, module_code, program_id, module_semester):
+        self.id = id
+        self.day = day
+        self.start = start
+        self.end = end
+        self.room_id = room_id
+        self.lecturer_id = lecturer_id
+        self.module_code = module_code
+        self.program_id = program_id
+        self.module_semester = module_semester
+
+    def subject_key(self, subject: str):
+        if subject == "lecturer":
+            return self.lecturer_id
+        if subject == "room":
+            return self.room_id
+        if subject == "module":
+            return self.module_code
+        if subject == "program":
+            return self.program_id
+        if subject == "group":
+            # no direct entry <-> group link: a group is its program's cohort for a module semester
+            return (self.program_id, self.module_semester) if self.program_id is not None else None
+        return None
+
+
+def _norm(s: Optional[str]) -> str:
+    return (s or "").strip().lower()
+
+
+def constraint_applies(c: models.SchedulerConstraint, semester: Optional[models.Semester]) -> bool:
+    if not c.is_enabled:
+        return False
+    if semester is None:
+        return True
+    if c.valid_from and c.valid_from > semester.end_date:
+        return False
+    if c.valid_to and c.valid_to < semester.start_date:
+        return False
+    return True
+
+
+def group_programs(db: Session) -> Dict[int, Tuple[int, int]]:
+    """group id -> (program_id, size). Group.program holds the program name, acronym or id."""
+    lookup: Dict[str, int] = {}
+    for p in db.query(models.StudyProgram).all():
+        for key in (_norm(p.name), _norm(p.acronym), str(p.id)):
+            if key:
+                lookup[key] = p.id
+    out: Dict[int, Tuple[int, int]] = {}
+    for g in db.query(models.Group).all():
+        pid = lookup.get(_norm(g.program))
+        if pid is not None:
+            out[g.id] = (pid, g.size or 0)
+    return out
+
+
+# ---------------------------------------------------------
+# Constraint-builder sentences (also read by the solver for its slot grid)
+# ---------------------------------------------------------
+_RE_OPEN_DAYS = re.compile(r"is open on:\s*(.+?)\.?$", re.I)
+_RE_OPEN_HOURS = re.compile(r"is open from\s*(\d{1,2}:\d{2})\s*to\s*(\d{1,2}:\d{2})", re.I)
+_RE_SLOTS = re.compile(r"slots are\s*(\d+)\s*minutes long with a\s*(\d+)\s*minute break", re.I)
+_RE_UNAVAILABLE = re.compile(r"is unavailable on\s*([A-Za-z]+?)s?\.?$", re.I)
+
+
+def parse_sentence(text: Optional[str]) -> dict:
+    """Settings stated by a UI builder sentence; empty when the text is not one.
+
+    Keys: open_days (day names), open_hours (start, end), slots (minutes,
+    break minutes), unavailable (day name).
+    """
+    text = (text or "").strip()
+    out = {}
+    m = _RE_OPEN_DAYS.search(text)
+    if m:
+        days = [DAYS[i] for i in (day_index(x) for x in m.group(1).split(",")) if i is not None]
+        if days:
+            out["open_days"] = days
+    m = _RE_OPEN_HOURS.search(text)
+    if m:
+        start, end = try_parse_time(m.group(1)), try_parse_time(m.group(2))
+        if start is not None and end is not None and start < end:
+            out["open_hours"] = (start, end)
+    m = _RE_SLOTS.search(text)
+    if m and int(m.group(1)) > 0:
+        out["slots"] = (int(m.group(1)), int(m.group(2)))
+    m = _RE_UNAVAILABLE.search(text)
+    if m:
+        i = day_index(m.group(1))
+        if i is not None:
+            out["unavailable"] = DAYS[i]
+    return out
+
+
+# ---------------------------------------------------------
+# Compiled rules
+# ---------------------------------------------------------
+class Rule(ABC):
+    scope_override: Optional[str] = None
+
+    @abstractmethod
+    def describe(self) -> str:
+        ...
+
+    @abstractmethod
+    def evaluate(self, rows: List[EntryRow]) -> List[dict]:
+        ...
+
+
+class MaxPerPeriod(Rule):
+    def __init__(self, measure: str, period: str, subject: str, op: str, limit: float):
+        self.measure = measure  # "hours" | "sessions"
+        self.period = period  # "day" | "week"
+        self.subject = subject
+        self.op = op
+        self.limit = limit
+
+    def describe(self):
+        return f"max_{self.measure}_per_{self.period} {self.subject} {self.op} {self.limit:g}"
+
+    def evaluate(self, rows):
+        totals: Dict[tuple, float] = {}
+        members: Dict[tuple, List[int]] = {}
+        for r in rows:
+            key = r.subject_key(self.subject)
+            if key is None:
+                continue
+            k = (key, r.day) if self.period == "day" else (key,)
+            totals[k] = totals.get(k, 0) + ((r.end - r.start) / 60 if self.measure == "hours" else 1)
+            members.setdefault(k, []).append(r.id)
+
+        out = []
+        for k, total in totals.items():
+            ok = total <= self.limit if self.op == "<=" else total < self.limit
+            if ok:
+                continue
+            v = {self.subject: k[0], "value": round(total, 2), "limit": self.limit, "entry_ids": members[k]}
+            if self.period == "day":
+                v["day_of_week"] = k[1]
+            out.append(v)
+        return out
+
+
+class MinGap(Rule):
+    def __init__(self, subject: str, minutes: int):
+        self.subject = subject
+        self.minutes = minutes
+
+    def describe(self):
+        return f"min_gap {self.subject} >= {self.minutes}"
+
+    def evaluate(self, rows):
+        buckets: Dict[tuple, List[EntryRow]] = {}
+        for r in rows:
+            key = r.subject_key(self.subject)
+            if key is not None:
+                buckets.setdefault((key, r.day), []).append(r)
+        out = []
+        for (key, day), items in buckets.items():
+            items.sort(key=lambda x: x.start)
+            for a, b in zip(items, items[1:]):
+                gap = b.start - a.end
+                if gap < self.minutes:
+                    out.append({
+                        self.subject: key,
+                        "day_of_week": day,
+                        "gap_minutes": gap,
+                        "limit": self.minutes,
+                        "entry_ids": [a.id, b.id],
+                    })
+        return out
+
+
+class NoSessions(Rule):
+    def __init__(self, days: Optional[set] = None, after: Optional[int] = None, before: Optional[int] = None):
+        self.days = days
+        self.after = after
+        self.before = before
+
+    def describe(self):
+        parts = ["no_sessions"]
+        if self.days:
+            parts.append("day=" + ",".join(d for d in DAYS if d in self.days))
+        if self.after is not None:
+            parts.append(f"after {format_time(self.after)}")
+        if self.before is not None:
+            parts.append(f"before {format_time(self.before)}")
+        return " ".join(parts)
+
+    def hits(self, day: str, start: int, end: int) -> bool:
+        if self.days and day not in self.days:
+            return False
+        if self.after is None and self.before is None:
+            return True
+        return (self.after is not None and end > self.after) or \
+               (self.before is not None and start < self.before)
+
+    def evaluate(self, rows):
+        out = []
+        for r in rows:
+            if self.hits(r.day, r.start, r.end):
+                out.append({
+                    "day_of_week": r.day,
+                    "start_time": format_time(r.start),
+                    "end_time": format_time(r.end),
+                    "entry_ids": [r.id],
+                })
+        return out
+
+
+# ---------------------------------------------------------
+# Parser
+# ---------------------------------------------------------
+def _parse_days(value: str) -> set:
+    days = set()
+    for part in value.split(","):
+        i = day_index(part.rstrip("s") if day_index(part) is None else part)
+        if i is None:
+            raise RuleError(f"Unknown day: {part}")
+        days.add(DAYS[i])
+    return days
+
+
+def _parse_statement(stmt: str) -> Rule:
+    tokens = stmt.split()
+    name = tokens[0].lower()
+    scope = None
+    rest = []
+    for t in tokens[1:]:
+        if t.lower().startswith("scope="):
+            scope = t.split("=", 1)[1].lower()
+            if scope not in SCOPES:
+                raise RuleError(f"Unknown scope: {scope}")
+        else:
+            rest.append(t)
+
+    if name.startswith("max_") and name.count("_per_") == 1:
+        measure, period = name[4:].split("_per_")
+        if measure not in ("hours", "sessions") or period not in ("day", "week"):
+            raise RuleError(f"Unknown rule: {name}")
+        if len(rest) != 3 or rest[0].lower() not in SUBJECTS or rest[1] not in ("<=", "<"):
+            raise RuleError(f"Expected: {name} <subject> <= <number>")
+        try:
+            limit = float(rest[2])
+        except ValueError:
+            raise RuleError(f"Not a number: {rest[2]}")
+        rule = MaxPerPeriod(measure, period, rest[0].lower(), rest[1], limit)
+
+    elif name == "min_gap":
+        if len(rest) != 3 or rest[0].lower() not in SUBJECTS or rest[1] != ">=" or not rest[2].isdigit():
+            raise RuleError("Expected: min_gap <subject> >= <minutes>")
+        rule = MinGap(rest[0].lower(), int(rest[2]))
+
+    elif name == "no_sessions":
+        days, after, before = None, None, None
+        i = 0
+        while i < len(rest):
+            t = rest[i].lower()
+            if t.startswith("day="):
+                days = _parse_days(rest[i].split("=", 1)[1])
+            elif t in ("after", "before") and i + 1 < len(rest):
+                minutes = try_parse_time(rest[i + 1])
+                if minutes is None:
+                    raise RuleError(f"Invalid time: {rest[i + 1]}")
+                if t == "after":
+                    after = minutes
+                else:
+                    before = minutes
+                i += 1
+            else:
+                raise RuleError(f"Unexpected token: {rest[i]}")
+            i += 1
+        rule = NoSessions(days, after, before)
+
+    else:
+        raise RuleError(f"Unknown rule: {name}")
+
+    rule.scope_override = scope
+    return rule
+
+
+def _parse_sentence(text: str) -> Optional[List[Rule]]:
+    parsed = parse_sentence(text)
+    if not parsed:
+        return None
+    out: List[Rule] = []
+    if "unavailable" in parsed:
+        out.append(NoSessions({parsed["unavailable"]}))
+    if "open_hours" in parsed:
+        start, end = parsed["open_hours"]
+        out += [NoSessions(before=start), NoSessions(after=end)]
+    if "open_days" in parsed:
+        out.append(NoSessions(set(DAYS) - set(parsed["open_days"])))
+    return out  # a slot-length sentence only shapes the solver grid
+
+
+def compile_rule(text: str) -> List[Rule]:
+    text = (text or "").strip()
+    if not text:
+        raise RuleError("Empty rule")
+    sentence = _parse_sentence(text)
+    if sentence is not None:
+        return sentence
+    statements = [s.strip() for s in text.replace("\n", ";").split(";") if s.strip()]
+    return [_parse_statement(s) for s in statements]
+
+
+# ---------------------------------------------------------
+# Cache of compiled rules, keyed by constraint id and checked against
+# (updated_at, rule_text): updated_at has one-second resolution on SQLite,
+# so two edits within a second are told apart by the text
+# ---------------------------------------------------------
+_compiled: Dict[int, Tuple[object, object]] = {}
+_compiled_lock = threading.Lock()
+
+
+def compiled_rules(c: models.SchedulerConstraint):
+    """-> list of Rule, or a RuleError instance when the text does not parse."""
+    with _compiled_lock:
+        hit = _compiled.get(c.id)
+        if hit is not None and hit[0] == (c.updated_at, c.rule_text):
+            return hit[1]
+    try:
+        value = compile_rule(c.rule_text)
+    except RuleError as e:
+        value = e
+    with _compiled_lock:
+        _compiled[c.id] = ((c.updated_at, c.rule_text), value)
+    return value
+
+
+# ---------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------
+def load_entries(db: Session, semester: str) -> List[EntryRow]:
+    rows = (
+        db.query(
+            models.ScheduleEntry.id,
+            models.ScheduleEntry.day_of_week,
+            models.ScheduleEntry.start_minute,
+            models.ScheduleEntry.end_minute,
+            models.ScheduleEntry.start_time,
+            models.ScheduleEntry.end_time,
+            models.ScheduleEntry.room_id,
+            models.OfferedModule.lecturer_id,
+            models.OfferedModule.module_code,
+            models.Module.program_id,
+            models.Module.semester,
+        )
+        .join(models.OfferedModule, models.OfferedModule.id == models.ScheduleEntry.offered_module_id)
+        .outerjoin(models.Module, models.Module.module_code == models.OfferedModule.module_code)
+        .filter(models.ScheduleEntry.semester == semester)
+        .all()
+    )
+    out = []
+    for r in rows:
+        start = r[2] if r[2] is not None else try_parse_time(r[4])
+        end = r[3] if r[3] is not None else try_parse_time(r[5])
+        if start is None or end is None:
+            continue
+        i = day_index(r[1])  # per-day caps must count "monday"/"Mon" rows with "Monday" ones
+        day = DAYS[i] if i is not None else r[1]
+        out.append(EntryRow(r[0], day, start, end, r[6], r[7], r[8], r[9], r[10]))
+    return out
+
+
+def scope_filter(scope: str, target_id: Optional[str], groups: Dict[int, Tuple[int, int]]):
+    """Predicate on EntryRow selecting a constraint's target; None when it covers everything."""
+    target = str(target_id or "0").strip()
+    if scope == "university" or target in ("", "0"):
+        return None
+    if scope == "lecturer":
+        return lambda r: str(r.lecturer_id) == target
+    if scope == "room":
+        return lambda r: str(r.room_id) == target
+    if scope == "module":
+        return lambda r: r.module_code == target
+    if scope == "program":
+        return lambda r: str(r.program_id) == target
+    if scope == "group":
+        try:
+            pid = groups.get(int(target), (None, 0))[0]
+        except ValueError:
+            pid = None
+        return lambda r: pid is not None and r.program_id == pid
+    return lambda r: False
+
+
+def evaluate_constraints(db: Session, semester: str,
+                         constraint_ids: Optional[List[int]] = None) -> List[dict]:
+    sem_row = db.query(models.Semester).filter(models.Semester.name == semester).first()
+    q = db.query(models.SchedulerConstraint)
+    if constraint_ids:
+        q = q.filter(models.SchedulerConstraint.id.in_(constraint_ids))
+    constraints = [c for c in q.order_by(models.SchedulerConstraint.id).all() if constraint_applies(c, sem_row)]
+    if not constraints:
+        return []
+
+    rows = load_entries(db, semester)
+    groups = group_programs(db)
+    filtered: Dict[tuple, List[EntryRow]] = {}  # rows per (scope, target) computed once
+
+    results = []
+    for c in constraints:
+        compiled = compiled_rules(c)
+        base = {"constraint_id": c.id, "name": c.name, "scope": c.scope, "target_id": c.target_id}
+        if isinstance(compiled, RuleError):
+            results.append({**base, "status": "not_evaluable", "error": str(compiled), "violations": []})
+            continue
+
+        violations = []
+        for rule in compiled:
+            scope = rule.scope_override or (c.scope or "").strip().lower()
+            key = (scope, str(c.target_id or "0"))
+            if key not in filtered:
+                pred = scope_filter(scope, c.target_id, groups)
+                filtered[key] = rows if pred is None else [r for r in rows if pred(r)]
+            for v in rule.evaluate(filtered[key]):
+                v["rule"] = rule.describe()
+                violations.append(v)
+
+        results.append({
+            **base,
+            "status": "violated" if violations else "ok",
+            "rules": [r.describe() for r in compiled],
+            "violations": violations,
+        })
+    return results
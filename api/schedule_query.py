@@ -0,0 +1,156 @@
+# api/schedule_query.py
+#
+# Filtered / paginated / projected reads of schedule_entries, served by
+# GET /schedule/ when any of its optional parameters is given.
+#
+# Rows are read as plain columns with outer joins (no ORM objects) and in
+# week order: (day_number, start_minute NULLS FIRST, id) within a semester,
+# which is what ix_schedule_entries_week_order covers. Pages are addressed
+# by an opaque keyset cursor over that order; an entry without a parsed
+# start_minute sorts first in its day and is matched by an explicit IS NULL
+# predicate rather than a coalesce, so the index stays usable.
+import base64
+import json
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, cast, func, or_, select
+
+from . import models
+from .timeslots import day_index, try_parse_time
+
+FIELDS = [
+    "id", "offered_module_id", "module_name", "lecturer_name", "room_name",
+    "day_of_week", "start_time", "end_time", "semester", "conflicts",
+]
+MAX_LIMIT = 1000
+
+_E = models.ScheduleEntry
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {unknown}. Allowed: {FIELDS}")
+    return wanted
+
+
+def encode_cursor(row) -> str:
+    raw = json.dumps([row.day_number, row.start_minute, row.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, start, entry_id = json.loads(raw)
+        return int(day), (None if start is None else int(start)), int(entry_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _group_program_ids(group: str):
+    # Group.program holds the program name, acronym or id (see rules.group_programs)
+    key = func.lower(func.trim(models.Group.program))
+    p = models.StudyProgram
+    return (
+        select(p.id)
+        .join(models.Group, or_(
+            key == func.lower(func.trim(p.name)),
+            key == func.lower(func.trim(p.acronym)),
+            key == cast(p.id, String),
+        ))
+        .where(models.Group.name == group)
+    )
+
+
+def build_statement(
+    semester: str,
+    lecturer_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    day_of_week: Optional[str] = None,
+    group: Optional[str] = None,
+    program_id: Optional[int] = None,
+    from_time: Optional[str] = None,
+    to_time: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    o, m, lec, room = models.OfferedModule, models.Module, models.Lecturer, models.Room
+    stmt = (
+        select(
+            _E.id, _E.offered_module_id, _E.room_id, _E.day_of_week, _E.start_time, _E.end_time,
+            _E.start_minute, _E.day_number, _E.semester,
+            m.name.label("module_name"), lec.first_name, lec.last_name, room.name.label("room_name"),
+        )
+        .select_from(_E)
+        .outerjoin(o, o.id == _E.offered_module_id)
+        .outerjoin(m, m.module_code == o.module_code)
+        .outerjoin(lec, lec.id == o.lecturer_id)
+        .outerjoin(room, room.id == _E.room_id)
+        .where(_E.semester == semester)
+    )
+
+    if lecturer_id is not None:
+        stmt = stmt.where(o.lecturer_id == lecturer_id)
+    if room_id is not None:
+        stmt = stmt.where(_E.room_id == room_id)
+    if day_of_week:
+        i = day_index(day_of_week)
+        if i is None:
+            raise HTTPException(status_code=400, detail=f"Invalid day: {day_of_week!r}")
+        stmt = stmt.where(_E.day_number == i)
+    if program_id is not None:
+        stmt = stmt.where(m.program_id == program_id)
+    if group:
+        stmt = stmt.where(m.program_id.in_(_group_program_ids(group)))
+
+    # entries overlapping [from_time, to_time)
+    if from_time:
+        start = try_parse_time(from_time)
+        if start is None:
+            raise HTTPException(status_code=400, detail=f"Invalid from_time: {from_time!r}")
+        stmt = stmt.where(_E.end_minute > start)
+    if to_time:
+        end = try_parse_time(to_time)
+        if end is None:
+            raise HTTPException(status_code=400, detail=f"Invalid to_time: {to_time!r}")
+        stmt = stmt.where(_E.start_minute < end)
+
+    if after:
+        day, start, entry_id = decode_cursor(after)
+        if start is None:
+            # NULL starts come first within a day: the rest of them, then every timed entry
+            same_day = or_(and_(_E.start_minute.is_(None), _E.id > entry_id), _E.start_minute.is_not(None))
+        else:
+            same_day = or_(_E.start_minute > start, and_(_E.start_minute == start, _E.id > entry_id))
+        stmt = stmt.where(or_(_E.day_number > day, and_(_E.day_number == day, same_day)))
+
+    stmt = stmt.order_by(_E.day_number, _E.start_minute.nulls_first(), _E.id)
+    if limit is not None:
+        stmt = stmt.limit(max(1, min(limit, MAX_LIMIT)))
+    return stmt
+
+
+def to_entry(row, fields: Optional[List[str]] = None) -> dict:
+    lecturer = "Unassigned"
+    if row.first_name is not None:
+        lecturer = f"{row.first_name} {row.last_name}"
+    entry = {
+        "id": row.id,
+        "offered_module_id": row.offered_module_id,
+        "module_name": row.module_name if row.module_name is not None else "Unknown",
+        "lecturer_name": lecturer,
+        "room_name": row.room_name if row.room_name is not None else "No Room",
+        "day_of_week": row.day_of_week,
+        "start_time": row.start_time,
+        "end_time": row.end_time,
+        "semester": row.semester,
+        "conflicts": [],
+    }
+    if fields:
+        return {f: entry[f] for f in fields}
+    return entry
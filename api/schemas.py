@@ -73,6 +73,12 @@ class LecturerResponse(LecturerBase):
     class Config:
         from_attributes = True
 
+class LecturerSummary(LecturerBase):
+    id: int
+    domain_id: Optional[int] = None
+    domain: Optional[str] = None
+    module_count: int = 0
+
 class LecturerModulesUpdate(BaseModel):
     module_codes: List[str] = []
 
@@ -281,3 +287,13 @@ class SemesterResponse(SemesterBase):
     id: int
     class Config:
         from_attributes = True
+
+class SemesterCloneOptions(BaseModel):
+    include_schedule: bool = True        # copy the weekly timetable too, not just the offers
+    skip_inactive_modules: bool = True   # modules of inactive study programs
+    skip_inactive_rooms: bool = True     # timetable slots in inactive rooms
+    replace: bool = False                # clear the target semester first
+    dry_run: bool = False
+    # semester keys stored on the rows; default to the semesters' names
+    source_key: Optional[str] = None
+    target_key: Optional[str] = None
@@ -0,0 +1,1049 @@
+# api/solver.py
+#
+# Automatic timetable construction for one semester.
+#
+# Every weekly session is placed on a discrete slot grid (day x start time).
+# Occupancy of lecturers, cohorts and rooms is kept as integer bitmasks, so
+# checking a candidate slot is a couple of AND/NOT operations instead of a scan
+# over the already placed entries. Placement runs in two phases:
+#   1. greedy construction, most constrained session first, best-fit room;
+#   2. ejection-chain repair for whatever could not be placed, bounded by a
+#      time budget.
+# Enabled hard rules from api/rules.py are enforced while placing: no_sessions
+# rules are removed from the slot masks, max_*_per_day/week caps are kept as
+# running totals and checked for every candidate spot.
+# repair_semester() reuses the same machinery after a lecturer availability
+# or room change: only the entries that became invalid are re-placed, the
+# rest of the timetable is kept as occupancy.
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from . import models, versions, cache
+from .rules import (
+    EntryRow, MaxPerPeriod, NoSessions, RuleError,
+    compiled_rules, constraint_applies, evaluate_constraints, group_programs, parse_sentence, scope_filter,
+)
+from .timeslots import DAYS, day_index, format_time, try_parse_time, range_mask, decode_week
+
+FIXED = -1  # occupant marker for entries that already exist and must not move
+
+DEFAULT_DAYS = DAYS[:5]
+DEFAULT_DAY_START = 8 * 60
+DEFAULT_DAY_END = 20 * 60
+DEFAULT_SLOT_MINUTES = 90
+DEFAULT_BREAK_MINUTES = 15
+
+
+def _norm(s: Optional[str]) -> str:
+    return (s or "").strip().lower()
+
+
+def _bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# ---------------------------------------------------------
+# Grid configuration (derived from SchedulerConstraint rows)
+# ---------------------------------------------------------
+class GridConfig:
+    def __init__(self, days=None, day_start=DEFAULT_DAY_START, day_end=DEFAULT_DAY_END,
+                 slot_minutes=DEFAULT_SLOT_MINUTES, break_minutes=DEFAULT_BREAK_MINUTES):
+        self.days = list(days or DEFAULT_DAYS)
+        self.day_start = day_start
+        self.day_end = day_end
+        self.slot_minutes = slot_minutes
+        self.break_minutes = break_minutes
+
+    def build_slots(self) -> List[Tuple[str, int, int]]:
+        slots = []
+        for d in DAYS:
+            if d not in self.days:
+                continue
+            t = self.day_start
+            while t + self.slot_minutes <= self.day_end:
+                slots.append((d, t, t + self.slot_minutes))
+                t += self.slot_minutes + self.break_minutes
+        return slots
+
+
+def grid_from_constraints(constraints: List[models.SchedulerConstraint]) -> GridConfig:
+    cfg = GridConfig()
+    for c in constraints:
+        if _norm(c.scope) != "university":
+            continue
+        parsed = parse_sentence(c.rule_text)
+        if "open_days" in parsed:
+            cfg.days = parsed["open_days"]
+        if "open_hours" in parsed:
+            cfg.day_start, cfg.day_end = parsed["open_hours"]
+        if "slots" in parsed:
+            cfg.slot_minutes, cfg.break_minutes = parsed["slots"]
+    return cfg
+
+
+# ---------------------------------------------------------
+# Solver core (no DB access)
+# ---------------------------------------------------------
+class Cap:
+    """A max_<hours|sessions>_per_<day|week> rule kept as running totals per subject."""
+
+    def __init__(self, subject: str, per_day: bool, hours: bool, limit: float, strict: bool,
+                 rooms: Optional[int] = None):
+        self.subject = subject  # lecturer | room | module | program | group
+        self.per_day = per_day
+        self.hours = hours
+        self.limit = limit
+        self.strict = strict
+        self.rooms = rooms  # room-index mask of a room-scoped rule, None = every room
+        self.room_dependent = subject == "room" or rooms is not None
+        self.load: Dict[tuple, float] = {}
+
+    def key(self, lecturer_id, module_code, cohort, room: Optional[int], day: str) -> Optional[tuple]:
+        if self.rooms is not None and (room is None or not (self.rooms >> room) & 1):
+            return None
+        if self.subject == "lecturer":
+            k = lecturer_id
+        elif self.subject == "module":
+            k = module_code
+        elif self.subject == "program":
+            k = cohort[0] if cohort else None
+        elif self.subject == "group":
+            k = cohort
+        else:
+            k = room
+        if k is None:
+            return None
+        return (k, day) if self.per_day else (k,)
+
+    def amount(self, minutes: int) -> float:
+        return minutes / 60 if self.hours else 1
+
+    def fits(self, key: tuple, amount: float) -> bool:
+        total = self.load.get(key, 0) + amount
+        return total < self.limit if self.strict else total <= self.limit + 1e-9
+
+    def add(self, key: tuple, amount: float):
+        self.load[key] = self.load.get(key, 0) + amount
+
+
+class SolverSession:
+    __slots__ = ("idx", "offer_id", "module_code", "lecturer_id", "cohort", "size",
+                 "rooms", "allowed", "caps", "slot", "room")
+
+    def __init__(self, idx, offer_id, module_code, lecturer_id, cohort, size, rooms, allowed, caps=()):
+        self.idx = idx
+        self.offer_id = offer_id
+        self.module_code = module_code
+        self.lecturer_id = lecturer_id
+        self.cohort = cohort
+        self.size = size
+        self.rooms = rooms  # bitmask over room indices
+        self.allowed = allowed  # bitmask over slot indices
+        self.caps = caps  # Cap rules that count this session
+        self.slot = None
+        self.room = None
+
+
+class TimetableSolver:
+    def __init__(self, slots: List[Tuple[str, int, int]], room_count: int):
+        self.slots = slots
+        self.n_slots = len(slots)
+        self.all_slots = (1 << self.n_slots) - 1
+        self.day_mask: Dict[str, int] = {}
+        for i, (d, _, _) in enumerate(slots):
+            self.day_mask[d] = self.day_mask.get(d, 0) | (1 << i)
+        self.slot_day = [d for d, _, _ in slots]
+        self.slot_minutes = [e - s for _, s, e in slots]
+
+        self.room_count = room_count
+        self.room_busy = [0] * self.n_slots  # per slot: bitmask of busy rooms
+        self.slot_load = [0] * self.n_slots
+        self.lec_busy: Dict[int, int] = {}
+        self.cohort_busy: Dict[tuple, int] = {}
+        self.offer_days: Dict[int, int] = {}  # offer -> slot mask of days already used
+
+        self.lec_at: Dict[Tuple[int, int], int] = {}
+        self.cohort_at: Dict[Tuple[tuple, int], int] = {}
+        self.room_at: Dict[Tuple[int, int], int] = {}
+
+        self.sessions: List[SolverSession] = []
+        self._offer_sessions: Dict[int, List[SolverSession]] = {}
+
+    # --- occupancy ---
+    def block_fixed(self, day: str, start: int, end: int, room: Optional[int],
+                    lecturer_id: Optional[int], cohort: Optional[tuple],
+                    module_code: Optional[str] = None, caps=()):
+        for cap in caps:
+            key = cap.key(lecturer_id, module_code, cohort, room, day)
+            if key is not None:
+                cap.add(key, cap.amount(end - start))
+        for t, (d, s, e) in enumerate(self.slots):
+            if d != day or not (s < end and start < e):
+                continue
+            bit = 1 << t
+            if room is not None:
+                self.room_busy[t] |= 1 << room
+                self.room_at[(room, t)] = FIXED
+                self.slot_load[t] += 1
+            if lecturer_id is not None:
+                self.lec_busy[lecturer_id] = self.lec_busy.get(lecturer_id, 0) | bit
+                self.lec_at[(lecturer_id, t)] = FIXED
+            if cohort is not None:
+                self.cohort_busy[cohort] = self.cohort_busy.get(cohort, 0) | bit
+                self.cohort_at[(cohort, t)] = FIXED
+
+    def add_session(self, **kw) -> SolverSession:
+        s = SolverSession(idx=len(self.sessions), **kw)
+        self.sessions.append(s)
+        return s
+
+    def _assign(self, s: SolverSession, t: int, r: int):
+        bit = 1 << t
+        s.slot, s.room = t, r
+        self.room_busy[t] |= 1 << r
+        self.room_at[(r, t)] = s.idx
+        self.slot_load[t] += 1
+        if s.lecturer_id is not None:
+            self.lec_busy[s.lecturer_id] = self.lec_busy.get(s.lecturer_id, 0) | bit
+            self.lec_at[(s.lecturer_id, t)] = s.idx
+        if s.cohort is not None:
+            self.cohort_busy[s.cohort] = self.cohort_busy.get(s.cohort, 0) | bit
+            self.cohort_at[(s.cohort, t)] = s.idx
+        self.offer_days[s.offer_id] = self.offer_days.get(s.offer_id, 0) | self.day_mask[self.slot_day[t]]
+        self._count(s, t, r, 1)
+
+    def _unassign(self, s: SolverSession):
+        t, r = s.slot, s.room
+        bit = 1 << t
+        self._count(s, t, r, -1)
+        self.room_busy[t] &= ~(1 << r)
+        del self.room_at[(r, t)]
+        self.slot_load[t] -= 1
+        if s.lecturer_id is not None:
+            self.lec_busy[s.lecturer_id] &= ~bit
+            del self.lec_at[(s.lecturer_id, t)]
+        if s.cohort is not None:
+            self.cohort_busy[s.cohort] &= ~bit
+            del self.cohort_at[(s.cohort, t)]
+        self._rebuild_offer_days(s.offer_id, exclude=s.idx)
+        s.slot, s.room = None, None
+
+    def _rebuild_offer_days(self, offer_id: int, exclude: Optional[int] = None):
+        mask = 0
+        for o in self._offer_sessions.get(offer_id, ()):
+            if o.idx != exclude and o.slot is not None:
+                mask |= self.day_mask[self.slot_day[o.slot]]
+        self.offer_days[offer_id] = mask
+
+    # --- rule caps ---
+    def _count(self, s: SolverSession, t: int, r: int, sign: int):
+        for cap in s.caps:
+            key = cap.key(s.lecturer_id, s.module_code, s.cohort, r, self.slot_day[t])
+            if key is not None:
+                cap.add(key, sign * cap.amount(self.slot_minutes[t]))
+
+    def _capped_slots(self, s: SolverSession) -> int:
+        """Slots where a room-independent cap of s is already full."""
+        mask = 0
+        for cap in s.caps:
+            if cap.room_dependent:
+                continue
+            for d, day_slots in self.day_mask.items():
+                if mask & day_slots:
+                    continue
+                key = cap.key(s.lecturer_id, s.module_code, s.cohort, None, d)
+                minutes = self.slot_minutes[(day_slots & -day_slots).bit_length() - 1]
+                if key is not None and not cap.fits(key, cap.amount(minutes)):
+                    mask |= day_slots if cap.per_day else self.all_slots
+        return mask
+
+    def _free_rooms(self, s: SolverSession, t: int) -> int:
+        free = s.rooms & ~self.room_busy[t]
+        for cap in s.caps:
+            if not cap.room_dependent:
+                continue
+            for r in _bits(free):
+                key = cap.key(s.lecturer_id, s.module_code, s.cohort, r, self.slot_day[t])
+                if key is not None and not cap.fits(key, cap.amount(self.slot_minutes[t])):
+                    free &= ~(1 << r)
+        return free
+
+    def _fits(self, s: SolverSession, t: int, r: int) -> bool:
+        for cap in s.caps:
+            key = cap.key(s.lecturer_id, s.module_code, s.cohort, r, self.slot_day[t])
+            if key is not None and not cap.fits(key, cap.amount(self.slot_minutes[t])):
+                return False
+        return True
+
+    # --- placement ---
+    def _free_slots(self, s: SolverSession) -> int:
+        busy = self.offer_days.get(s.offer_id, 0)
+        if s.lecturer_id is not None:
+            busy |= self.lec_busy.get(s.lecturer_id, 0)
+        if s.cohort is not None:
+            busy |= self.cohort_busy.get(s.cohort, 0)
+        if s.caps:
+            busy |= self._capped_slots(s)
+        return s.allowed & ~busy
+
+    def _best_place(self, s: SolverSession) -> Optional[Tuple[int, int]]:
+        best = None
+        best_key = None
+        for t in _bits(self._free_slots(s)):
+            free = self._free_rooms(s, t)
+            if not free:
+                continue
+            key = self.slot_load[t]
+            if best_key is None or key < best_key:
+                # lowest set bit == smallest room that fits (rooms are sorted by capacity)
+                best, best_key = (t, (free & -free).bit_length() - 1), key
+                if key == 0:
+                    break
+        return best
+
+    def _try_eject(self, s: SolverSession, place=None) -> bool:
+        """Place s by moving at most two already placed sessions elsewhere (re-placed with place)."""
+        place = place or self._best_place
+        candidates = s.allowed & ~self.offer_days.get(s.offer_id, 0)
+        for t in _bits(candidates):
+            blockers = set()
+            if s.lecturer_id is not None:
+                occ = self.lec_at.get((s.lecturer_id, t))
+                if occ is not None:
+                    blockers.add(occ)
+            if s.cohort is not None:
+                occ = self.cohort_at.get((s.cohort, t))
+                if occ is not None:
+                    blockers.add(occ)
+            if FIXED in blockers:
+                continue
+
+            free = self._free_rooms(s, t)
+            if free:
+                room = (free & -free).bit_length() - 1
+            else:
+                room = None
+                # reuse a room already freed by one of the blockers, else evict one more
+                for b in blockers:
+                    if (s.rooms >> self.sessions[b].room) & 1:
+                        room = self.sessions[b].room
+                        break
+                if room is None:
+                    for r in _bits(s.rooms & self.room_busy[t]):
+                        occ = self.room_at.get((r, t))
+                        if occ is not None and occ != FIXED:
+                            room = r
+                            blockers.add(occ)
+                            break
+                if room is None:
+                    continue
+            if len(blockers) > 2:
+                continue
+
+            moved = [self.sessions[b] for b in blockers]
+            previous = [(m, m.slot, m.room) for m in moved]
+            for m in moved:
+                self._unassign(m)
+            if not self._fits(s, t, room):
+                for m, pt, pr in previous:
+                    self._assign(m, pt, pr)
+                continue
+            self._assign(s, t, room)
+            ok = True
+            replaced = []
+            for m in moved:
+                spot = place(m)
+                if spot is None:
+                    ok = False
+                    break
+                self._assign(m, *spot)
+                replaced.append(m)
+            if ok:
+                return True
+
+            for m in replaced:
+                self._unassign(m)
+            self._unassign(s)
+            for m, pt, pr in previous:
+                self._assign(m, pt, pr)
+        return False
+
+    def solve(self, time_limit: float = 10.0) -> dict:
+        started = time.perf_counter()
+        deadline = started + time_limit
+
+        self._offer_sessions = {}
+        lec_load: Dict[int, int] = {}
+        for s in self.sessions:
+            self._offer_sessions.setdefault(s.offer_id, []).append(s)
+            if s.lecturer_id is not None:
+                lec_load[s.lecturer_id] = lec_load.get(s.lecturer_id, 0) + 1
+
+        def difficulty(s: SolverSession):
+            return (
+                self._free_slots(s).bit_count(),
+                s.rooms.bit_count(),
+                -lec_load.get(s.lecturer_id, 0),
+                -s.size,
+                s.idx,
+            )
+
+        order = sorted(self.sessions, key=difficulty)
+        unplaced: List[SolverSession] = []
+        for s in order:
+            spot = self._best_place(s)
+            if spot is None:
+                unplaced.append(s)
+            else:
+                self._assign(s, *spot)
+
+        unplaced = self._eject_passes(unplaced, deadline, self._best_place)
+        return {
+            "placed": [s for s in self.sessions if s.slot is not None],
+            "unplaced": unplaced,
+            "elapsed_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    def _eject_passes(self, unplaced: List[SolverSession], deadline: float, place) -> List[SolverSession]:
+        # repair passes: keep going while something improves and time remains
+        progress = True
+        while unplaced and progress and time.perf_counter() < deadline:
+            progress = False
+            still = []
+            for s in unplaced:
+                if time.perf_counter() >= deadline:
+                    still.append(s)
+                    continue
+                spot = place(s)
+                if spot is not None:
+                    self._assign(s, *spot)
+                    progress = True
+                elif self._try_eject(s, place):
+                    progress = True
+                else:
+                    still.append(s)
+            unplaced = still
+        return unplaced
+
+    def _nearest_place(self, s: SolverSession, slot: Optional[int], room: Optional[int]) -> Optional[Tuple[int, int]]:
+        """Free spot closest to where s was: same slot, then same day; its old room if still free."""
+        best = None
+        best_key = None
+        for t in _bits(self._free_slots(s)):
+            free = self._free_rooms(s, t)
+            if not free:
+                continue
+            r = room if room is not None and (free >> room) & 1 else (free & -free).bit_length() - 1
+            key = (
+                t != slot,
+                slot is None or self.slot_day[t] != self.slot_day[slot],
+                r != room,
+                self.slot_load[t],
+            )
+            if best_key is None or key < best_key:
+                best, best_key = (t, r), key
+        return best
+
+    def pin(self, s: SolverSession, day: str, start: int, end: int, room: Optional[int]) -> List[SolverSession]:
+        """Keep s at a stored position it could not leave: evict whatever took that spot, then block it."""
+        evicted = []
+        for t, (d, a, b) in enumerate(self.slots):
+            if d != day or not (a < end and start < b):
+                continue
+            for at, key in ((self.room_at, room), (self.lec_at, s.lecturer_id), (self.cohort_at, s.cohort)):
+                occ = at.get((key, t)) if key is not None else None
+                if occ is not None and occ != FIXED:
+                    self._unassign(self.sessions[occ])
+                    evicted.append(self.sessions[occ])
+        self.block_fixed(day, start, end, room, s.lecturer_id, s.cohort, s.module_code, s.caps)
+        return evicted
+
+    def repair(self, pending: List[SolverSession], homes: Dict[int, Tuple[Optional[int], Optional[int]]],
+               origins: Dict[int, Tuple[str, int, int, Optional[int]]], time_limit: float = 2.0) -> dict:
+        """Re-place the pending sessions while everything else stays where it is.
+
+        Placed sessions are only moved when a pending one fits nowhere else, and
+        then at most two per pending session (ejection chain). homes maps a
+        session idx to its old (slot, room) so a session lands as close to its
+        old position as possible; origins holds its stored (day, start, end,
+        room), where a session that cannot be placed is pinned.
+        """
+        started = time.perf_counter()
+        deadline = started + time_limit
+
+        self._offer_sessions = {}
+        for s in self.sessions:
+            self._offer_sessions.setdefault(s.offer_id, []).append(s)
+
+        def place(s):
+            return self._nearest_place(s, *homes.get(s.idx, (None, None)))
+
+        order = sorted(pending, key=lambda s: (self._free_slots(s).bit_count(), s.rooms.bit_count(), s.idx))
+        unplaced: List[SolverSession] = []
+        for s in order:
+            spot = place(s)
+            if spot is None:
+                unplaced.append(s)
+            else:
+                self._assign(s, *spot)
+
+        unplaced = self._eject_passes(unplaced, deadline, place)
+
+        # a session left unplaced keeps its stored entry, so nothing may take that spot
+        pinned = set()
+        stuck = list(unplaced)
+        while stuck:
+            s = stuck.pop()
+            pinned.add(s.idx)
+            if s.idx not in origins:
+                continue
+            for e in self.pin(s, *origins[s.idx]):
+                spot = place(e)
+                if spot is None:
+                    stuck.append(e)
+                else:
+                    self._assign(e, *spot)
+        return {
+            "unplaced": [s for s in pending if s.idx in pinned],
+            "elapsed_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    def unplaced_reason(self, s: SolverSession) -> str:
+        if not s.rooms:
+            return "No active room matches the module room type and group size"
+        if not s.allowed:
+            return "No slot within lecturer availability, opening hours and no_sessions rules"
+        return "No conflict-free slot/room left within the rule caps"
+
+
+# ---------------------------------------------------------
+# DB integration
+# ---------------------------------------------------------
+def cohort_sizes(db: Session) -> Dict[int, int]:
+    """program_id -> largest Group.size of that program."""
+    sizes: Dict[int, int] = {}
+    for pid, size in group_programs(db).values():
+        sizes[pid] = max(sizes.get(pid, 0), size)
+    return sizes
+
+
+def availability_mask(week_bits: Optional[int], slots: List[Tuple[str, int, int]]) -> int:
+    """Slot mask of a lecturer from the quarter-hour week bitmap (None = no restriction)."""
+    if week_bits is None:
+        return (1 << len(slots)) - 1
+    mask = 0
+    for t, (d, start, end) in enumerate(slots):
+        wanted = range_mask(day_index(d), start, end)
+        if week_bits & wanted == wanted:
+            mask |= 1 << t
+    return mask
+
+
+def cohort_of(module: Optional[models.Module]):
+    if module is None or module.program_id is None:
+        return None
+    return (module.program_id, module.semester)
+
+
+class ProblemContext:
+    """Slot grid, active rooms, hard rules and per-offer masks of one semester (shared by solve and repair)."""
+
+    def __init__(self, db: Session, semester: str, grid: Optional[GridConfig] = None):
+        sem_row = db.query(models.Semester).filter(models.Semester.name == semester).first()
+        constraints = [
+            c for c in db.query(models.SchedulerConstraint).all()
+            if constraint_applies(c, sem_row)
+        ]
+        self.grid = grid or grid_from_constraints(constraints)
+        self.slots = self.grid.build_slots()
+
+        self.rooms = (
+            db.query(models.Room)
+            .filter(models.Room.status.is_(True))
+            .order_by(models.Room.capacity.asc(), models.Room.id.asc())
+            .all()
+        )
+        self.room_index = {r.id: i for i, r in enumerate(self.rooms)}
+        self.solver = TimetableSolver(self.slots, len(self.rooms))
+
+        self.room_type_masks: Dict[str, List[Tuple[int, int]]] = {}
+        for i, r in enumerate(self.rooms):
+            self.room_type_masks.setdefault(_norm(r.type), []).append((r.capacity or 0, i))
+
+        self.groups = group_programs(db)
+        self.sizes: Dict[int, int] = {}
+        for pid, size in self.groups.values():
+            self.sizes[pid] = max(self.sizes.get(pid, 0), size)
+
+        self.forbidden: List[tuple] = []  # (predicate on EntryRow or None, slot mask)
+        self.no_sessions: List[tuple] = []  # (scope, target_id, NoSessions) for checking stored entries
+        self.caps: List[tuple] = []  # (predicate on EntryRow or None, Cap)
+        for c in constraints:
+            compiled = compiled_rules(c)
+            if isinstance(compiled, RuleError):
+                continue
+            for rule in compiled:
+                self._add_rule(rule, rule.scope_override or _norm(c.scope), c.target_id)
+
+        self.avail = {
+            lec_id: decode_week(bitmap)
+            for lec_id, bitmap in db.query(
+                models.LecturerAvailability.lecturer_id,
+                models.LecturerAvailability.week_bitmap,
+            ).all()
+        }
+        self._avail_cache: Dict[int, int] = {}
+        self._fields: Dict[int, dict] = {}
+
+    def _add_rule(self, rule, scope: str, target_id):
+        target = str(target_id or "0").strip()
+        rooms = None  # a room-scoped rule with a target only concerns that room
+        if scope == "room" and target not in ("", "0"):
+            i = self.room_index.get(int(target)) if target.isdigit() else None
+            if i is None:
+                return  # inactive or unknown room: nothing can be placed there
+            rooms = 1 << i
+        pred = None if rooms is not None else scope_filter(scope, target_id, self.groups)
+
+        if isinstance(rule, NoSessions):
+            self.no_sessions.append((scope, target_id, rule))
+            mask = 0
+            for t, (d, start, end) in enumerate(self.slots):
+                if rule.hits(d, start, end):
+                    mask |= 1 << t
+            if rooms is None:
+                self.forbidden.append((pred, mask))
+                return
+            # a room closed for some slots is marked busy there
+            for t in _bits(mask):
+                self.solver.room_busy[t] |= rooms
+                self.solver.room_at[(rooms.bit_length() - 1, t)] = FIXED
+        elif isinstance(rule, MaxPerPeriod):
+            cap = Cap(rule.subject, rule.period == "day", rule.measure == "hours", rule.limit, rule.op == "<", rooms)
+            self.caps.append((pred, cap))
+        # min_gap is not checked here: consecutive grid slots are always break_minutes apart
+
+    def broken_rule(self, row: EntryRow) -> Optional[str]:
+        """The no_sessions rule a stored entry falls into, if any."""
+        for scope, target_id, rule in self.no_sessions:
+            pred = scope_filter(scope, target_id, self.groups)
+            if (pred is None or pred(row)) and rule.hits(row.day, row.start, row.end):
+                return rule.describe()
+        return None
+
+    def session_fields(self, o: models.OfferedModule) -> dict:
+        """add_session() keyword arguments for one session of an offer."""
+        if o.id in self._fields:
+            return self._fields[o.id]
+        m = o.module
+        size = self.sizes.get(m.program_id, 0) if m else 0
+        wanted_type = _norm(m.room_type) if m else ""
+        room_mask = 0
+        pools = [self.room_type_masks.get(wanted_type, [])] if wanted_type else self.room_type_masks.values()
+        for pool in pools:
+            for cap, i in pool:
+                if cap >= size:
+                    room_mask |= 1 << i
+
+        row = EntryRow(None, None, None, None, None, o.lecturer_id, o.module_code,
+                       m.program_id if m else None, m.semester if m else None)
+        allowed = self.solver.all_slots
+        for pred, mask in self.forbidden:
+            if pred is None or pred(row):
+                allowed &= ~mask
+        if o.lecturer_id is not None:
+            if o.lecturer_id not in self._avail_cache:
+                self._avail_cache[o.lecturer_id] = availability_mask(self.avail.get(o.lecturer_id), self.slots)
+            allowed &= self._avail_cache[o.lecturer_id]
+
+        self._fields[o.id] = {
+            "offer_id": o.id,
+            "module_code": o.module_code,
+            "lecturer_id": o.lecturer_id,
+            "cohort": cohort_of(m),
+            "size": size,
+            "rooms": room_mask,
+            "allowed": allowed,
+            "caps": tuple(cap for pred, cap in self.caps if pred is None or pred(row)),
+        }
+        return self._fields[o.id]
+
+
+def _offers(db: Session, semester: str) -> Dict[int, models.OfferedModule]:
+    offers = (
+        db.query(models.OfferedModule)
+        .options(joinedload(models.OfferedModule.module))
+        .filter(models.OfferedModule.semester == semester)
+        .all()
+    )
+    return {o.id: o for o in offers}
+
+
+def _entry_range(day: Optional[str], start_minute, end_minute, start_time, end_time):
+    """(day index, start, end) of a stored entry, or None if its time cannot be read."""
+    d = day_index(day)
+    start = start_minute if start_minute is not None else try_parse_time(start_time)
+    end = end_minute if end_minute is not None else try_parse_time(end_time)
+    if d is None or start is None or end is None:
+        return None
+    return d, start, end
+
+
+def build_problem(db: Session, semester: str, sessions_per_module: int = 1, replace: bool = False,
+                  grid: Optional[GridConfig] = None):
+    ctx = ProblemContext(db, semester, grid)
+    solver, rooms, room_index = ctx.solver, ctx.rooms, ctx.room_index
+    offer_by_id = _offers(db, semester)
+
+    existing_count: Dict[int, int] = {}
+    existing = db.query(models.ScheduleEntry).filter(models.ScheduleEntry.semester == semester).all()
+    if not replace:
+        for e in existing:
+            o = offer_by_id.get(e.offered_module_id)
+            existing_count[e.offered_module_id] = existing_count.get(e.offered_module_id, 0) + 1
+            start, end = try_parse_time(e.start_time), try_parse_time(e.end_time)
+            if start is None or end is None or day_index(e.day_of_week) is None:
+                continue
+            solver.block_fixed(
+                DAYS[day_index(e.day_of_week)], start, end,
+                room_index.get(e.room_id),
+                o.lecturer_id if o else None,
+                cohort_of(o.module) if o else None,
+                module_code=o.module_code if o else None,
+                caps=ctx.session_fields(o)["caps"] if o else (),
+            )
+
+    for o in offer_by_id.values():
+        need = sessions_per_module - existing_count.get(o.id, 0)
+        if need <= 0:
+            continue
+        fields = ctx.session_fields(o)
+        for _ in range(need):
+            solver.add_session(**fields)
+
+    return solver, rooms, existing
+
+
+def solve_semester(db: Session, semester: str, sessions_per_module: int = 1, replace: bool = False,
+                   dry_run: bool = False, time_limit: float = 10.0,
+                   grid: Optional[GridConfig] = None) -> dict:
+    solver, rooms, existing = build_problem(db, semester, sessions_per_module, replace, grid)
+    result = solver.solve(time_limit=time_limit)
+
+    created = []
+    for s in result["placed"]:
+        day, start, end = solver.slots[s.slot]
+        created.append({
+            "offered_module_id": s.offer_id,
+            "room_id": rooms[s.room].id,
+            "day_of_week": day,
+            "start_time": format_time(start),
+            "end_time": format_time(end),
+            "start_minute": start,
+            "end_minute": end,
+            "semester": semester,
+        })
+
+    if not dry_run:
+        if replace:
+            for e in existing:
+                db.delete(e)
+        if created:
+            db.bulk_insert_mappings(models.ScheduleEntry, created)
+            table = models.ScheduleEntry.__tablename__
+            versions.bump(db, table, versions.scoped(table, semester))
+        db.commit()
+        cache.invalidate(cache.SCHEDULE, semester)
+
+    return {
+        "semester": semester,
+        "dry_run": dry_run,
+        "sessions": len(solver.sessions),
+        "placed": len(created),
+        "unplaced": [
+            {
+                "offered_module_id": s.offer_id,
+                "module_code": s.module_code,
+                "reason": solver.unplaced_reason(s),
+            }
+            for s in result["unplaced"]
+        ],
+        "slots": len(solver.slots),
+        "rooms": len(rooms),
+        "elapsed_ms": result["elapsed_ms"],
+        "entries": created,
+    }
+
+
+# ---------------------------------------------------------
+# Incremental repair after a lecturer or room change
+# ---------------------------------------------------------
+def _invalidated(db: Session, ctx: ProblemContext, fields_of, semester: str,
+                 lecturer_id: Optional[int], room_id: Optional[int]) -> Dict[int, str]:
+    """entry id -> reason, for that lecturer's entries / that room's entries which no longer fit."""
+    E, O, M = models.ScheduleEntry, models.OfferedModule, models.Module
+    query = (
+        db.query(E.id, E.offered_module_id, E.day_of_week, E.start_minute, E.end_minute, E.start_time, E.end_time,
+                 E.room_id, O.lecturer_id, O.module_code, M.program_id, M.semester)
+        .join(O, O.id == E.offered_module_id)
+        .outerjoin(M, M.module_code == O.module_code)
+    )
+
+    def entry_row(r) -> Optional[EntryRow]:
+        rng = _entry_range(r.day_of_week, r.start_minute, r.end_minute, r.start_time, r.end_time)
+        if rng is None:
+            return None
+        return EntryRow(r.id, DAYS[rng[0]], rng[1], rng[2], r.room_id, r.lecturer_id,
+                        r.module_code, r.program_id, r.semester)
+
+    out: Dict[int, str] = {}
+    if lecturer_id is not None:
+        week = ctx.avail.get(lecturer_id)
+        rows = query.filter(O.semester == semester, O.lecturer_id == lecturer_id, E.semester == semester).all()
+        for r in rows:
+            row = entry_row(r)
+            if row is None:
+                continue
+            broken = ctx.broken_rule(row)
+            wanted = range_mask(day_index(row.day), row.start, row.end)
+            if broken:
+                out[r.id] = f"Breaks rule: {broken}"
+            elif week is not None and week & wanted != wanted:
+                out[r.id] = "Outside the lecturer's availability"
+
+    if room_id is not None:
+        room = db.get(models.Room, room_id)
+        for r in query.filter(E.semester == semester, E.room_id == room_id).all():
+            row = entry_row(r)
+            broken = ctx.broken_rule(row) if row is not None else None
+            if room is None:
+                out[r.id] = "Room no longer exists"
+            elif not room.status:
+                out[r.id] = "Room is inactive"
+            elif broken:
+                out[r.id] = f"Breaks rule: {broken}"
+            else:
+                fields = fields_of(r.offered_module_id)
+                if fields is not None and not (fields["rooms"] >> ctx.room_index[room_id]) & 1:
+                    out[r.id] = "Room no longer matches the module room type or group size"
+    return out
+
+
+def repair_semester(db: Session, semester: str, lecturer_id: Optional[int] = None, room_id: Optional[int] = None,
+                    dry_run: bool = False, time_limit: float = 2.0,
+                    grid: Optional[GridConfig] = None) -> dict:
+    """Re-place only the entries invalidated by a lecturer or room change.
+
+    The entries of that lecturer / room are checked through the semester
+    indexes; every other entry is loaded as occupancy and stays put unless a
+    broken session fits nowhere else, in which case the ejection chain moves
+    at most two of them per session. Placement obeys the same hard rules as
+    the full solve, and rule_violations lists whatever constraint violations
+    still involve a repaired, moved or unplaced entry afterwards. Entries are
+    updated in place, so their ids (and calendar UIDs) survive the repair.
+    """
+    started = time.perf_counter()
+    ctx = ProblemContext(db, semester, grid)
+    solver = ctx.solver
+    offer_by_id = _offers(db, semester)
+
+    fields: Dict[int, Optional[dict]] = {}
+
+    def fields_of(offer_id):
+        if offer_id not in fields:
+            o = offer_by_id.get(offer_id)
+            fields[offer_id] = ctx.session_fields(o) if o else None
+        return fields[offer_id]
+
+    invalid = _invalidated(db, ctx, fields_of, semester, lecturer_id, room_id)
+    result = {
+        "semester": semester,
+        "dry_run": dry_run,
+        "lecturer_id": lecturer_id,
+        "room_id": room_id,
+        "invalidated": len(invalid),
+        "repaired": [],
+        "moved": [],
+        "unplaced": [],
+        "rule_violations": [],
+    }
+    if not invalid:
+        result["elapsed_ms"] = int((time.perf_counter() - started) * 1000)
+        return result
+
+    E = models.ScheduleEntry
+    rows = db.query(
+        E.id, E.offered_module_id, E.room_id, E.day_of_week, E.start_minute, E.end_minute, E.start_time, E.end_time,
+    ).filter(E.semester == semester).all()
+    slot_of = {(day_index(d), start, end): t for t, (d, start, end) in enumerate(solver.slots)}
+
+    def occupancy_keys(t, r, f):
+        keys = [("room", r, t)]
+        if f["lecturer_id"] is not None:
+            keys.append(("lecturer", f["lecturer_id"], t))
+        if f["cohort"] is not None:
+            keys.append(("cohort", f["cohort"], t))
+        return keys
+
+    def block(rng, room, f):
+        solver.block_fixed(DAYS[rng[0]], rng[1], rng[2], ctx.room_index.get(room),
+                           f["lecturer_id"] if f else None, f["cohort"] if f else None,
+                           module_code=f["module_code"] if f else None, caps=f["caps"] if f else ())
+
+    # entries that are off the grid, in an inactive room or already clashing stay fixed;
+    # everything else is a placed session the ejection chain may move
+    broken, placed, keys = [], [], {}
+    for row in rows:
+        rng = _entry_range(row.day_of_week, row.start_minute, row.end_minute, row.start_time, row.end_time)
+        f = fields_of(row.offered_module_id)
+        if row.id in invalid:
+            broken.append((row, rng, f))
+            continue
+        if rng is None:
+            continue
+        t, r = slot_of.get(rng), ctx.room_index.get(row.room_id)
+        if f is None or t is None or r is None:
+            block(rng, row.room_id, f)
+            continue
+        placed.append((row, rng, f, t, r))
+        for k in occupancy_keys(t, r, f):
+            keys[k] = keys.get(k, 0) + 1
+
+    movable = []
+    for item in placed:
+        row, rng, f, t, r = item
+        if any(keys[k] > 1 for k in occupancy_keys(t, r, f)):
+            block(rng, row.room_id, f)
+        else:
+            movable.append(item)
+
+    entry_of: Dict[int, tuple] = {}
+    homes: Dict[int, Tuple[Optional[int], Optional[int]]] = {}
+    origins: Dict[int, Tuple[str, int, int, Optional[int]]] = {}
+    for row, rng, f, t, r in movable:
+        bit = 1 << t
+        busy = (solver.room_busy[t] >> r) & 1
+        if f["lecturer_id"] is not None:
+            busy = busy or solver.lec_busy.get(f["lecturer_id"], 0) & bit
+        if f["cohort"] is not None:
+            busy = busy or solver.cohort_busy.get(f["cohort"], 0) & bit
+        if busy:
+            block(rng, row.room_id, f)
+            continue
+        s = solver.add_session(**f)
+        solver._assign(s, t, r)
+        entry_of[s.idx], homes[s.idx] = row, (t, r)
+        origins[s.idx] = (DAYS[rng[0]], rng[1], rng[2], r)
+
+    pending = []
+    for row, rng, f in broken:
+        if f is None:
+            result["unplaced"].append({
+                "id": row.id, "offered_module_id": row.offered_module_id, "module_code": None,
+                "reason": invalid[row.id], "detail": "Entry has no offered module in this semester",
+            })
+            continue
+        s = solver.add_session(**f)
+        pending.append(s)
+        entry_of[s.idx] = row
+        homes[s.idx] = (slot_of.get(rng) if rng else None, ctx.room_index.get(row.room_id))
+        if rng is not None:
+            origins[s.idx] = (DAYS[rng[0]], rng[1], rng[2], ctx.room_index.get(row.room_id))
+
+    outcome = solver.repair(pending, homes, origins, time_limit=time_limit)
+
+    updates: Dict[int, tuple] = {}
+    for idx, row in entry_of.items():
+        s = solver.sessions[idx]
+        if s.slot is None or (s.slot, s.room) == homes[idx]:
+            continue
+        day, start, end = solver.slots[s.slot]
+        updates[row.id] = (day, start, end, ctx.rooms[s.room].id)
+        change = {
+            "id": row.id,
+            "offered_module_id": s.offer_id,
+            "module_code": s.module_code,
+            "from": {"day_of_week": row.day_of_week, "start_time": row.start_time,
+                     "end_time": row.end_time, "room_id": row.room_id},
+            "to": {"day_of_week": day, "start_time": format_time(start),
+                   "end_time": format_time(end), "room_id": ctx.rooms[s.room].id},
+        }
+        if row.id in invalid:
+            change["reason"] = invalid[row.id]
+            result["repaired"].append(change)
+        else:
+            result["moved"].append(change)
+    for s in outcome["unplaced"]:
+        row = entry_of[s.idx]
+        result["unplaced"].append({
+            "id": row.id, "offered_module_id": s.offer_id, "module_code": s.module_code,
+            "reason": invalid[row.id], "detail": solver.unplaced_reason(s),
+        })
+
+    if updates:
+        for e in db.query(E).filter(E.id.in_(updates)).all():
+            day, start, end, room = updates[e.id]
+            e.day_of_week, e.room_id = day, room
+            e.start_time, e.end_time = format_time(start), format_time(end)
+            e.start_minute, e.end_minute = start, end
+        db.flush()
+
+    # rule check of the repaired timetable (flushed, so a dry run sees it too)
+    touched = set(updates) | {u["id"] for u in result["unplaced"]}
+    for c in evaluate_constraints(db, semester):
+        for v in c["violations"]:
+            if touched & set(v["entry_ids"]):
+                result["rule_violations"].append({"constraint_id": c["constraint_id"], "name": c["name"], **v})
+
+    if dry_run:
+        db.rollback()
+    elif updates:
+        db.commit()
+        cache.invalidate(cache.SCHEDULE, semester)
+
+    result["solve_ms"] = outcome["elapsed_ms"]
+    result["elapsed_ms"] = int((time.perf_counter() - started) * 1000)
+    return result
+
+
+# ---------------------------------------------------------
+# Background jobs (in-process; good enough for a single worker)
+# ---------------------------------------------------------
+_jobs: Dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+
+
+def create_job(semester: str) -> str:
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {"id": job_id, "semester": semester, "status": "queued", "result": None, "error": None}
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def run_job(job_id: str, session_factory, **kwargs):
+    with _jobs_lock:
+        _jobs[job_id]["status"] = "running"
+    db = session_factory()
+    try:
+        result = solve_semester(db, _jobs[job_id]["semester"], **kwargs)
+        with _jobs_lock:
+            _jobs[job_id].update(status="done", result=result)
+    except Exception as e:
+        db.rollback()
+        with _jobs_lock:
+            _jobs[job_id].update(status="failed", error=str(e))
+    finally:
+        db.close()
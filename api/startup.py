@@ -0,0 +1,45 @@
+# api/startup.py
+#
+# Cold-start profiler: records how long each import/init step of api/index.py
+# takes. The report is served by GET /startup and printed when
+# STARTUP_PROFILE=1.
+import os
+import time
+from contextlib import contextmanager
+
+PROCESS_STARTED = time.perf_counter()
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0").lower() in ("1", "true", "yes")
+
+_steps = []
+_ready_at = None
+
+
+@contextmanager
+def step(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _steps.append((name, (time.perf_counter() - started) * 1000))
+
+
+def mark_ready():
+    global _ready_at
+    _ready_at = time.perf_counter()
+    if STARTUP_PROFILE:
+        print(format_report())
+
+
+def report() -> dict:
+    return {
+        "total_ms": round(((_ready_at or time.perf_counter()) - PROCESS_STARTED) * 1000, 1),
+        "steps": [{"name": n, "ms": round(ms, 1)} for n, ms in _steps],
+    }
+
+
+def format_report() -> str:
+    r = report()
+    lines = [f"startup: {r['total_ms']} ms"]
+    for s in sorted(r["steps"], key=lambda x: -x["ms"]):
+        lines.append(f"  {s['ms']:8.1f} ms  {s['name']}")
+    return "\n".join(lines)
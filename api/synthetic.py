@@ -0,0 +1,234 @@
+# api/synthetic.py
+#
+# Deterministic synthetic university for benchmarks and local testing:
+#   DATABASE_URL=sqlite:///bench.db python -m api.synthetic --scale 2 --reset
+#
+# The same (scale, seed) always produces the same rows, ids included, so
+# benchmark baselines taken on different commits are comparable. Scale 1 is
+# a small faculty (4 programs, 120 modules, 50 lecturers, 25 rooms, ~240
+# schedule entries per semester); everything grows linearly with it.
+#
+# Rows are written with bulk INSERTs, bypassing the unit of work, so the
+# table version counters are bumped explicitly at the end.
+import argparse
+import datetime
+import random
+import sys
+
+from sqlalchemy import func, insert, select
+
+from . import models, versions
+from .database import SessionLocal, engine
+from .timeslots import DAYS, encode_week, format_time
+
+# (name, acronym, start, end); schedule rows refer to the semester by name
+SEMESTERS = [
+    ("W24", "WiSe 24/25", datetime.date(2024, 10, 1), datetime.date(2025, 2, 15)),
+    ("S25", "SoSe 25", datetime.date(2025, 3, 1), datetime.date(2025, 7, 15)),
+]
+DOMAINS = ["Computer Science", "Business", "Design", "Engineering", "Media", "Psychology", "Law", "Languages"]
+ROOM_TYPES = ["Lecture Classroom", "Computer Lab", "Seminar"]
+ASSESSMENTS = [
+    [("Written Exam", 100)],
+    [("Oral Exam", 100)],
+    [("Written Exam", 60), ("Project", 40)],
+    [("Project", 50), ("Presentation", 50)],
+    [("Oral Exam", 40), ("Portfolio", 60)],
+]
+CONSTRAINTS = [
+    ("Lecturer daily load", "max_hours_per_day lecturer <= 6", "university"),
+    ("Room weekly load", "max_hours_per_week room <= 30", "university"),
+    ("Group sessions per day", "max_sessions_per_day group <= 3", "university"),
+    ("No late Fridays", "no_sessions day=Friday after 16:00", "university"),
+]
+SLOTS = [(8 * 60, 9 * 60 + 30), (9 * 60 + 45, 11 * 60 + 15), (11 * 60 + 30, 13 * 60),
+         (14 * 60, 15 * 60 + 30), (15 * 60 + 45, 17 * 60 + 15)]
+PASSWORD = "bench"
+USERS = [
+    ("admin@bench.local", "admin", None),
+    ("pm@bench.local", "pm", None),
+    ("hosp@bench.local", "hosp", 1),  # head of program 1
+    ("lecturer@bench.local", "lecturer", 2),
+    ("student@bench.local", "student", None),
+]
+
+
+def counts(scale: int) -> dict:
+    return {
+        "programs": 4 * scale,
+        "modules_per_program": 30,
+        "lecturers": 50 * scale,
+        "rooms": 25 * scale,
+        "groups_per_program": 3,
+    }
+
+
+def build(scale: int = 1, seed: int = 42) -> dict:
+    """{model: [row dicts]} for the whole dataset (no database access)."""
+    rnd = random.Random(seed)
+    n = counts(scale)
+    rows = {m: [] for m in (
+        models.Domain, models.Lecturer, models.StudyProgram, models.Specialization, models.Module,
+        models.ModuleAssessment, models.Room, models.Group, models.Semester, models.LecturerAvailability,
+        models.OfferedModule, models.ScheduleEntry, models.SchedulerConstraint, models.User,
+    )}
+    links = {models.module_specializations: [], models.lecturer_modules: []}
+
+    for i, name in enumerate(DOMAINS, start=1):
+        rows[models.Domain].append({"id": i, "name": name})
+
+    for i in range(1, n["lecturers"] + 1):
+        rows[models.Lecturer].append({
+            "id": i,
+            "first_name": f"Lecturer{i}",
+            "last_name": f"Synthetic{rnd.randint(1, 999)}",
+            "title": rnd.choice(["Dr.", "Prof.", "Prof. Dr."]),
+            "employment_type": rnd.choice(["Full time", "Part time", "Freelance"]),
+            "mdh_email": f"lecturer{i}@bench.local",
+            "location": rnd.choice(["Berlin", "Hamburg", "Munich", "Online"]),
+            "domain_id": rnd.randint(1, len(DOMAINS)),
+        })
+        if rnd.random() < 0.8:
+            week = {
+                day: {"is_available": rnd.random() < 0.8,
+                      "ranges": [{"start": format_time(rnd.choice([8, 9, 10]) * 60),
+                                  "end": format_time(rnd.choice([16, 17, 18]) * 60)}]}
+                for day in DAYS[:5]
+            }
+            rows[models.LecturerAvailability].append(
+                {"lecturer_id": i, "schedule_data": week, "week_bitmap": encode_week(week)}
+            )
+
+    spec_id = 0
+    for p in range(1, n["programs"] + 1):
+        rows[models.StudyProgram].append({
+            "id": p, "name": f"Program {p}", "acronym": f"P{p}", "status": True, "start_date": "2020-10-01",
+            "total_ects": 180, "level": "Bachelor", "degree_type": "B.Sc.",
+            "head_of_program_id": rnd.randint(1, n["lecturers"]) if p > 1 else 1,
+        })
+        specs = []
+        for s in range(2):
+            spec_id += 1
+            specs.append(spec_id)
+            rows[models.Specialization].append({
+                "id": spec_id, "program_id": p, "name": f"Specialization {p}.{s + 1}",
+                "acronym": f"P{p}S{s + 1}", "start_date": "2021-10-01", "status": True,
+            })
+        for g in range(n["groups_per_program"]):
+            rows[models.Group].append({"name": f"P{p}-G{g + 1}", "size": rnd.randint(15, 60), "program": f"P{p}"})
+        for m in range(n["modules_per_program"]):
+            code = f"P{p}M{m + 1:02d}"
+            rows[models.Module].append({
+                "module_code": code, "name": f"Module {code}", "ects": rnd.choice([5, 5, 5, 10]),
+                "room_type": rnd.choice(ROOM_TYPES), "semester": m % 6 + 1, "category": rnd.choice(["Core", "Elective"]),
+                "program_id": p,
+            })
+            parts = rnd.choice(ASSESSMENTS)
+            rows[models.Module][-1]["assessment_type"] = parts[0][0]
+            for pos, (t, w) in enumerate(parts):
+                rows[models.ModuleAssessment].append(
+                    {"module_code": code, "position": pos, "type": t, "type_key": t.lower(), "weight": w}
+                )
+            if rnd.random() < 0.5:
+                links[models.module_specializations].append({"module_code": code, "specialization_id": rnd.choice(specs)})
+            for lec in rnd.sample(range(1, n["lecturers"] + 1), rnd.randint(1, 2)):
+                links[models.lecturer_modules].append({"lecturer_id": lec, "module_code": code})
+
+    for i in range(1, n["rooms"] + 1):
+        rows[models.Room].append({
+            "id": i, "name": f"Room {i:03d}", "capacity": rnd.choice([20, 30, 40, 60, 80, 120]),
+            "type": rnd.choice(ROOM_TYPES), "status": True, "location": rnd.choice(["Berlin", "Hamburg"]),
+        })
+
+    module_lecturers = {}
+    for link in links[models.lecturer_modules]:
+        module_lecturers.setdefault(link["module_code"], []).append(link["lecturer_id"])
+
+    offer_id = entry_id = 0
+    for sem_index, (semester, acronym, start, end) in enumerate(SEMESTERS):
+        rows[models.Semester].append({"id": sem_index + 1, "name": semester, "acronym": acronym, "start_date": start, "end_date": end})
+        for module in rows[models.Module]:
+            if module["semester"] % 2 != 1 - sem_index:
+                continue  # winter runs odd module semesters, summer even ones
+            offer_id += 1
+            rows[models.OfferedModule].append({
+                "id": offer_id, "module_code": module["module_code"], "semester": semester, "status": "Confirmed",
+                "lecturer_id": rnd.choice(module_lecturers[module["module_code"]]),
+            })
+            for _ in range(2):
+                entry_id += 1
+                s, e = rnd.choice(SLOTS)
+                rows[models.ScheduleEntry].append({
+                    "id": entry_id, "offered_module_id": offer_id, "room_id": rnd.randint(1, n["rooms"]),
+                    "day_of_week": rnd.choice(DAYS[:5]), "start_time": format_time(s), "end_time": format_time(e),
+                    "start_minute": s, "end_minute": e, "semester": semester,
+                })
+
+    for name, rule, scope in CONSTRAINTS:
+        rows[models.SchedulerConstraint].append(
+            {"name": name, "category": "General", "rule_text": rule, "scope": scope, "target_id": "0", "is_enabled": True}
+        )
+
+    from .auth import get_password_hash
+    password_hash = get_password_hash(PASSWORD)
+    for email, role, lecturer_id in USERS:
+        rows[models.User].append({"email": email, "password_hash": password_hash, "role": role, "lecturer_id": lecturer_id})
+
+    return {"rows": rows, "links": links}
+
+
+def generate(scale: int = 1, seed: int = 42, reset: bool = False) -> dict:
+    """Write the dataset into the configured database; returns row counts per table."""
+    from .manage import migrate
+
+    if reset:
+        models.Base.metadata.drop_all(bind=engine)
+    migrate()
+
+    db = SessionLocal()
+    try:
+        if db.execute(select(func.count()).select_from(models.Lecturer)).scalar_one():
+            raise SystemExit("The database already has data; pass --reset to replace it.")
+
+        data = build(scale, seed)
+        written = {}
+        for model, rows in data["rows"].items():
+            if rows:
+                db.execute(insert(model), rows)
+            written[model.__tablename__] = len(rows)
+        for table, rows in data["links"].items():
+            if rows:
+                db.execute(table.insert(), rows)
+            written[table.name] = len(rows)
+
+        tables = list(written) + [versions.scoped("schedule_entries", s[0]) for s in SEMESTERS]
+        tables += [versions.scoped("offered_modules", s[0]) for s in SEMESTERS]
+        versions.bump(db, *tables)
+        db.commit()
+    finally:
+        db.close()
+
+    if engine.dialect.name in ("sqlite", "postgresql"):
+        # planner statistics, so query plans match a long-lived database
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m api.synthetic", description="Generate a synthetic university dataset")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop all tables first")
+    args = parser.parse_args(argv)
+
+    written = generate(args.scale, args.seed, args.reset)
+    for table, n in written.items():
+        print(f"{table:28} {n:>8}")
+    print(f"✅ Synthetic dataset (scale={args.scale}, seed={args.seed}) written. Users: "
+          + ", ".join(email for email, _, _ in USERS) + f" / password '{PASSWORD}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
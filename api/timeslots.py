@@ -0,0 +1,91 @@
+# api/timeslots.py
+from typing import Optional
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# full names and three-letter abbreviations ("Mon"), as found in older rows and imports
+DAY_INDEX = {**{d[:3].lower(): i for i, d in enumerate(DAYS)}, **{d.lower(): i for i, d in enumerate(DAYS)}}
+
+
+def day_index(day: Optional[str]) -> Optional[int]:
+    return DAY_INDEX.get((day or "").strip().lower())
+
+
+def day_number(day: Optional[str]) -> int:
+    """Sort key of a stored day name: 0 (Monday) .. 6, and 7 for a name that is not a weekday."""
+    i = day_index(day)
+    return len(DAYS) if i is None else i
+
+
+def parse_time(value: Optional[str]) -> int:
+    """'08:00' / '8:00' / '08:00:00' -> minutes since midnight."""
+    s = (value or "").strip()
+    parts = s.split(":")
+    if len(parts) < 2:
+        raise ValueError(f"Invalid time: {value!r}")
+    h, m = int(parts[0]), int(parts[1])
+    if not (0 <= h <= 24 and 0 <= m < 60) or h * 60 + m > 24 * 60:
+        raise ValueError(f"Invalid time: {value!r}")
+    return h * 60 + m
+
+
+def try_parse_time(value: Optional[str]) -> Optional[int]:
+    try:
+        return parse_time(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def format_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def overlaps(a_start: int, a_end: int, b_start: int, b_end: int) -> bool:
+    return a_start < b_end and b_start < a_end
+
+
+# ---------------------------------------------------------
+# Week bitmaps: 7 days x 96 quarter-hours, bit (day * 96 + quarter)
+# ---------------------------------------------------------
+QUARTER = 15
+QUARTERS_PER_DAY = 24 * 60 // QUARTER
+WEEK_BITS = len(DAYS) * QUARTERS_PER_DAY
+WEEK_BYTES = WEEK_BITS // 8
+
+
+def range_mask(day: int, start: int, end: int, inner: bool = False) -> int:
+    """Bits of the quarters touched by [start, end) on a day.
+
+    inner=True keeps only quarters fully inside the range (used when encoding
+    availability, so a partially covered quarter never counts as free).
+    """
+    if inner:
+        q_start, q_end = -(-start // QUARTER), end // QUARTER
+    else:
+        q_start, q_end = start // QUARTER, -(-end // QUARTER)
+    if q_end <= q_start:
+        return 0
+    return ((1 << (q_end - q_start)) - 1) << (day * QUARTERS_PER_DAY + q_start)
+
+
+def encode_week(schedule_data) -> Optional[bytes]:
+    """LecturerAvailability.schedule_data -> WEEK_BYTES bitmap (None when nothing was set)."""
+    if not isinstance(schedule_data, dict) or not schedule_data:
+        return None
+    bits = 0
+    for day_name, day in schedule_data.items():
+        i = day_index(day_name)
+        if i is None or not isinstance(day, dict) or not day.get("is_available"):
+            continue
+        for rng in day.get("ranges") or []:
+            if not isinstance(rng, dict):
+                continue
+            start, end = try_parse_time(rng.get("start")), try_parse_time(rng.get("end"))
+            if start is not None and end is not None:
+                bits |= range_mask(i, start, end, inner=True)
+    return bits.to_bytes(WEEK_BYTES, "little")
+
+
+def decode_week(bitmap: Optional[bytes]) -> Optional[int]:
+    if bitmap is None:
+        return None
+    return int.from_bytes(bytes(bitmap), "little")
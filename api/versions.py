@@ -0,0 +1,139 @@
+# api/versions.py
+#
+# Per-table version counters for conditional GETs.
+#
+# Every flush of a SessionLocal session (and of the async stack's sessions)
+# that creates/updates/deletes rows bumps the counters of the affected tables
+# in the same transaction, so the counters live in the DB and stay consistent
+# across instances. Only tables some ETag/cache reader stamps on are counted
+# (TRACKED, SCOPED); a flush that touches none of them writes nothing here.
+#
+# Tables listed in SCOPED keep one counter per value of a column
+# ("schedule_entries:W24") instead of one per table, so readers of one
+# semester are not invalidated by writes to another.
+#
+# Core and bulk writes (insert()/update()/delete() statements, INSERT ...
+# SELECT, bulk_insert_mappings, Query.delete) and sessions not made by
+# SessionLocal bypass the listener and must call bump() themselves.
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import database, models
+
+_VERSIONS = models.TableVersion.__table__
+
+# tables read through conditional()/current_etag(); add one here when a reader starts stamping on it
+TRACKED = {"domains", "groups", "lecturers", "modules", "rooms", "semesters", "specializations", "study_programs"}
+
+SCOPED = {
+    "schedule_entries": "semester",
+    "offered_modules": "semester",
+}
+
+
+def scoped(table: str, value) -> str:
+    return f"{table}:{value}"
+
+
+def _tracked(name: str) -> bool:
+    table, _, value = name.partition(":")
+    return table in SCOPED if value else table in TRACKED
+
+
+_UPSERT = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def bump(db: Session, *tables: str):
+    """Increment the counters of tables (plain or scoped names); untracked names are ignored."""
+    names = sorted(n for n in set(tables) if _tracked(n))
+    if not names:
+        return
+    upsert = _UPSERT.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        # one atomic statement, so two writers creating the same counter cannot collide
+        stmt = upsert(_VERSIONS).values([{"name": n, "version": 1} for n in names])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[_VERSIONS.c.name],
+            set_={"version": _VERSIONS.c.version + 1},
+        ))
+        return
+    for name in names:
+        res = db.execute(update(_VERSIONS).where(_VERSIONS.c.name == name).values(version=_VERSIONS.c.version + 1))
+        if res.rowcount == 0:
+            db.execute(_VERSIONS.insert().values(name=name, version=1))
+
+
+def _bump_on_flush(session, flush_context, instances):
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        column = SCOPED.get(table)
+        if column:
+            history = inspect(obj).attrs[column].history
+            for value in (getattr(obj, column),) + tuple(history.deleted or ()):
+                tables.add(scoped(table, value))
+        elif table in TRACKED:
+            tables.add(table)
+    if tables:
+        bump(session, *tables)
+
+
+event.listen(database.SessionLocal, "before_flush", _bump_on_flush)
+if database.AsyncSyncSessionLocal is not None:
+    event.listen(database.AsyncSyncSessionLocal, "before_flush", _bump_on_flush)
+
+
+def current_etag(db: Session, *tables: str) -> str:
+    rows = dict(db.execute(select(_VERSIONS.c.name, _VERSIONS.c.version).where(_VERSIONS.c.name.in_(tables))).all())
+    return '"' + "-".join(f"{t}.{rows.get(t, 0)}" for t in tables) + '"'
+
+
+_etag_memo = {}
+_etag_memo_lock = threading.Lock()
+
+
+def current_etag_memo(db: Session, ttl: float, *tables: str) -> str:
+    """current_etag, reused in-process for up to ttl seconds (for polling clients that tolerate that lag)."""
+    now = time.monotonic()
+    with _etag_memo_lock:
+        hit = _etag_memo.get(tables)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    etag = current_etag(db, *tables)
+    with _etag_memo_lock:
+        _etag_memo[tables] = (now + ttl, etag)
+        if len(_etag_memo) > 1024:
+            _etag_memo.clear()
+    return etag
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip() for t in header.split(",")]
+
+
+def _finish(request: Request, response: Response, etag: str) -> Optional[Response]:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def conditional(request: Request, response: Response, db: Session, *tables: str) -> Optional[Response]:
+    """Returns a 304 response when If-None-Match matches; otherwise sets ETag on response and returns None."""
+    return _finish(request, response, current_etag(db, *tables))
+
+
+async def conditional_async(request: Request, response: Response, db, *tables: str) -> Optional[Response]:
+    etag = await db.run_sync(lambda s: current_etag(s, *tables))
+    return _finish(request, response, etag)
@@ -78,6 +78,11 @@ const api = {
 
   // ---------- LECTURERS ----------
   getLecturers() { return request("/lecturers/"); },
+  // table rows with module_count instead of module lists (q, sort, limit, offset)
+  getLecturerSummary(params = {}) {
+    const query = new URLSearchParams(params).toString();
+    return request(`/lecturers/summary${query ? `?${query}` : ""}`);
+  },
   createLecturer(payload) { return request("/lecturers/", { method: "POST", body: JSON.stringify(payload) }); },
   updateLecturer(id, payload) { return request(`/lecturers/${id}`, { method: "PUT", body: JSON.stringify(payload) }); },
   deleteLecturer(id) { return request(`/lecturers/${id}`, { method: "DELETE" }); },
@@ -134,13 +139,26 @@ const api = {
   },
 
   //  SCHEDULE
-  getSchedule(semester) {
-    const query = semester ? `?semester=${encodeURIComponent(semester)}` : "";
+  // filters: { lecturer_id, room_id, day_of_week, group, program_id, from_time, to_time, limit, after, fields }
+  getSchedule(semester, filters = {}) {
+    const params = new URLSearchParams();
+    if (semester) params.set("semester", semester);
+    Object.entries(filters).forEach(([k, v]) => {
+      if (v !== undefined && v !== null && v !== "") params.set(k, v);
+    });
+    const query = params.toString() ? `?${params.toString()}` : "";
     return request(`/schedule/${query}`);
   },
+  getMySchedule(semester, filters = {}) {
+    const params = new URLSearchParams({ semester, ...filters });
+    return request(`/schedule/me?${params.toString()}`);
+  },
   createScheduleEntry(payload) {
     return request("/schedule/", { method: "POST", body: JSON.stringify(payload) });
   },
+  createScheduleEntriesBulk(entries) {
+    return request("/schedule/bulk", { method: "POST", body: JSON.stringify({ entries }) });
+  },
   deleteScheduleEntry(id) {
     return request(`/schedule/${id}`, { method: "DELETE" });
   },
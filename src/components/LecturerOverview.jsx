@@ -210,7 +210,7 @@ export default function LecturerOverview() {
   async function loadAll() {
     setLoading(true);
     try {
-      const [lecData, domData] = await Promise.all([api.getLecturers(), api.getDomains()]);
+      const [lecData, domData] = await Promise.all([api.getLecturerSummary(), api.getDomains()]);
 
       const mapped = (Array.isArray(lecData) ? lecData : []).map((x) => ({
         id: x.id,
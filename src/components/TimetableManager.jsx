@@ -54,15 +54,22 @@ export default function TimetableManager() {
   };
 
   // --- CARGA DE DATOS ---
+  // Filters are applied server-side; the Day view only fetches its own day.
+  const scheduleDay = viewMode === "Day" ? currentDate.toLocaleDateString('en-US', { weekday: 'long' }) : "";
   const loadSchedule = useCallback(async () => {
     if (!selectedSemester) return;
     setLoading(true);
     try {
-      const data = await api.getSchedule(selectedSemester);
+      const data = await api.getSchedule(selectedSemester, {
+        lecturer_id: filterLecturer,
+        room_id: filterRoom,
+        group: filterGroup,
+        day_of_week: scheduleDay,
+      });
       setScheduleData(data);
     } catch (e) { console.error(e); }
     setLoading(false);
-  }, [selectedSemester]);
+  }, [selectedSemester, filterLecturer, filterRoom, filterGroup, scheduleDay]);
 
   const loadDropdowns = useCallback(async () => {
     if (!selectedSemester) return;
@@ -90,21 +97,15 @@ export default function TimetableManager() {
   }, []);
 
   useEffect(() => {
-    if (selectedSemester) {
-      loadSchedule();
-      loadDropdowns();
-    }
-  }, [selectedSemester, loadSchedule, loadDropdowns]);
+    if (selectedSemester) loadDropdowns();
+  }, [selectedSemester, loadDropdowns]);
+
+  useEffect(() => {
+    if (selectedSemester) loadSchedule();
+  }, [selectedSemester, loadSchedule]);
 
   // --- FILTRADO ---
-  const getFilteredSchedule = () => {
-    return scheduleData.filter(entry => {
-      if (filterLecturer && entry.lecturer_name !== filterLecturer) return false;
-      if (filterRoom && String(entry.room_name) !== filterRoom) return false;
-      return true;
-    });
-  };
-  const filteredData = getFilteredSchedule();
+  const filteredData = scheduleData;
 
   // --- NAVEGACIÓN ---
   const handleNavigateDate = (direction) => {
@@ -422,8 +423,8 @@ export default function TimetableManager() {
       <div style={{ display: "flex", flexWrap: "wrap", alignItems: "center", gap: "30px", marginBottom: "40px" }}>
         <div style={{ display: "flex", alignItems: "center" }}><label style={{ marginRight: "10px", fontWeight: "bold" }}>Semester</label><select value={selectedSemester} onChange={e => setSelectedSemester(e.target.value)} style={filterSelectStyle}>{semesters.map(s => <option key={s.id} value={s.name}>{s.name}</option>)}</select></div>
         <div style={{ display: "flex", alignItems: "center" }}><label style={{ marginRight: "10px", fontWeight: "bold" }}>Groups</label><select value={filterGroup} onChange={e => setFilterGroup(e.target.value)} style={filterSelectStyle}><option value="">All Groups</option>{groups.map(g => <option key={g.id} value={g.name}>{g.name}</option>)}</select></div>
-        <div style={{ display: "flex", alignItems: "center" }}><label style={{ marginRight: "10px", fontWeight: "bold" }}>Lecturer</label><select value={filterLecturer} onChange={e => setFilterLecturer(e.target.value)} style={filterSelectStyle}><option value="">All Lecturers</option>{lecturers.map(l => <option key={l.id} value={`${l.first_name} ${l.last_name}`}>{`${l.first_name} ${l.last_name}`}</option>)}</select></div>
-        <div style={{ display: "flex", alignItems: "center" }}><label style={{ marginRight: "10px", fontWeight: "bold" }}>Location</label><select value={filterRoom} onChange={e => setFilterRoom(e.target.value)} style={{ ...filterSelectStyle, width: "120px" }}><option value="">All</option>{rooms.map(r => <option key={r.id} value={r.name}>{r.name}</option>)}</select></div>
+        <div style={{ display: "flex", alignItems: "center" }}><label style={{ marginRight: "10px", fontWeight: "bold" }}>Lecturer</label><select value={filterLecturer} onChange={e => setFilterLecturer(e.target.value)} style={filterSelectStyle}><option value="">All Lecturers</option>{lecturers.map(l => <option key={l.id} value={l.id}>{`${l.first_name} ${l.last_name}`}</option>)}</select></div>
+        <div style={{ display: "flex", alignItems: "center" }}><label style={{ marginRight: "10px", fontWeight: "bold" }}>Location</label><select value={filterRoom} onChange={e => setFilterRoom(e.target.value)} style={{ ...filterSelectStyle, width: "120px" }}><option value="">All</option>{rooms.map(r => <option key={r.id} value={r.id}>{r.name}</option>)}</select></div>
       </div>
 
       {/* NAVEGACIÓN */}